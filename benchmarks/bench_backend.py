@@ -0,0 +1,58 @@
+"""Benchmark JSON backends on the repo sample files, scaled up.
+
+Each sample file is replicated under n numbered top-level keys to build a
+larger document, which is then decoded and pretty-printed (indent 2, sorted
+keys, as jbro does) with every installed backend.
+
+Usage: python benchmarks/bench_backend.py [copies]
+"""
+
+import glob
+import json
+import os
+import sys
+import timeit
+
+from jsonutils import backend
+
+COPIES = 20000
+REPEAT = 3
+SAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                       'jsonutils', 'sample', '*', '*.json')
+
+def scaled(path, copies):
+    """Return bytes of sample file replicated under copies keys, or None
+    if the sample is not valid JSON.
+    """
+    with open(path, 'rb') as f:
+        try:
+            sample = json.loads(f.read().decode('utf-8'))
+        except ValueError:
+            return None
+    doc = dict((str(i), sample) for i in range(copies))
+    return json.dumps(doc).encode('utf-8')
+
+def best(func):
+    """Return best of REPEAT runs of func, in ms."""
+    return min(timeit.repeat(func, number=1, repeat=REPEAT)) * 1000
+
+def main(copies):
+    names = backend.available()
+    print('{:<28}{:>10}{:>10}{:>12}{:>12}'.format(
+        'sample', 'MB', 'backend', 'loads ms', 'dumps ms'))
+
+    for path in sorted(glob.glob(SAMPLES)):
+        raw = scaled(path, copies)
+        if raw is None:
+            continue
+        mb = len(raw) / 2.0 ** 20
+        for name in names:
+            b = backend.get(name)
+            data = b.loads(raw)
+            loads = best(lambda: b.loads(raw))
+            dumps = best(lambda: b.dumps(data, indent=2, sort_keys=True))
+            print('{:<28}{:>10.1f}{:>10}{:>12.1f}{:>12.1f}'.format(
+                os.path.basename(path), mb, name, loads, dumps))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else COPIES)
@@ -0,0 +1,83 @@
+"""Benchmark bulk lws validation of JSON Lines records.
+
+Generates a JSON Lines file of records shaped like the sample stocks data,
+one in ten with errors, and times validating all records against one
+compiled schema: with lws.validate per record, which builds the full logs,
+and with bulk.validate, which only finds and aggregates errors, with and
+without writing a line per record. Reports throughput in records per
+second.
+
+Usage: python benchmarks/bench_bulk.py [records]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+from jsonutils import backend
+from jsonutils.lws import bulk, lws
+
+RECORDS = 100000
+TICKERS = 10
+
+SCHEMA = {('root', str): {
+    ('path to directory', str, 'path'): ('path', str, '/apps/homefs1/.*'),
+    ('dict of stocks', str, 'stocks'): {
+        ('ticker', str, '[A-Z]*', '+'): {
+            ('stock price', str, 'price'): ('price', float),
+            ('company name', str, 'name'): ('name', str)
+        }
+    },
+    ('magic number', str, 'magic_number'): ('number', int, 42)
+}}
+
+def write_records(path, n):
+    """Write n records to path, every tenth with a value error."""
+    with open(path, 'w') as f:
+        for i in range(n):
+            stocks = dict((chr(ord('A') + j) * 3,
+                           {'price': 'x' if i % 10 == 0 and j == 0 else
+                            i * 0.5 + j,
+                            'name': 'company {}'.format(j)})
+                          for j in range(TICKERS))
+            f.write(json.dumps({'path': '/apps/homefs1/stocks',
+                                'stocks': stocks, 'magic_number': 42}) + '\n')
+
+def validate_logs(validator, records):
+    """Validate records with lws.validate, return number that passed."""
+    passed = 0
+    for _, _, raw in records:
+        ret = lws.validate(validator, {'root': backend.loads(raw)})
+        passed += not any(ret[:4])
+    return passed
+
+def main(n):
+    fd, path = tempfile.mkstemp(suffix='.jsonl')
+    os.close(fd)
+    try:
+        write_records(path, n)
+        validator = lws.compile_schema(SCHEMA)
+        print('{:,d} records, {:,.1f} MB, backend {}\n'.format(
+            n, os.path.getsize(path) / 2.0 ** 20, backend.get().name))
+        print('{:<24}{:>10}{:>14}'.format('mode', 'seconds', 'records/s'))
+
+        with open(os.devnull, 'w') as null:
+            modes = [('lws.validate', lambda records:
+                      validate_logs(validator, records)),
+                     ('bulk, summary', lambda records:
+                      bulk.validate(validator, records)),
+                     ('bulk, line per record', lambda records:
+                      bulk.validate(validator, records, null))]
+            for name, func in modes:
+                start = time.time()
+                func(bulk.iter_records(path))
+                elapsed = time.time() - start
+                print('{:<24}{:>10.2f}{:>14,.0f}'.format(name, elapsed,
+                                                         n / elapsed))
+    finally:
+        os.remove(path)
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else RECORDS)
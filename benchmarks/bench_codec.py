@@ -0,0 +1,91 @@
+"""Benchmark reading compressed JSON input in jbro and lws.
+
+Generates a JSON document of synthetic event records, compresses it with
+every available codec, and times streaming decompression alone (reading
+the file in stream.CHUNK_SIZE chunks, as the streaming parser does) and
+decompression plus decoding with the current JSON backend (as jbro
+test_json and lws load_data do). Throughput is in MB of uncompressed JSON
+per second.
+
+Usage: python benchmarks/bench_codec.py [records]
+"""
+
+import bz2
+import gzip
+import json
+import lzma
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+from jsonutils import backend, codec
+from jsonutils.jbro import stream
+
+RECORDS = 200000
+REPEAT = 3
+
+def compressors():
+    """Return list of (codec name, extension, compress function) of
+    available codecs; zstd is included if zstandard is installed.
+    """
+    out = [('none', '', None),
+           ('gzip', '.gz', lambda raw: gzip.compress(raw, 6)),
+           ('bz2', '.bz2', lambda raw: bz2.compress(raw, 9)),
+           ('xz', '.xz', lambda raw: lzma.compress(raw))]
+    try:
+        import zstandard
+    except ImportError:
+        return out
+    return out + [('zstd', '.zst',
+                   lambda raw: zstandard.ZstdCompressor(3).compress(raw))]
+
+def gen_doc(n):
+    """Return bytes of JSON document of n synthetic event records."""
+    records = [{'id': i,
+                'type': ['click', 'view', 'buy'][i % 3],
+                'user': {'id': i % 1000, 'country': 'c{}'.format(i % 40)},
+                'items': [{'sku': j, 'price': j * 1.5}
+                          for j in range(i % 5)]}
+               for i in range(n)]
+    return json.dumps({'events': records}).encode('utf-8')
+
+def read_all(path):
+    """Read file through codec in parser-sized chunks."""
+    with codec.open(path) as f:
+        while f.read(stream.CHUNK_SIZE):
+            pass
+
+def load(path):
+    """Decompress and decode file."""
+    with codec.open(path) as f:
+        return backend.load(f)
+
+def best(func):
+    """Return best of REPEAT runs of func, in seconds."""
+    return min(timeit.repeat(func, number=1, repeat=REPEAT))
+
+def main(n):
+    raw = gen_doc(n)
+    mb = len(raw) / 2.0 ** 20
+    print('{:,d} records, {:,.1f} MB, backend {}\n'.format(
+        n, mb, backend.BACKEND.name))
+    print('{:>6}{:>10}{:>8}{:>12}{:>12}'.format(
+        'codec', 'MB', 'ratio', 'read MB/s', 'load MB/s'))
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for name, ext, compress in compressors():
+            path = os.path.join(tmpdir, 'events.json' + ext)
+            with open(path, 'wb') as f:
+                f.write(compress(raw) if compress else raw)
+            size = os.path.getsize(path) / 2.0 ** 20
+            print('{:>6}{:>10.2f}{:>8.1f}{:>12.1f}{:>12.1f}'.format(
+                name, size, mb / size, mb / best(lambda: read_all(path)),
+                mb / best(lambda: load(path))))
+    finally:
+        shutil.rmtree(tmpdir)
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else RECORDS)
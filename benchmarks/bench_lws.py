@@ -0,0 +1,124 @@
+"""Benchmark per-document lws validation latency.
+
+Validates generated documents shaped like the sample stocks data, with n
+tickers each, against the sample schema, and reports the best time per
+document of schema and data validation (in one pass, see lws.reconcile),
+and separately of generating the log output of both. Documents are
+validated with the schema dict, which is compiled for every document, and
+with a Validator compiled once and reused.
+Also reports the time of validating single chains of nested objects of
+increasing depth, and of wide objects of tickers against schema levels with
+increasing numbers of literal and regex keys, with the compiled Validator.
+
+Usage: python benchmarks/bench_lws.py [docs]
+"""
+
+import sys
+import timeit
+
+from jsonutils.lws import lws
+
+DOCS = 200
+TICKERS = (10, 100, 1000)
+DEPTHS = (100, 1000, 10000)
+WIDTH = 10000
+PATTERNS = (1, 10, 100)
+REPEAT = 3
+
+SCHEMA = {('root', str): {
+    ('path to directory', str, 'path'): ('path', str, '/apps/homefs1/.*'),
+    ('dict of stocks', str, 'stocks'): {
+        ('ticker', str, '[A-Z]*', '+'): {
+            ('stock price', str, 'price'): ('price', float),
+            ('company name', str, 'name'): ('name', str)
+        }
+    },
+    ('magic number', str, 'magic_number'): ('number', int, 42)
+}}
+
+def ticker(i):
+    """Return upper-case ticker name of int i."""
+    out = ''
+    while True:
+        i, r = divmod(i, 26)
+        out += chr(ord('A') + r)
+        if not i:
+            return out
+
+def gen_doc(n):
+    """Return data dict with root node, with n tickers."""
+    stocks = dict((ticker(i), {'price': i * 0.5, 'name': 'company'})
+                  for i in range(n))
+    return {'root': {'path': '/apps/homefs1/stocks', 'stocks': stocks,
+                     'magic_number': 42}}
+
+def gen_chain(depth):
+    """Return schema dict and data dict with root node, of a chain of depth
+    nested objects with distinct keys.
+    """
+    schema, data = ('leaf', int), 1
+    for i in range(depth):
+        key = 'k{}'.format(i)
+        schema, data = {(key, str, key): schema}, {key: data}
+    return {('root', str): schema}, {'root': data}
+
+def gen_wide(n, m):
+    """Return schema dict and data dict with root node, of n tickers matched
+    against a level with m literal keys and m regex keys besides the ticker.
+    """
+    level = {('ticker', str, '[A-Z]*', '+'): ('price', float)}
+    for i in range(m):
+        level[('field', str, 'f{}'.format(i), '?')] = ('field', int)
+        level[('tag', str, 't{}_[a-z]+'.format(i), '*')] = ('tag', str)
+    stocks = dict((ticker(i), i * 0.5) for i in range(n))
+    return ({('root', str): {('stocks', str, 'stocks'): level}},
+            {'root': {'stocks': stocks}})
+
+def validate(schema, data):
+    """Validate data both ways, return logs."""
+    if hasattr(lws, 'reconcile'):
+        return lws.reconcile(schema, data)
+    return lws.validate_schema(schema, data), lws.validate_data(schema, data)
+
+def output(logs):
+    """Generate log output of schema and data logs."""
+    lws.gen_schema_output(logs[0])
+    lws.gen_data_output(logs[1])
+
+def per_doc(func, docs):
+    """Return best time per document of calling func on docs, in ms."""
+    t = min(timeit.repeat(lambda: [func(d) for d in docs], number=1,
+                          repeat=REPEAT))
+    return 1000.0 * t / len(docs)
+
+def main(n_docs):
+    print('{:>8}{:>16}{:>16}{:>12}'.format('tickers', 'dict ms/doc',
+                                           'compiled ms/doc', 'log ms/doc'))
+    for n in TICKERS:
+        docs = [gen_doc(n)] * max(n_docs * TICKERS[0] // n, 1)
+        logs = validate(SCHEMA, docs[0])
+        compiled = float('nan')
+        if hasattr(lws, 'compile_schema'):
+            validator = lws.compile_schema(SCHEMA)
+            compiled = per_doc(lambda d: validate(validator, d), docs)
+        print('{:>8,d}{:>16.3f}{:>16.3f}{:>12.3f}'.format(
+            n, per_doc(lambda d: validate(SCHEMA, d), docs), compiled,
+            per_doc(lambda d: output(logs), docs)))
+
+    print('\n{:>8}{:>16}'.format('depth', 'ms/doc'))
+    for depth in DEPTHS:
+        schema, data = gen_chain(depth)
+        validator = lws.compile_schema(schema)
+        print('{:>8,d}{:>16.3f}'.format(
+            depth, per_doc(lambda d: validate(validator, d), [data])))
+
+    print('\n{:>8}{:>10}{:>16}'.format('tickers', 'keys', 'ms/doc'))
+    for m in PATTERNS:
+        schema, data = gen_wide(WIDTH, m)
+        validator = lws.compile_schema(schema)
+        print('{:>8,d}{:>10,d}{:>16.3f}'.format(
+            WIDTH, 2 * m + 1,
+            per_doc(lambda d: validate(validator, d), [data])))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DOCS)
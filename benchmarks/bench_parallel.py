@@ -0,0 +1,56 @@
+"""Benchmark parallel JSON Lines scanning in jbro.
+
+Generates a JSON Lines file of synthetic event records and times a full
+aggregation (keys, describe and recursive find) with increasing numbers of
+worker processes, reporting throughput and speedup over one process.
+
+Usage: python benchmarks/bench_parallel.py [records]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+from jsonutils.jbro import parallel
+
+RECORDS = 200000
+
+def write_records(path, n):
+    """Write n synthetic event records to path."""
+    with open(path, 'w') as f:
+        for i in range(n):
+            record = {'id': i,
+                      'type': ['click', 'view', 'buy'][i % 3],
+                      'user': {'id': i % 1000, 'country': 'c{}'.format(i % 40),
+                               'tags': ['a', 'b', 'c'][:i % 4]},
+                      'items': [{'sku': j, 'price': j * 1.5}
+                                for j in range(i % 5)]}
+            f.write(json.dumps(record) + '\n')
+
+def main(n):
+    fd, path = tempfile.mkstemp(suffix='.jsonl')
+    os.close(fd)
+    try:
+        write_records(path, n)
+        mb = os.path.getsize(path) / 2.0 ** 20
+        print('{:,d} records, {:,.1f} MB\n'.format(n, mb))
+        print('{:>8}{:>12}{:>12}{:>10}'.format('workers', 'seconds', 'MB/s',
+                                               'speedup'))
+
+        base = None
+        workers = 1
+        while workers <= parallel.cpu_count():
+            start = time.time()
+            parallel.scan(path, workers, keys=True, describe=True, find='id')
+            elapsed = time.time() - start
+            base = base or elapsed
+            print('{:>8,d}{:>12.2f}{:>12.1f}{:>10.2f}'.format(
+                workers, elapsed, mb / elapsed, base / elapsed))
+            workers *= 2
+    finally:
+        os.remove(path)
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else RECORDS)
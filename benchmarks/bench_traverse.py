@@ -0,0 +1,77 @@
+"""Benchmark iterative traversal on deeply nested documents.
+
+Times the jbro and lws traversal helpers on documents nested 10,000 levels
+deep, which exceed the default recursion limit. For comparison, the previous
+recursive implementations are timed at the deepest depth they can handle.
+
+Usage: python benchmarks/bench_traverse.py [depth]
+"""
+
+import sys
+import timeit
+
+from jsonutils.jbro import jbro
+from jsonutils.lws import lws, lws_logger
+
+DEPTH = 10000
+REPEAT = 5
+
+# Recursive Baselines
+
+def count_keys_rec(d):
+    return (0 if not isinstance(d, dict) else
+            len(d) + sum(count_keys_rec(v) for v in d.values()))
+
+def max_depth_rec(d):
+    return (0 if not isinstance(d, dict) or len(d) == 0 else
+            1 + max(max_depth_rec(v) for v in d.values()))
+
+def walk_rec(d, path):
+    if not path: return d
+    return walk_rec(d[path[0]], path[1:])
+
+# Documents
+
+def chain(depth):
+    """Return dict nested to depth, each level with one nested key."""
+    d = 0
+    for _ in range(depth):
+        d = {'k': d, 'v': 1}
+    return d
+
+def graph(depth):
+    """Return lws log graph forming a chain of given depth."""
+    return dict((i, [i + 1]) for i in range(depth))
+
+# Main
+
+def bench(label, func, depth):
+    """Time func, print best of REPEAT runs in ms."""
+    try:
+        best = min(timeit.repeat(func, number=1, repeat=REPEAT))
+        print('{:<28}{:>8,d}{:>12.2f} ms'.format(label, depth, best * 1000))
+    except RecursionError:
+        print('{:<28}{:>8,d}{:>15}'.format(label, depth, 'RecursionError'))
+
+def main(depth):
+    shallow = min(depth, sys.getrecursionlimit() // 4)
+    print('{:<28}{:>8}{:>15}'.format('function', 'depth', 'best'))
+
+    for n in (shallow, depth):
+        d = chain(n)
+        path = ['k'] * n
+        g = graph(n)
+        bench('jbro.count_keys', lambda: jbro.count_keys(d), n)
+        bench('jbro.max_depth', lambda: jbro.max_depth(d), n)
+        bench('jbro.find_key', lambda: jbro.find_key(d, '.'.join(path)), n)
+        bench('lws.walk', lambda: lws.walk(d, path), n)
+        bench('lws_logger.dict_to_tree',
+              lambda: list(lws_logger.flatten_list(
+                  lws_logger.dict_to_tree(g, 0, [(0, 0)]))), n)
+        bench('recursive count_keys', lambda: count_keys_rec(d), n)
+        bench('recursive max_depth', lambda: max_depth_rec(d), n)
+        bench('recursive walk', lambda: walk_rec(d, path), n)
+        print('')
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEPTH)
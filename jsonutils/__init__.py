@@ -1 +1 @@
-__all__ = ['lws', 'jbro']
+__all__ = ['lws', 'jbro', 'backend', 'traverse']
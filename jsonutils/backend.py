@@ -0,0 +1,176 @@
+"""Pluggable JSON backends shared by jbro and lws.
+
+Decode and encode JSON with the fastest installed parser (orjson, ujson or
+simdjson), falling back to the standard library json module. The backend is
+chosen by use(), e.g. from the jbro --backend option, or by the
+JSONUTILS_BACKEND environment variable; by default the first available of
+PREFERENCE is used.
+
+All backends encode exactly as the standard library json module does, with
+its default separators and ASCII escaping: where a backend cannot honour an
+option (e.g. orjson only indents by 2 spaces and has no spaced separators)
+or may encode a value differently (floats, NaN and Infinity, non-ASCII
+text), the standard library is used for that call. Likewise, input
+that a backend rejects (e.g. NaN and Infinity) or may decode lossily (ints
+of 19 or more digits, beyond 64 bits) is decoded by the standard library,
+so that all backends decode the same values.
+"""
+
+import json
+import os
+import re
+
+PREFERENCE = ['orjson', 'ujson', 'simdjson', 'json']
+
+# runs of 19+ digits, not in fractions or exponents; may match in strings
+WIDE_INT = re.compile(r'(?<![\d.eE+-])-?\d{19,}')
+WIDE_INT_BYTES = re.compile(WIDE_INT.pattern.encode('ascii'))
+
+# orjson output that may differ from the standard library's: unescaped
+# non-ASCII chars and DEL, floats (formatted differently) and null (also
+# written for NaN and Infinity); may match in strings
+ORJSON_DIFFERS = re.compile(br'[^\x00-\x7e]|\d[.eE]|null')
+
+# Helpers
+
+def has_wide_int(s):
+    """Return True if JSON str or bytes s may hold ints beyond 64 bits."""
+    pattern = WIDE_INT if isinstance(s, str) else WIDE_INT_BYTES
+    return pattern.search(s) is not None
+
+# Backends
+
+class Backend(object):
+    """Standard library backend; subclasses override loads and dumps."""
+
+    name = 'json'
+
+    def loads(self, s):
+        """Decode JSON str or bytes."""
+        return json.loads(s)
+
+    def dumps(self, obj, indent=None, sort_keys=False, default=None):
+        """Encode obj as JSON str."""
+        return json.dumps(obj, indent=indent, sort_keys=sort_keys,
+                          default=default)
+
+class OrjsonBackend(Backend):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self.orjson = orjson
+
+    def loads(self, s):
+        if has_wide_int(s):
+            return Backend.loads(self, s)
+        try:
+            return self.orjson.loads(s)
+        except ValueError:
+            # e.g. NaN and Infinity; raises again if not valid JSON
+            return Backend.loads(self, s)
+
+    def dumps(self, obj, indent=None, sort_keys=False, default=None):
+        if indent != 2:
+            return Backend.dumps(self, obj, indent, sort_keys, default)
+        option = (self.orjson.OPT_INDENT_2 |
+                  (self.orjson.OPT_SORT_KEYS if sort_keys else 0))
+        try:
+            raw = self.orjson.dumps(obj, default=default, option=option)
+        except TypeError:
+            # e.g. non-str keys or ints beyond 64 bits
+            return Backend.dumps(self, obj, indent, sort_keys, default)
+        if ORJSON_DIFFERS.search(raw):
+            return Backend.dumps(self, obj, indent, sort_keys, default)
+        return raw.decode('ascii')
+
+class UjsonBackend(Backend):
+    """Decode with ujson; encoding uses the standard library, as ujson
+    escapes slashes and formats floats differently.
+    """
+
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self.ujson = ujson
+
+    def loads(self, s):
+        try:
+            return self.ujson.loads(s)
+        except ValueError:
+            # e.g. ints beyond 64 bits; raises again if not valid JSON
+            return Backend.loads(self, s)
+
+class SimdjsonBackend(Backend):
+    """Decode with simdjson; encoding uses the standard library."""
+
+    name = 'simdjson'
+
+    def __init__(self):
+        import simdjson
+        self.simdjson = simdjson
+
+    def loads(self, s):
+        if has_wide_int(s):
+            return Backend.loads(self, s)
+        try:
+            return self.simdjson.loads(s)
+        except ValueError:
+            # e.g. NaN and Infinity; raises again if not valid JSON
+            return Backend.loads(self, s)
+
+BACKENDS = {'json': Backend, 'orjson': OrjsonBackend,
+            'ujson': UjsonBackend, 'simdjson': SimdjsonBackend}
+
+# Selection
+
+def available():
+    """Return names of installed backends, in order of preference."""
+    names = []
+    for name in PREFERENCE:
+        try:
+            BACKENDS[name]()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+def get(name=None):
+    """Return backend by name, or first available backend if name is None
+    or 'auto'. Raises ValueError if the named backend is unknown or not
+    installed.
+    """
+    if name in (None, 'auto'):
+        return BACKENDS[available()[0]]()
+    if name not in BACKENDS:
+        raise ValueError('Unknown JSON backend {}'.format(name))
+    try:
+        return BACKENDS[name]()
+    except ImportError:
+        raise ValueError('JSON backend {} is not installed'.format(name))
+
+def use(name=None):
+    """Set backend used by module-level loads, load and dumps."""
+    global BACKEND
+    BACKEND = get(name)
+    return BACKEND
+
+try:
+    BACKEND = get(os.environ.get('JSONUTILS_BACKEND'))
+except ValueError:
+    BACKEND = get()
+
+# Current Backend
+
+def loads(s):
+    """Decode JSON str or bytes with current backend."""
+    return BACKEND.loads(s)
+
+def load(f):
+    """Decode JSON from file object with current backend."""
+    return BACKEND.loads(f.read())
+
+def dumps(obj, indent=None, sort_keys=False, default=None):
+    """Encode obj as JSON str with current backend."""
+    return BACKEND.dumps(obj, indent, sort_keys, default)
@@ -0,0 +1,95 @@
+"""Transparent decompression of input files shared by jbro and lws.
+
+Compressed files are detected by their magic bytes rather than their
+extension, and decompressed as a stream while they are read, a buffer at a
+time, so that they never need to be decompressed to disk. gzip, bz2 and xz
+are read with the standard library (xz from Python 3); zstd requires the
+zstandard package.
+
+Decompressed streams are read forward; seeking backwards restarts
+decompression from the start of the file (gzip, bz2, xz) or is not
+supported (zstd).
+"""
+
+import bz2
+import gzip
+import io
+
+try:
+    import lzma
+except ImportError:
+    # Python 2: xz is not available
+    lzma = None
+
+MAGIC = [('gzip', b'\x1f\x8b'),
+         ('bz2', b'BZh'),
+         ('xz', b'\xfd7zXZ\x00'),
+         ('zstd', b'\x28\xb5\x2f\xfd')]
+CODECS = [name for name, _ in MAGIC]
+EXTENSIONS = ('.gz', '.bz2', '.xz', '.zst')
+HEAD = max(len(magic) for _, magic in MAGIC)
+
+# Python 2 has no bz2.open
+open_bz2 = getattr(bz2, 'open', bz2.BZ2File)
+
+# raised for unavailable codecs, and corrupt or truncated input
+ERRORS = (ValueError, EOFError, IOError) + ((lzma.LZMAError,) if lzma else ())
+
+# Detection
+
+def sniff(head):
+    """Return name of codec of bytes head, the start of a file, or None if
+    uncompressed.
+    """
+    for name, magic in MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+def detect(filename):
+    """Return name of codec of file, or None if uncompressed."""
+    with io.open(filename, 'rb') as f:
+        return sniff(f.read(HEAD))
+
+def strip_extension(filename):
+    """Return filename without compression extension, if any."""
+    for ext in EXTENSIONS:
+        if filename.lower().endswith(ext):
+            return filename[:-len(ext)]
+    return filename
+
+# Reading
+
+def open_xz(filename):
+    """Open xz compressed file as binary stream.
+    Raises ValueError if the lzma module is not available.
+    """
+    if lzma is None:
+        raise ValueError('Reading xz compressed file {} requires Python 3'
+                         .format(filename))
+    return lzma.open(filename, 'rb')
+
+def open_zstd(filename):
+    """Open zstd compressed file as buffered binary stream.
+    Raises ValueError if the zstandard package is not installed.
+    """
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError('Reading zstd compressed file {} requires the '
+                         'zstandard package'.format(filename))
+    f = io.open(filename, 'rb')
+    reader = zstandard.ZstdDecompressor().stream_reader(f, closefd=True)
+    return io.BufferedReader(reader)
+
+def open(filename, codec=None):
+    """Open file for reading as binary stream, decompressing it if it is
+    compressed. codec is the name of its codec if already detected.
+    Raises ValueError if a codec is not available.
+    """
+    codec = codec or detect(filename)
+    return (io.open(filename, 'rb') if codec is None else
+            gzip.open(filename, 'rb') if codec == 'gzip' else
+            open_bz2(filename, 'rb') if codec == 'bz2' else
+            open_xz(filename) if codec == 'xz' else
+            open_zstd(filename))
@@ -0,0 +1,128 @@
+"""Batch key lookups for jbro.
+
+Many nested keys (as for find, -f) and recursive keys (as for find_rec, -F)
+are compiled into a prefix trie and resolved together in a single traversal,
+rather than one traversal per key. Hits are yielded as they are found, as
+(key, path, value) tuples, where path is None for nested keys and the tuple
+of keys and list indexes of the hit for recursive keys.
+
+As with find_key, nested keys are followed through dicts only; as with
+iter_key_rec, recursive keys are also searched for within lists, but not
+again within their own hits. Hits of each recursive key may be limited, in
+which case its search stops once the limit is reached.
+"""
+
+from collections import deque
+
+# Trie
+
+class Node(object):
+    """Trie node: children by key, and nested key ending here, if any."""
+
+    __slots__ = ('children', 'target')
+
+    def __init__(self):
+        self.children = {}
+        self.target = None
+
+class Trie(object):
+    """Prefix trie of nested keys to find, with recursive keys to find.
+    Args
+        nested_keys: iterable of keys in form key1.key2...
+        keys: iterable of keys to find recursively
+        limit: int of hits of each recursive key after which to stop, or None
+    """
+
+    def __init__(self, nested_keys=(), keys=(), limit=None):
+        self.root = Node()
+        self.targets = []       # nested keys, without duplicates
+        for nested_key in nested_keys:
+            self.add(nested_key)
+        self.keys = frozenset(keys)
+        self.limit = limit
+
+    def add(self, nested_key):
+        """Add nested key in form key1.key2... to trie."""
+        node = self.root
+        for key in nested_key.split('.'):
+            node = node.children.setdefault(key, Node())
+        if node.target is None:
+            node.target = nested_key
+            self.targets.append(nested_key)
+
+    def child(self, node, key):
+        """Return child of node (possibly None) at key, or None."""
+        return node.children.get(key) if node is not None else None
+
+    def descend(self, node, keys):
+        """Return True if anything can be found below node with keys."""
+        return bool(keys) or (node is not None and bool(node.children))
+
+    def count(self, counts, key):
+        """Count hit of recursive key in dict counts; return False if the
+        limit was already reached, i.e. the hit is not to be reported.
+        """
+        n = counts.get(key, 0)
+        if self.limit is not None and n >= self.limit:
+            return False
+        counts[key] = n + 1
+        return True
+
+    def exhausted(self, counts):
+        """Return frozenset of recursive keys whose limit is reached."""
+        return (frozenset(key for key, n in counts.items()
+                          if n >= self.limit)
+                if self.limit is not None else frozenset())
+
+# Lookup
+
+def resolve(data, trie, is_dict, is_list, order='dfs'):
+    """Yield (key, path, value) of hits of trie in data, in one traversal.
+    Args
+        data: dict to search
+        trie: Trie of keys to find
+        is_dict, is_list: functions returning True for dicts and lists
+        order: 'dfs' for document order, or 'bfs' for shallowest first
+    """
+    # hits are yielded when their node is visited, so in traversal order
+    stack = deque([(data, trie.root, trie.keys, (), [])])
+    pop = stack.popleft if order == 'bfs' else stack.pop
+    counts = {}                 # hits of recursive keys
+    while stack:
+        d, node, keys, path, hits = pop()
+        for hit in hits:
+            if hit[1] is None or trie.count(counts, hit[0]):
+                yield hit
+        if counts:
+            keys = keys - trie.exhausted(counts)
+        if not trie.descend(node, keys):
+            continue
+        # without recursive keys, look up trie keys rather than scan d
+        items = (d.items() if keys and is_dict(d) else
+                 enumerate(d) if keys and is_list(d) else
+                 [(key, d[key]) for key in node.children if key in d]
+                 if is_dict(d) else
+                 [])
+        nodes = []
+        for key, val in items:
+            child_path = path + (key,)
+            child = trie.child(node, key)
+            child_hits = ([(child.target, None, val)]
+                          if child is not None and child.target is not None
+                          else [])
+            child_keys = keys
+            if key in keys:
+                child_hits.append((key, child_path, val))
+                child_keys = keys - frozenset([key])
+            if child_hits or trie.descend(child, child_keys):
+                nodes.append((val, child, child_keys, child_path, child_hits))
+        stack.extend(nodes if order == 'bfs' else reversed(nodes))
+
+def missing(trie, found):
+    """Return (key, recursive) of keys of trie not in found, a set of
+    (key, recursive) of keys with hits.
+    """
+    return ([(key, False) for key in trie.targets
+             if (key, False) not in found] +
+            [(key, True) for key in sorted(trie.keys)
+             if (key, True) not in found])
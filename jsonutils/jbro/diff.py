@@ -0,0 +1,160 @@
+"""Structural diff of two JSON documents for jbro (--diff).
+
+Walk both documents together, top-down in a single traversal, and report
+each path that was added, removed or changed. Object values are matched by
+key and array elements by index, so an element inserted into an array
+changes every element after it. Values are compared as decoded, so that
+documents which differ only in formatting or key order have no differences,
+except that true and false differ from 1 and 0 (which Python takes as
+equal).
+
+Subtrees that are identical in both documents are skipped without being
+descended into:
+
+* decoded documents compare subtrees as values
+* lazy documents (see lazy) compare the raw bytes of subtrees first, so
+  that unchanged subtrees are never decoded
+* indexed documents (see index) compare the raw bytes of the byte range of
+  each key, and list the keys of changed objects from the index, so that
+  neither document is parsed; only arrays and scalars that differ are
+  decoded
+"""
+
+import mmap
+from jsonutils import backend
+from jsonutils.jbro import lazy, query, stream
+
+ADDED, REMOVED, CHANGED = '+', '-', '~'
+OPS = (ADDED, REMOVED, CHANGED)
+
+# Helpers
+
+def same_span(buf_a, start_a, end_a, buf_b, start_b, end_b):
+    """Return True if byte range [start_a, end_a) of buffer buf_a equals
+    range [start_b, end_b) of buf_b, compared a chunk at a time.
+    """
+    n = end_a - start_a
+    if n != end_b - start_b:
+        return False
+    for i in range(0, n, stream.CHUNK_SIZE):
+        j = min(i + stream.CHUNK_SIZE, n)
+        if buf_a[start_a + i:start_a + j] != buf_b[start_b + i:start_b + j]:
+            return False
+    return True
+
+def same(a, b):
+    """Return True if values a and b are identical, telling booleans from
+    numbers and taking NaN as identical to NaN. Lazy containers are compared by their raw bytes, falling back
+    to their values.
+    """
+    if (isinstance(a, lazy.LazyContainer) and
+            isinstance(b, lazy.LazyContainer) and
+            same_span(a.buf, a.start, a.end(), b.buf, b.start, b.end())):
+        return True
+    # lazy containers differing in raw bytes are descended into
+    if isinstance(a, lazy.LazyContainer) or isinstance(b, lazy.LazyContainer):
+        return False
+    if isinstance(a, bool) or isinstance(b, bool):
+        return a is b
+    # == takes true for 1 and false for NaN within containers, so they are
+    # compared by their encodings, which tell true from 1 and match for NaN;
+    # containers that are equal but encoded differently (e.g. with 1 and
+    # 1.0) are descended into
+    if query.is_map(a) or query.is_seq(a):
+        return (backend.dumps(a, sort_keys=True) ==
+                backend.dumps(b, sort_keys=True))
+    return a == b or (a != a and b != b)
+
+# Decoded and Lazy Documents
+
+def diff(a, b, path=()):
+    """Yield (op, path, old value, new value) of paths that differ between
+    values a and b, in document order; old is None for added paths and new
+    is None for removed paths.
+    Args
+        a, b: decoded JSON values or lazy containers
+        path: tuple of keys and int indexes of a and b
+    """
+    # stack of (op, path, old, new), where op None compares old and new
+    stack = [(None, path, a, b)]
+    while stack:
+        op, path, a, b = stack.pop()
+        if op is not None:
+            yield op, path, a, b
+        elif same(a, b):
+            continue
+        elif query.is_map(a) and query.is_map(b):
+            steps = [(None if key in b else REMOVED, path + (key,), a[key],
+                      b[key] if key in b else None)
+                     for key in a]
+            steps.extend((ADDED, path + (key,), None, b[key])
+                         for key in b if key not in a)
+            stack.extend(reversed(steps))
+        elif query.is_seq(a) and query.is_seq(b):
+            n_a, n_b = len(a), len(b)
+            steps = [(None, path + (i,), a[i], b[i])
+                     for i in range(min(n_a, n_b))]
+            steps.extend((REMOVED, path + (i,), a[i], None)
+                         for i in range(n_b, n_a))
+            steps.extend((ADDED, path + (i,), None, b[i])
+                         for i in range(n_a, n_b))
+            stack.extend(reversed(steps))
+        else:
+            yield CHANGED, path, a, b
+
+# Indexed Documents
+
+def map_file(f):
+    """Map binary file f into memory."""
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def is_object(buf):
+    """Return True if JSON document in buffer buf is an object."""
+    pos = stream.SPACE.match(buf).end()
+    return buf[pos:pos + 1] == b'{'
+
+def read_entry(idx, entry):
+    """Return decoded value of (type, start, end) entry of index.Index."""
+    return stream.read_value(idx.f, entry[1], entry[2])
+
+def children(idx, path, entry):
+    """Return dict of key -> (type, start, end) entries of the keys of
+    object at path with entry in index.Index idx, in file order.
+    """
+    rows = idx.children(len(path) + 1, entry[1], entry[2])
+    return dict((key, (kind, start, end)) for key, kind, start, end in rows)
+
+def diff_index(idx_a, idx_b):
+    """Yield (op, path, old value, new value) of paths that differ between
+    the files of index.Index idx_a and idx_b, as diff does. Objects are
+    compared by the byte ranges of their keys in the index; documents that
+    are not objects are decoded and compared by diff.
+    """
+    buf_a, buf_b = map_file(idx_a.f), map_file(idx_b.f)
+    if not (is_object(buf_a) and is_object(buf_b)):
+        for d in diff(lazy.value_at(buf_a, 0), lazy.value_at(buf_b, 0)):
+            yield d
+        return
+
+    # stack of (path, entry a, entry b), entries of (type, start, end)
+    stack = [((), ('object', 0, len(buf_a)), ('object', 0, len(buf_b)))]
+    while stack:
+        path, a, b = stack.pop()
+        if b is None:
+            yield REMOVED, path, read_entry(idx_a, a), None
+        elif a is None:
+            yield ADDED, path, None, read_entry(idx_b, b)
+        elif same_span(buf_a, a[1], a[2], buf_b, b[1], b[2]):
+            continue
+        elif a[0] == 'object' and b[0] == 'object':
+            keys_a = children(idx_a, path, a)
+            keys_b = children(idx_b, path, b)
+            steps = [(path + (key,), entry, keys_b.get(key))
+                     for key, entry in keys_a.items()]
+            steps.extend((path + (key,), None, entry)
+                         for key, entry in keys_b.items()
+                         if key not in keys_a)
+            stack.extend(reversed(steps))
+        else:
+            for d in diff(read_entry(idx_a, a), read_entry(idx_b, b), path):
+                yield d
@@ -0,0 +1,296 @@
+"""Persistent structural index for jbro.
+
+Record the byte range, depth and type of every nested key in form
+key1.key2... in a sidecar SQLite database, so that repeated lookups on an
+unchanged file can seek straight to values instead of parsing the whole
+document. The index is keyed by file path, size and modification time, and
+is rebuilt automatically when the file changes.
+
+As with jbro.get_all_keys, only keys reachable through dicts are indexed;
+recursive find decodes and searches arrays for the keys within them.
+IndexedObject views objects through the index, listing their keys from it
+and reading values on demand, so that batch lookups (see batch) run over
+an indexed file as over a decoded one.
+"""
+
+import hashlib
+import os
+import sqlite3
+from jsonutils.jbro import stream
+
+VERSION = 2
+INDEX_DIR = os.environ.get('JBRO_INDEX_DIR',
+                           os.path.join(os.path.expanduser('~'), '.cache',
+                                        'jbro'))
+
+TYPES = {'end_map': 'object', 'end_array': 'array', 'string': 'string',
+         'number': 'number', 'boolean': 'boolean', 'null': 'null'}
+
+SCHEMA = ['CREATE TABLE meta (path TEXT, size INTEGER, mtime REAL, '
+          'version INTEGER)',
+          'CREATE TABLE keys (path TEXT, key TEXT, depth INTEGER, '
+          'type TEXT, start INTEGER, end INTEGER)',
+          'CREATE INDEX keys_path ON keys (path)',
+          'CREATE INDEX keys_key ON keys (key)',
+          'CREATE INDEX keys_depth ON keys (depth, start)']
+
+# Helpers
+
+def file_id(filename):
+    """Return (absolute path, size, mtime) identifying file contents."""
+    path = os.path.abspath(filename)
+    st = os.stat(path)
+    return path, st.st_size, st.st_mtime
+
+def index_path(filename, index_dir=None):
+    """Return path of sidecar index for filename."""
+    path = os.path.abspath(filename).encode('utf-8')
+    name = hashlib.sha1(path).hexdigest() + '.sqlite'
+    return os.path.join(index_dir or INDEX_DIR, name)
+
+def gen_entries(f):
+    """Yield (path, key, depth, type, start, end) for all keys in file f."""
+    arrays = 0
+    for path, event, _, start, end in stream.parse(f):
+        if event == 'start_array':
+            arrays += 1
+        elif event == 'end_array':
+            arrays -= 1
+        # containers are recorded on end event to capture their full range
+        if not path or arrays > 0 or event not in TYPES:
+            continue
+        yield '.'.join(path), path[-1], len(path), TYPES[event], start, end
+
+def is_current(conn, fid):
+    """Return True if index metadata matches file identity."""
+    try:
+        row = conn.execute('SELECT path, size, mtime, version '
+                           'FROM meta').fetchone()
+    except sqlite3.DatabaseError:
+        return False
+    return row is not None and tuple(row) == fid + (VERSION,)
+
+# Build
+
+def build(filename, db_path):
+    """Build index of filename at db_path, replacing any existing index.
+    Raises ValueError if file is not valid JSON.
+    """
+    tmp_path = db_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    fid = file_id(filename)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        for stmt in SCHEMA[:2]:
+            conn.execute(stmt)
+        with open(filename, 'rb') as f:
+            conn.executemany('INSERT INTO keys VALUES (?, ?, ?, ?, ?, ?)',
+                             gen_entries(f))
+        # create lookup indexes after bulk insert, cheaper than maintaining
+        for stmt in SCHEMA[2:]:
+            conn.execute(stmt)
+        conn.execute('INSERT INTO meta VALUES (?, ?, ?, ?)', fid + (VERSION,))
+        conn.commit()
+    except Exception:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+    conn.close()
+    os.rename(tmp_path, db_path)
+
+class Index(object):
+    """Structural index of a JSON file, rebuilt if stale."""
+
+    def __init__(self, filename, index_dir=None, rebuild=False):
+        self.filename = filename
+        self.db_path = index_path(filename, index_dir)
+        self.built = False
+
+        dirname = os.path.dirname(self.db_path)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        current = False
+        if not rebuild and os.path.exists(self.db_path):
+            conn = sqlite3.connect(self.db_path)
+            current = is_current(conn, file_id(filename))
+            conn.close()
+        if not current:
+            build(filename, self.db_path)
+            self.built = True
+
+        self.conn = sqlite3.connect(self.db_path)
+        self.f = open(filename, 'rb')
+
+    def close(self):
+        self.conn.close()
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Lookups
+
+    def entry(self, nested_key):
+        """Return (depth, type, start, end) of nested key, or None."""
+        return self.conn.execute('SELECT depth, type, start, end FROM keys '
+                                 'WHERE path = ?', (nested_key,)).fetchone()
+
+    def find_key(self, nested_key):
+        """Find value of key, where key may be nested key1.key2..."""
+        row = self.entry(nested_key)
+        return None if row is None else stream.read_value(self.f, *row[2:])
+
+    def key_path(self, depth, start):
+        """Return tuple of keys leading to key at depth whose value starts
+        at offset start.
+        """
+        return tuple(self.conn.execute('SELECT key FROM keys '
+                                       'WHERE depth = ? AND start <= ? '
+                                       'ORDER BY start DESC LIMIT 1',
+                                       (d, start)).fetchone()[0]
+                     for d in range(1, depth + 1))
+
+    def iter_key_rec(self, search_key, search=None):
+        """Yield (path, value) of all occurrences of key in file order, where
+        path is the tuple of keys (and list indexes) leading to the value.
+        As with jbro.iter_key_rec, found values are not searched further.
+        Args
+            search_key: str of key to find
+            search: function (value, key) returning iterable of (path,
+                value) of occurrences of key in value, e.g.
+                jbro.iter_key_rec, with which arrays outside hits (and a
+                root that is not an object) are decoded and searched; if
+                None, keys within arrays, which are not indexed, are not
+                found
+        """
+        if search is not None and self.is_empty():
+            size = os.fstat(self.f.fileno()).st_size
+            for hit in search(stream.read_value(self.f, 0, size),
+                              search_key):
+                yield hit
+            return
+
+        arrays = "OR type = 'array' " if search is not None else ''
+        rows = self.conn.execute('SELECT key, depth, start, end FROM keys '
+                                 'WHERE key = ? ' + arrays + 'ORDER BY start',
+                                 (search_key,))
+        last_end = -1
+        for key, depth, start, end in rows:
+            if start < last_end:
+                continue
+            path = self.key_path(depth, start)
+            val = stream.read_value(self.f, start, end)
+            if key == search_key:
+                yield path, val
+            else:
+                for sub_path, hit in search(val, search_key):
+                    yield path + sub_path, hit
+            last_end = end
+
+    def find_key_rec(self, search_key, search=None):
+        """Find all occurrences of key, return list of (path, value) in file
+        order (see iter_key_rec).
+        """
+        return list(self.iter_key_rec(search_key, search))
+
+    def is_empty(self):
+        """Return True if no keys are indexed, i.e. the root is an empty
+        object or not an object.
+        """
+        row = self.conn.execute('SELECT 1 FROM keys LIMIT 1').fetchone()
+        return row is None
+
+    def children(self, depth, start, end):
+        """Return list of (key, type, start, end) of keys at depth within
+        byte range [start, end), i.e. the keys of the object there, in file
+        order.
+        """
+        return self.conn.execute('SELECT key, type, start, end FROM keys '
+                                 'WHERE depth = ? AND start >= ? AND end <= ? '
+                                 'ORDER BY start',
+                                 (depth, start, end)).fetchall()
+
+    def get_all_keys(self):
+        """Retrieve all keys in format key1.key2..., depth-first with the
+        keys of each object sorted, as jbro.get_all_keys.
+        """
+        rows = self.conn.execute('SELECT key, depth FROM keys ORDER BY start')
+        # rows in file order list each key after its parent, so the keys
+        # leading to a row are those of the last rows at lower depths;
+        # sorting these paths sorts the keys of each object
+        paths, keys = [], []
+        for key, depth in rows:
+            del keys[depth - 1:]
+            keys.append(key)
+            paths.append(tuple(keys))
+        return ['.'.join(path) for path in sorted(set(paths))]
+
+    def root(self):
+        """Return IndexedObject of root object, or decoded root if it is not
+        an object or has no keys.
+        """
+        size = os.fstat(self.f.fileno()).st_size
+        if self.is_empty():
+            return stream.read_value(self.f, 0, size)
+        return IndexedObject(self, 0, 0, size)
+
+# Indexed Objects
+
+class IndexedObject(object):
+    """Read-only dict-like view of object at byte range [start, end) and
+    depth of Index idx. Keys are listed from the index in file order, and
+    values read on demand: objects as IndexedObject, others decoded.
+    """
+
+    def __init__(self, idx, depth, start, end):
+        self.idx = idx
+        self.depth = depth
+        self.start = start
+        self.end = end
+        self._keys = None
+        self._rows = None
+
+    def rows(self):
+        """Return dict of key -> (type, start, end) of keys of object."""
+        if self._rows is None:
+            self._keys, self._rows = [], {}
+            for key, kind, start, end in self.idx.children(
+                    self.depth + 1, self.start, self.end):
+                if key not in self._rows:
+                    self._keys.append(key)
+                # as when decoding, the last of duplicate keys wins
+                self._rows[key] = (kind, start, end)
+        return self._rows
+
+    def value(self, kind, start, end):
+        """Return value of key of given type at byte range [start, end)."""
+        if kind == 'object':
+            return IndexedObject(self.idx, self.depth + 1, start, end)
+        return stream.read_value(self.idx.f, start, end)
+
+    def keys(self):
+        self.rows()
+        return list(self._keys)
+
+    def items(self):
+        rows = self.rows()
+        return [(key, self.value(*rows[key])) for key in self._keys]
+
+    def __contains__(self, key):
+        return key in self.rows()
+
+    def __getitem__(self, key):
+        return self.value(*self.rows()[key])
+
+    def load(self):
+        """Decode whole object to dict."""
+        return stream.read_value(self.idx.f, self.start, self.end)
+
+    def __repr__(self):
+        return repr(self.load())
@@ -0,0 +1,290 @@
+"""Schema inference and value profiling for jbro (-D, -P).
+
+Summarize the structure of a document in a single pass over its parse
+events, as a tree of paths in the form of shapes: the elements of every
+array share one [*] path, and once all events are added, sibling keys whose
+values are objects of identical key structure are merged into one * path
+(see shapes.collapse).
+
+Each path records the types of its values, how often it is present in its
+parent objects, numeric ranges and string and array lengths, an estimate
+of the number of distinct scalar values (sketch.HyperLogLog), and a few
+example values. When profiling (-P), each path also ranks its most
+frequent scalar values (sketch.TopK). Memory use depends on the number of
+distinct paths, not on the size of the document, and inferences of
+separate documents (e.g. JSON Lines records) can be merged.
+
+The inferred tree can be emitted as an lws schema dict, for validating
+further documents of the same feed.
+"""
+
+import re
+from jsonutils.jbro import pretty, shapes, sketch, stats, stream
+
+EXAMPLES = 3
+EXAMPLE_LEN = 24
+
+TYPES = {'start_map': 'object', 'start_array': 'array', 'string': 'string',
+         'number': 'float', 'boolean': 'boolean', 'null': 'null'}
+TYPE_ORDER = ['object', 'array', 'string', 'integer', 'float', 'boolean',
+              'null']
+PYTHON_TYPES = {'object': dict, 'array': list, 'string': str,
+                'integer': int, 'float': float, 'boolean': bool,
+                'null': type(None)}
+
+# Helpers
+
+def type_name(event, value):
+    """Return inferred type name of value of parse event."""
+    return ('integer' if event == 'number' and isinstance(value, pretty.INTEGER_TYPES) else
+            TYPES[event])
+
+def percent(n, total):
+    """Format n as percentage of total."""
+    return '{:.0f}%'.format(100.0 * n / total) if total else '-'
+
+def span(summary, fmt='{:,d}'):
+    """Format min and max of stats.Summary as a range."""
+    lo, hi = fmt.format(summary.min), fmt.format(summary.max)
+    return lo if lo == hi else lo + ' to ' + hi
+
+def example_str(val):
+    """Format example value as JSON, trimmed."""
+    out = pretty.encode_scalar(val)
+    return out if len(out) <= EXAMPLE_LEN else out[:EXAMPLE_LEN] + '...'
+
+def any_value(val):
+    """lws rule accepting any value, for paths of mixed types."""
+    return True
+
+# Paths
+
+class Field(shapes.Node):
+    """Inferred statistics of all values at one path."""
+
+    __slots__ = ('types', 'numbers', 'strings', 'arrays', 'distinct',
+                 'examples', 'top')
+
+    def __init__(self):
+        super(Field, self).__init__()
+        self.types = {}                 # type name -> count
+        self.numbers = stats.Summary()  # numeric values
+        self.strings = stats.Summary()  # string lengths
+        self.arrays = stats.Summary()   # array lengths
+        self.distinct = None            # sketch.HyperLogLog of scalars
+        self.examples = []              # first distinct scalars
+        self.top = None                 # sketch.TopK of scalars, if profiled
+
+    def add_scalar(self, event, value, profile=False):
+        """Add scalar value of parse event, ranking it if profile."""
+        if event == 'number':
+            self.numbers.add(value)
+        elif event == 'string':
+            self.strings.add(len(value))
+        h = sketch.fingerprint(value)
+        if self.distinct is None:
+            self.distinct = sketch.HyperLogLog()
+        self.distinct.add_hash(h)
+        if profile:
+            if self.top is None:
+                self.top = sketch.TopK()
+            self.top.add_hash(h, value)
+        if len(self.examples) < EXAMPLES and value not in self.examples:
+            self.examples.append(value)
+
+    def update(self, other):
+        """Add statistics of field other, of the same shape, to this one."""
+        self.count += other.count
+        for name, n in other.types.items():
+            self.types[name] = self.types.get(name, 0) + n
+        self.numbers.merge(other.numbers)
+        self.strings.merge(other.strings)
+        self.arrays.merge(other.arrays)
+        if other.distinct is not None:
+            self.distinct = (other.distinct if self.distinct is None else
+                             self.distinct.merge(other.distinct))
+        if other.top is not None:
+            self.top = (other.top if self.top is None else
+                        self.top.merge(other.top))
+        self.examples.extend([val for val in other.examples
+                              if val not in self.examples])
+        del self.examples[EXAMPLES:]
+
+    def describe(self, parent=None, step=None):
+        """Return str describing values of field at step of parent."""
+        names = [name for name in TYPE_ORDER if name in self.types]
+        types = (names[0] if len(names) == 1 else
+                 ', '.join(['{} {}'.format(name, percent(self.types[name],
+                                                         self.count))
+                            for name in names]))
+        parts = [types, 'count {:,d}'.format(self.count)]
+        if (parent is not None and step not in (shapes.ANY_KEY,
+                                                shapes.ANY_INDEX)):
+            parts.append('present ' +
+                         percent(self.count, parent.types.get('object', 0)))
+        if self.distinct is not None:
+            parts.append('~{:,d} distinct'.format(self.distinct_count()))
+        if self.numbers.count:
+            parts.append('range ' + span(self.numbers, '{:,}'))
+        if self.strings.count:
+            parts.append('length ' + span(self.strings))
+        if self.arrays.count:
+            parts.append('items ' + span(self.arrays))
+        if self.examples:
+            parts.append('e.g. ' + ' '.join(example_str(val)
+                                            for val in self.examples))
+        return ', '.join(parts)
+
+    def scalars(self):
+        """Return count of scalar values."""
+        return sum(n for name, n in self.types.items()
+                   if name not in ('object', 'array'))
+
+    def distinct_count(self):
+        """Return estimated count of distinct scalar values, at most the
+        count of scalar values.
+        """
+        return min(self.distinct.estimate(), self.scalars())
+
+# Inference
+
+class Infer(object):
+    """Infer type shapes of all paths from parse events (see module
+    docstring). Several documents may be sent in turn, each starting at the
+    root, as for JSON Lines records.
+    Args
+        profile: bool, rank most frequent values of each path
+    """
+
+    def __init__(self, profile=False):
+        self.profile = profile
+        self.root = Field()
+        self.stack = []     # [field, count of items] of open containers
+
+    def send(self, path, event, value, start, end):
+        if event == 'end_map' or event == 'end_array':
+            field, n = self.stack.pop()
+            if event == 'end_array':
+                field.arrays.add(n)
+            return False
+
+        if path:
+            frame = self.stack[-1]
+            frame[1] += 1
+            step = path[-1]
+            step = shapes.ANY_INDEX if isinstance(step, int) else step
+            field = frame[0].children.get(step)
+            if field is None:
+                field = frame[0].children[step] = Field()
+        else:
+            field = self.root
+        field.count += 1
+        name = type_name(event, value)
+        field.types[name] = field.types.get(name, 0) + 1
+
+        if event == 'start_map' or event == 'start_array':
+            self.stack.append([field, 0])
+        else:
+            field.add_scalar(event, value, self.profile)
+        return False
+
+    def merge(self, other):
+        """Merge Infer of other completed documents into this one."""
+        shapes.merge(self.root, other.root)
+        return self
+
+    def collapse(self):
+        """Merge repeated sibling subtrees, once all events are added."""
+        shapes.collapse(self.root)
+        return self
+
+    def fields(self):
+        """Yield (path, parent field, step, field) of all paths, depth-first
+        in key order, starting with the root.
+        """
+        stack = [('', None, None, self.root)]
+        while stack:
+            prefix, parent, step, field = stack.pop()
+            yield prefix or '(root)', parent, step, field
+            nodes = []
+            for child_step in sorted(field.children):
+                shape = (prefix + child_step
+                         if child_step == shapes.ANY_INDEX or not prefix else
+                         prefix + '.' + child_step)
+                nodes.append((shape, field, child_step,
+                              field.children[child_step]))
+            stack.extend(reversed(nodes))
+
+    def lines(self):
+        """Yield (path, description) of all paths (see fields)."""
+        for path, parent, step, field in self.fields():
+            yield path, field.describe(parent, step)
+
+    def profile_lines(self, k):
+        """Yield (path, distinct count) of all profiled paths with scalar
+        values, each followed by (value, estimated count) of its top k
+        values.
+        """
+        for path, _, _, field in self.fields():
+            if field.top is None:
+                continue
+            n = field.scalars()
+            yield path, '~{:,d} distinct of {:,d} values'.format(
+                field.distinct_count(), n)
+            top = field.top.top(k)
+            for val, est in top:
+                yield ('  ' + example_str(val),
+                       '~{:,d} ({})'.format(est, percent(est, n)))
+            if not top:
+                yield '  -', 'no frequent values'
+
+    def schema(self):
+        """Return lws schema dict of the root object (see schema).
+        Raises ValueError if the root is never an object.
+        """
+        if 'object' not in self.root.types:
+            raise ValueError('Cannot infer lws schema, root is not an object.')
+        return schema(self.root)
+
+def infer_data(data, profile=False):
+    """Return collapsed Infer of in-memory data, in a single traversal."""
+    inferred = Infer(profile)
+    for e in stream.events_from(data):
+        inferred.send(*e)
+    return inferred.collapse()
+
+# lws Schema
+
+def schema_key(step):
+    """Return lws schema key of step: literal key, or any key for *."""
+    return ((step, str, '.*', '*') if step == shapes.ANY_KEY else
+            (step, str, re.escape(step)))
+
+def schema_val(step, field):
+    """Return lws schema value of field with the Python types of its
+    values; any value of mixed types with strings is accepted.
+    """
+    dtypes = tuple(PYTHON_TYPES[name] for name in TYPE_ORDER
+                   if name in field.types)
+    return ((step, dtypes[0]) if len(dtypes) == 1 else
+            (step, dtypes, any_value) if str in dtypes else
+            (step, dtypes))
+
+def schema(root):
+    """Return lws schema dict of the keys of object field root.
+    Paths whose values are always objects become nested schema dicts; all
+    others, including arrays, are leaf values checked by type only.
+    """
+    out = {}
+    stack = [(root, out)]
+    while stack:
+        field, d = stack.pop()
+        for step, child in field.children.items():
+            if step == shapes.ANY_INDEX:
+                continue
+            if list(child.types) == ['object']:
+                sub = d[schema_key(step)] = {}
+                stack.append((child, sub))
+            else:
+                d[schema_key(step)] = schema_val(step, child)
+    return out
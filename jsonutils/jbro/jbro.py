@@ -2,29 +2,76 @@
 # Simple command-line utility for inspecting contents of JSON files
 
 from subprocess import Popen, PIPE
-import json
+import copy
+import errno
+import itertools
+import os
+import pickle
+import sys
+from jsonutils import backend, codec, traverse
+from jsonutils.jbro import (batch, diff, index, infer, jsonl, lazy, parallel,
+                            pretty, query, sampling, shapes, stats, stream)
+
+# files larger than this (bytes) are inspected in streaming mode by default
+STREAM_THRESHOLD = 64 * 2 ** 20
+
+# lazy containers are accepted wherever dicts are
+DICT_TYPES = (dict, lazy.LazyMap)
+LIST_TYPES = (list, lazy.LazyList)
+
+# orders of recursive find (-F)
+ORDERS = ('dfs', 'bfs')
 
 # Helpers
 
-def test_json(filename):
-    """Verify that given filename is valid JSON; if not, return None."""
+def test_json(filename, lazy_load=False):
+    """Verify that given filename is valid JSON; if not, return None.
+    If lazy_load, return memory-mapped lazy root instead of parsed data,
+    unless the file is compressed. Compressed files are decompressed as
+    they are read.
+    """
     try:
-        with open(filename, 'r') as f:
-            data = json.load(f)
+        compressed = codec.detect(filename)
+        if lazy_load and compressed is None:
+            return lazy.load_lazy(filename)
+        with codec.open(filename, compressed) as f:
+            data = backend.load(f)
     except Exception as e:
         print(e)
         data = None
     return data
 
+def file_chars(filename):
+    """Return size of file in bytes, or None if compressed."""
+    return None if codec.detect(filename) else os.path.getsize(filename)
+
+def is_dict(val):
+    """Return True if val is dict or lazy dict."""
+    # the lazy types are ABCs, so check the plain base class first
+    return (isinstance(val, dict) or
+            isinstance(val, lazy.LazyContainer) and
+            isinstance(val, DICT_TYPES))
+
+def is_list(val):
+    """Return True if val is list or lazy list."""
+    return (isinstance(val, list) or
+            isinstance(val, lazy.LazyContainer) and
+            isinstance(val, LIST_TYPES))
+
+def dict_children(d):
+    """Return list of values of d that are dicts."""
+    return [v for v in d.values() if isinstance(v, DICT_TYPES)]
+
 def count_keys(d):
     """Count number of keys in given dict."""
-    return (0 if not isinstance(d, dict) else
-            len(d) + sum(count_keys(v) for v in d.values()))
+    return (0 if not is_dict(d) else
+            sum(len(sub) for _, sub in traverse.dfs(d, dict_children)))
 
 def max_depth(d):
     """Return maximum depth of given dict."""
-    return (0 if not isinstance(d, dict) or len(d) == 0 else
-            1 + max(max_depth(v) for v in d.values()))
+    return (0 if not is_dict(d) else
+            max(depth + 1 if sub else 0
+                for depth, sub in traverse.dfs(d, dict_children)))
 
 def trim(val, n, ellipsis='...'):
     """Trim value to max of n chars."""
@@ -53,178 +100,725 @@ def join_pair(v1, v2, truncate, sep='\t', left=20, max_len=80):
 
 def find_key(d, nested_key):
     """Attempt to find key in dict, where key may be nested key1.key2..."""
-    keys = nested_key.split('.')
-    key = keys[0]
+    return traverse.find(d, nested_key.split('.'), is_dict)
 
-    return (d[key] if len(keys) == 1 and key in d else
-            None if len(keys) == 1 and key not in d else
-            None if not isinstance(d[key], dict) else
-            find_key(d[key], '.'.join(keys[1:])) if key in d else
-            None)
+def iter_key_rec(search_d, search_key, order='dfs', arrays=True):
+    """Yield (path, value) of all occurrences of search_key in data, as they
+    are found, where path is a tuple of keys and list indexes. Found values
+    are not searched further.
+    Args
+        search_d: dict to search
+        search_key: str of key to find
+        order: 'dfs' for document order, or 'bfs' for shallowest first
+        arrays: bool, also search within lists
+    """
+    return traverse.iter_key_rec(search_d, search_key, is_dict,
+                                 is_list if arrays else lambda val: False,
+                                 order)
 
 def find_key_rec(search_d, search_key):
-    """Attempt to find all search_key (BFS) in dict, return value and level."""
-    hits = []
-    dicts = [(0, search_d)]
+    """Attempt to find all search_key (DFS) in dict, return value and level.
+    Lists are not searched.
+    """
+    return [(len(path) - 1, val)
+            for path, val in iter_key_rec(search_d, search_key, arrays=False)]
 
-    while dicts:
-        level, d = dicts.pop()
-        for key in d:
-            if key == search_key:
-                hits.append((level, d[key]))
-            else:
-                if isinstance(d[key], dict):
-                    dicts.append((level + 1, d[key]))
+def iter_all_keys(search_d):
+    """Yield all keys in dict (DFS) in format key1.key2..., as they are
+    found, with the keys of each dict in sorted order.
+    """
+    def children(parent, d):
+        return [(key if parent == '' else '.'.join([parent, key]), d[key])
+                for key in sorted(d.keys(), reverse=True)]
 
-    return hits
+    stack = children('', search_d)
+    while stack:
+        full_key, val = stack.pop()
+        yield full_key
+        if is_dict(val):
+            stack.extend(children(full_key, val))
 
 def get_all_keys(search_d):
-    """Retrieve all keys in dict (BFS) in format key1.key2..."""
-    keys = []
-    dicts = [('', search_d)]
+    """Retrieve all keys in dict (DFS) in format key1.key2..."""
+    return list(iter_all_keys(search_d))
 
-    while dicts:
-        parent, d = dicts.pop()
-        for key in sorted(d.keys()):
-            full_key = key if parent == '' else '.'.join([parent, key])
-            keys.append(full_key)
-            if isinstance(d[key], dict):
-                dicts.append((full_key, d[key]))
+def key_shapes(data):
+    """Return shapes.Shapes of all key paths in data, collapsed."""
+    return shapes.Shapes().add_data(data, is_dict, is_list).collapse()
 
-    return keys
+# Output Helpers
 
-# Inspection Functions
+def header(msg, quiet):
+    """Print description of output, or blank line if quiet."""
+    print('' if quiet else '\n> ' + msg)
+
+def print_describe(data_stats, chars=None):
+    """Print structure description from stats.Stats."""
+    for label, val in data_stats.lines(chars):
+        print('{:<14} {}'.format(label, val))
 
-def describe(data, quiet):
-    """Describe structure of data."""
-    if not quiet:
-        print('\n> Describe structure of file')
+def print_pairs(pairs, truncate):
+    """Print (key, value) pairs, one per line."""
+    print('\n'.join([join_pair(key, val, truncate) for key, val in pairs]))
+
+def print_val(val, truncate):
+    """Print found value, or not found message if None."""
+    if val is not None:
+        if truncate:
+            print(trim(val, 80))
+        elif is_dict(val):
+            print(backend.dumps(val, indent=2, sort_keys=True,
+                                default=lazy.materialize))
+        else:
+            print(val)
     else:
-        print('')
+        print('Key not found.')
+
+def print_path(path, val, truncate):
+    """Print value with its path."""
+    print(join_pair(stats.path_str(path), val, truncate))
+
+def print_hit(key, path, val, truncate):
+    """Print hit of batch lookup, with path if recursive."""
+    print(join_pair(key if path is None else stats.path_str(path), val,
+                    truncate))
+
+def print_missing(trie, found, truncate):
+    """Print keys of batch lookup trie without hits."""
+    for key, recursive in batch.missing(trie, found):
+        print(join_pair(key + (' (recursive)' if recursive else ''),
+                        'Key not found.', truncate))
+
+def print_matches(matches, truncate, missing='No matches found.'):
+    """Print (path, value) pairs of iterable of matches as they are found,
+    or missing message if there are none.
+    """
+    n = 0
+    for n, (path, val) in enumerate(matches, 1):
+        print_path(path, val, truncate)
+    if not n:
+        print(missing)
+
+def print_keys(keys, truncate):
+    """Print iterable of keys, one per line, as they are produced."""
+    lines = ((trim(key, 80) if truncate else str(key)) + '\n'
+             for key in keys)
+    first = next(lines, None)
+    if first is not None:
+        write_chunks(sys.stdout, itertools.chain([first], lines))
+    else:
+        print('Empty file.')
 
-    print('Top-level keys {:,d}'.format(len(data)))
-    print('Total keys     {:,d}'.format(count_keys(data)))
-    print('Max depth      {:,d}'.format(max_depth(data)))
-    print('Total chars    {:,d}'.format(len(json.dumps(data))))
+def print_key(key, truncate):
+    """Print key."""
+    print(trim(key, 80) if truncate else key)
 
+def print_shapes(trie, truncate):
+    """Print (shape, count) of collapsed shapes.Shapes, one per line."""
+    print_pairs([(shape, '{:,d}'.format(n)) for shape, n in trie.lines()],
+                truncate)
+
+def print_inferred(inferred, truncate):
+    """Print (path, description) of collapsed infer.Infer, one per line."""
+    print_pairs(inferred.lines(), truncate)
+
+def print_profile(inferred, k, truncate):
+    """Print distinct counts and top k values of profiled infer.Infer."""
+    print_pairs(inferred.profile_lines(k), truncate)
+
+def write_schema(inferred, filename):
+    """Pickle lws schema of infer.Infer to filename, return True if written.
+    """
+    try:
+        schema = inferred.schema()
+        with open(filename, 'wb') as f:
+            pickle.dump(schema, f)
+    except (ValueError, IOError) as e:
+        print(e)
+        return False
+    print('\nWrote lws schema {}'.format(filename))
     return True
 
-def sample(data, n, quiet, truncate):
-    """Sample first n (key, value) pairs of file."""
-    if not quiet:
-        print('\n> Sample first {:,d} (key, value) pairs from file'.format(n))
+def diff_str(val):
+    """Format value of diff as compact JSON."""
+    return backend.dumps(val, default=lazy.materialize)
+
+def print_diff(diffs, truncate):
+    """Print (op, path, old, new) differences of iterable as they are found,
+    followed by their counts, or a message if there are none.
+    """
+    counts = dict((op, 0) for op in diff.OPS)
+    for op, path, old, new in diffs:
+        counts[op] += 1
+        val = (diff_str(new) if op == diff.ADDED else
+               diff_str(old) if op == diff.REMOVED else
+               diff_str(old) + ' -> ' + diff_str(new))
+        print(join_pair(op + ' ' + stats.path_str(path), val, truncate))
+    if any(counts.values()):
+        print('\n{:,d} added, {:,d} removed, {:,d} changed'.format(
+            counts[diff.ADDED], counts[diff.REMOVED], counts[diff.CHANGED]))
     else:
-        print('')
+        print('No differences.')
 
-    keys = sorted(data.keys())[:n]
-    pairs = [join_pair(key, data[key], truncate) for key in keys]
-    print('\n'.join(pairs))
+# Inspection Functions
+
+def describe(data, quiet, chars=None):
+    """Describe structure of data, computing all statistics in one pass.
+    Total chars is given by chars (e.g. file size) if provided; otherwise
+    data is serialized to count them.
+    """
+    header('Describe structure of file', quiet)
+    if chars is None:
+        chars = len(backend.dumps(data, default=lazy.materialize))
+    print_describe(stats.describe_data(data), chars)
+    return True
+
+def infer_shapes(inferred, quiet, truncate, schema_file=None, what='data'):
+    """Print types and statistics of all paths of collapsed infer.Infer,
+    and write lws schema to schema_file if given.
+    """
+    header('Infer type shapes of ' + what, quiet)
+    print_inferred(inferred, truncate)
+    return write_schema(inferred, schema_file) if schema_file else True
+
+def profile_values(inferred, k, quiet, truncate, what='data'):
+    """Print estimated distinct counts and top k values of all paths of
+    collapsed infer.Infer, built with profile.
+    """
+    header('Profile top {:,d} values of {}'.format(k, what), quiet)
+    print_profile(inferred, k, truncate)
+    return True
+
+def sample_msg(n, mode):
+    """Return description of sample."""
+    return ('Sample {:,d} random (key, value) pairs from file'.format(n)
+            if mode == 'random' else
+            'Sample first {:,d} (key, value) pairs from file'.format(n))
+
+def sample(data, n, quiet, truncate, mode='sorted'):
+    """Sample n (key, value) pairs of file, selected by mode: the smallest
+    keys, the first keys in file order, or random keys.
+    """
+    header(sample_msg(n, mode), quiet)
+    keys = sampling.select(iter(data), n, mode)
+    print_pairs([(key, data[key]) for key in keys], truncate)
     return True
 
 def get_chars(data, n, quiet):
-    """Print first n chars of file."""
-    if not quiet:
-        print('\n> Show first {:,d} chars of file'.format(n))
-    else:
-        print('')
+    """Print first n chars of file, pretty printing no further than n."""
+    header('Show first {:,d} chars of file'.format(n), quiet)
 
-    data_str = json.dumps(data, indent=2, sort_keys=True)
-    print(data_str[:n])
+    chunks = pretty.iter_pretty(data, indent=2, sort_keys=True)
+    print(pretty.take(chunks, n))
     return True
 
 def find(data, key, quiet, truncate):
     """Attempt to find key in dict, where key nesting in form key1.key2..."""
-    if not quiet:
-        print('\n> Find key {} in data'.format(key))
-    else:
-        print('')
+    header('Find key {} in data'.format(key), quiet)
+    print_val(find_key(data, key), truncate)
+    return True
+
+def find_rec(data, key, quiet, truncate, order='dfs', limit=None):
+    """Find key recursively in data, printing each occurrence with its path
+    as it is found, stopping after limit occurrences if given.
+    """
+    header('Find key {} recursively in data'.format(key), quiet)
+    hits = itertools.islice(iter_key_rec(data, key, order), limit)
+    print_matches(hits, truncate, 'Key not found.')
+    return True
 
-    val = find_key(data, key)
+def batch_msg(nested_keys, keys):
+    """Return description of batch lookup."""
+    return 'Find {:,d} keys in data'.format(len(nested_keys) + len(keys))
 
-    if val is not None:
-        if truncate:
-            print(trim(val, 80))
-        elif isinstance(val, dict):
-            print(json.dumps(val, indent=2, sort_keys=True))
-        else:
-            print(val)
-    else:
-        print('Key not found.')
+def find_batch(data, nested_keys, keys, quiet, truncate, order='dfs',
+               limit=None, is_map=is_dict):
+    """Find nested keys and recursive keys together in one traversal,
+    printing hits as they are found, and at most limit occurrences of each
+    recursive key if given. is_map returns True for the objects of data.
+    """
+    header(batch_msg(nested_keys, keys), quiet)
+    trie = batch.Trie(nested_keys, keys, limit)
+    found = set()
+    for key, path, val in batch.resolve(data, trie, is_map, is_list,
+                                        order):
+        found.add((key, path is not None))
+        print_hit(key, path, val, truncate)
+    print_missing(trie, found, truncate)
     return True
 
-def find_rec(data, key, quiet, truncate):
-    """Find key recursively in data, return all occurences."""
-    if not quiet:
-        print('\n> Find key {} recursively in data'.format(key))
-    else:
-        print('')
+def select(data, text, quiet, truncate):
+    """Print (path, value) of all values matching path query text."""
+    header('Query {} in data'.format(text), quiet)
+    print_matches(query.compile(text).find_all(data), truncate)
+    return True
 
-    vals = find_key_rec(data, key)
-    if vals is not []:
-        found = [join_pair('Level {:,d}'.format(lvl), val, truncate)
-                 for lvl, val in vals]
-        print('\n'.join(found))
+def get_keys(data, recursive, quiet, truncate, unique=False):
+    """List all top-level keys in data, or all keys if recursive. If unique,
+    list unique key shapes with counts instead of all keys.
+    """
+    header(keys_msg(recursive, unique), quiet)
+    if recursive and unique:
+        print_shapes(key_shapes(data), truncate)
     else:
-        print('Key not found.')
+        print_keys(iter_all_keys(data) if recursive else sorted(data.keys()),
+                   truncate)
+    return
+
+def keys_msg(recursive, unique=False):
+    """Return description of key listing."""
+    return ('List unique key shapes in data.' if recursive and unique else
+            'List all keys in data.' if recursive else
+            'List top-level keys in data.')
+
+def write_chunks(out, chunks, encode=False):
+    """Write iterable of str chunks to file object out in batches.
+    Writing stops early if the reader closes the pipe.
+    """
+    try:
+        for chunk in pretty.batched(chunks):
+            out.write(chunk.encode() if encode else chunk)
+        out.flush()
+    except IOError as e:
+        if not is_broken_pipe(e): raise
+        return False
+    return True
+
+def is_broken_pipe(e):
+    """Return True if IOError e was raised as the reader closed the pipe."""
+    return e.errno in (errno.EPIPE, errno.EINVAL)
+
+def less(chunks):
+    """Pipe iterable of str chunks to less, as they are produced."""
+    p = Popen('less', stdin=PIPE, bufsize=0)
+    write_chunks(p.stdin, chunks, encode=True)
+    p.stdin.close()
+    p.wait()
     return True
 
-def get_keys(data, recursive, quiet, truncate):
-    """List all top-level keys in data."""
-    if not quiet:
-        if recursive:
-            print('\n> List all keys in data.')
+def page(data):
+    """Pretty print JSON to less if stdout is a terminal, else to stdout."""
+    chunks = pretty.iter_pretty(data, indent=2, sort_keys=True)
+    return (less(chunks) if sys.stdout.isatty() else
+            write_chunks(sys.stdout, itertools.chain(chunks, ['\n'])))
+
+# Streaming
+
+def use_stream(filename, force=False):
+    """Return True if file should be inspected in streaming mode."""
+    try:
+        return force or os.path.getsize(filename) > STREAM_THRESHOLD
+    except OSError:
+        return False
+
+def main_stream(args):
+    """Process args from argparse in a single streaming pass over the file.
+    Describe, sample, find, query and key listings are computed together
+    without loading the file; chars and less read the file lazily.
+    """
+    c = {}
+    if args.describe: c['describe'] = stats.Stats()
+    if args.infer or args.profile: c['infer'] = infer.Infer(args.profile)
+    if args.sample:
+        c['sample'] = stream.Sample(args.sample, args.sample_mode)
+    if is_batch(args):
+        header(batch_msg(args.find, args.find_recursive), args.quiet)
+        trie = batch.Trie(args.find, args.find_recursive, args.limit)
+
+        def emit(key, path, val):
+            print_hit(key, path, val, args.truncate)
+
+        c['batch'] = stream.Lookup(trie, emit)
+    elif args.find:
+        c['find'] = stream.Find(args.find[0])
+    elif args.find_recursive:
+        # hits are printed during the pass, in file order
+        header('Find key {} recursively in data'
+               .format(args.find_recursive[0]), args.quiet)
+        c['find_rec'] = stream.FindAll(
+            args.find_recursive[0], args.limit,
+            lambda path, val: print_path(path, val, args.truncate))
+    if args.query: c['query'] = stream.Query(query.compile(args.query))
+    if args.keys: c['keys'] = stream.TopKeys()
+    if args.keys_recursive and args.unique:
+        c['keys_rec'] = stream.KeyShapes(shapes.Shapes())
+    elif args.keys_recursive and not (is_batch(args) or args.find_recursive):
+        # keys are printed during the pass, unless find hits are
+        header(keys_msg(True), args.quiet)
+        c['keys_live'] = stream.AllKeys(
+            lambda key: print_key(key, args.truncate))
+    elif args.keys_recursive:
+        c['keys_rec'] = stream.AllKeys()
+
+    try:
+        with codec.open(args.filename) as f:
+            stream.run(f, c.values())
+    except codec.ERRORS as e:
+        # hits are printed during the pass; a closed stdout ends it (see main)
+        if isinstance(e, IOError) and is_broken_pipe(e): raise
+        print(e)
+        return False
+
+    if 'batch' in c:
+        print_missing(trie, c['batch'].found, args.truncate)
+    if 'find_rec' in c and not c['find_rec'].count:
+        print('Key not found.')
+    if 'keys_live' in c and not c['keys_live'].count:
+        print('Empty file.')
+    if args.describe:
+        header('Describe structure of file', args.quiet)
+        print_describe(c['describe'], file_chars(args.filename))
+    if 'infer' in c:
+        c['infer'].collapse()
+    if args.infer:
+        infer_shapes(c['infer'], args.quiet, args.truncate, args.schema)
+    if args.profile:
+        profile_values(c['infer'], args.top, args.quiet, args.truncate)
+    if args.sample:
+        header(sample_msg(args.sample, args.sample_mode), args.quiet)
+        # sampled values are read back in file order, in a second pass if
+        # the file is compressed
+        with codec.open(args.filename) as f:
+            print_pairs(c['sample'].pairs(f), args.truncate)
+
+    if 'find' in c:
+        header('Find key {} in data'.format(args.find[0]), args.quiet)
+        print_val(c['find'].value, args.truncate)
+    if args.query:
+        header('Query {} in data'.format(args.query), args.quiet)
+        print_matches(c['query'].hits, args.truncate)
+    if args.keys:
+        header(keys_msg(False), args.quiet)
+        print_keys(sorted(c['keys'].keys), args.truncate)
+    if 'keys_rec' in c:
+        header(keys_msg(True, args.unique), args.quiet)
+        if args.unique:
+            print_shapes(c['keys_rec'].shapes.collapse(), args.truncate)
         else:
-            print('\n> List top-level keys in data.')
+            print_keys(c['keys_rec'].keys, args.truncate)
+
+    print('\n')
+
+    if args.chars or args.less:
+        # lazy root: only as much of the file as is printed is decoded
+        data = test_json(args.filename, lazy_load=True)
+        if data is None: return False
+        try:
+            if args.chars:
+                get_chars(data, args.chars, args.quiet)
+            if args.less:
+                page(data)
+        except ValueError as e:
+            return lazy_error(e)
+
+    return True
+
+# Indexed Lookups
+
+def index_key_rec(idx, key, order='dfs', limit=None):
+    """Return iterable of (path, value) of occurrences of key in indexed
+    file, as iter_key_rec, stopping after limit occurrences if given.
+    Arrays are decoded and searched, as their keys are not indexed.
+    """
+    hits = idx.iter_key_rec(key, iter_key_rec)
+    if order == 'bfs':
+        # occurrences are read in file order; shallowest first is a stable
+        # sort of them by depth
+        hits = sorted(hits, key=lambda hit: len(hit[0]))
+    return itertools.islice(hits, limit)
+
+def is_indexed_dict(val):
+    """Return True if val is dict or index.IndexedObject."""
+    return isinstance(val, (dict, index.IndexedObject))
+
+def main_index(args):
+    """Process find and recursive key args from argparse using the index.
+    Builds or refreshes the index as needed. Returns copy of args with the
+    indexed options cleared, or None on error. Compressed files are not
+    indexed, as values cannot be read back at random offsets; args are
+    returned as is.
+    """
+    if codec.detect(args.filename):
+        print('\nIndex (-I) is not supported for compressed files.')
+        return args
+    try:
+        idx = index.Index(args.filename)
+    except (ValueError, OSError) as e:
+        print(e)
+        return None
+
+    with idx:
+        if idx.built and not args.quiet:
+            print('\n> Built index {}'.format(idx.db_path))
+        if is_batch(args):
+            # objects are listed from the index as the traversal reaches
+            # them, so hits and their order are those of find_batch
+            find_batch(idx.root(), args.find, args.find_recursive,
+                       args.quiet, args.truncate, args.order, args.limit,
+                       is_indexed_dict)
+        elif args.find:
+            header('Find key {} in data'.format(args.find[0]), args.quiet)
+            print_val(idx.find_key(args.find[0]), args.truncate)
+        elif args.find_recursive:
+            key = args.find_recursive[0]
+            header('Find key {} recursively in data'.format(key), args.quiet)
+            print_matches(index_key_rec(idx, key, args.order, args.limit),
+                          args.truncate, 'Key not found.')
+        if args.keys_recursive and not args.unique:
+            header(keys_msg(True), args.quiet)
+            print_keys(idx.get_all_keys(), args.truncate)
+
+    rest = copy.copy(args)
+    rest.find, rest.find_recursive = [], []
+    rest.keys_recursive = args.keys_recursive and args.unique
+    return rest
+
+# Diff
+
+def main_diff(args):
+    """Compare the two files of the diff arg from argparse, printing paths
+    added (+), removed (-) and changed (~). Compares byte ranges recorded in
+    the index if requested; otherwise both files are loaded, lazily if
+    requested.
+    """
+    old, new = args.diff
+    compressed = codec.detect(old) or codec.detect(new)
+    if args.index and compressed:
+        print('\nIndex (-I) is not supported for compressed files.')
+    if args.index and not compressed:
+        try:
+            with index.Index(old) as idx_a, index.Index(new) as idx_b:
+                for idx in (idx_a, idx_b):
+                    if idx.built and not args.quiet:
+                        print('\n> Built index {}'.format(idx.db_path))
+                header('Diff {} and {}'.format(old, new), args.quiet)
+                print_diff(diff.diff_index(idx_a, idx_b), args.truncate)
+        except (ValueError, OSError) as e:
+            if isinstance(e, OSError) and is_broken_pipe(e): raise
+            print(e)
+            return False
     else:
-        print('')
+        a, b = test_json(old, args.lazy), test_json(new, args.lazy)
+        if a is None or b is None: return False
+        header('Diff {} and {}'.format(old, new), args.quiet)
+        try:
+            print_diff(diff.diff(a, b), args.truncate)
+        except ValueError as e:
+            return lazy_error(e)
 
-    keys = get_all_keys(data) if recursive else sorted(data.keys())
-    if keys is not []:
-        if truncate:
-            print('\n'.join([trim(key, 80) for key in keys]))
+    print('\n')
+    return True
+
+# JSON Lines
+
+def print_key_paths(paths, truncate):
+    """Print (path, count, max depth) of aggregated keys, one per line."""
+    print_pairs([('.'.join(path),
+                  '{:,d} records, max depth {:,d}'.format(n, depth))
+                 for path, n, depth in paths], truncate)
+
+def main_jsonl(args):
+    """Process args from argparse for JSON Lines file, one record per line.
+    Describe, find recursive and key listings are aggregated across records
+    in a single pass, split across processes if workers are given.
+    """
+    options = dict(keys=args.keys or args.keys_recursive,
+                   describe=args.describe, infer=args.infer,
+                   profile=args.profile,
+                   find=(args.find_recursive or [None])[0])
+    try:
+        agg = (jsonl.scan(args.filename, jsonl.Aggregate(**options))
+               if args.workers is None else
+               parallel.scan(args.filename, args.workers, **options))
+    except codec.ERRORS as e:
+        print(e)
+        return False
+
+    if args.describe:
+        header('Describe structure of records', args.quiet)
+        print('{:<14} {:,d}'.format('Records', agg.records))
+        print('{:<14} {:,d}'.format('Invalid', agg.invalid))
+        print_describe(agg.stats, file_chars(args.filename))
+    if agg.infer is not None:
+        agg.infer.collapse()
+    if args.infer:
+        infer_shapes(agg.infer, args.quiet, args.truncate, args.schema,
+                     'records')
+    if args.profile:
+        profile_values(agg.infer, args.top, args.quiet, args.truncate,
+                       'records')
+    if args.find_recursive:
+        header('Find key {} recursively in records'
+               .format(args.find_recursive[0]), args.quiet)
+        if agg.patterns:
+            print_pairs([(pattern, '{:,d} hits'.format(agg.patterns[pattern]))
+                         for pattern in sorted(agg.patterns)], args.truncate)
+            print_pairs([('Line {:,d}, {}'.format(line_no,
+                                                  stats.path_str(path)),
+                          val) for line_no, path, val in agg.hits],
+                        args.truncate)
         else:
-            print('\n'.join([str(key) for key in keys]))
-    else:
-        print('Empty file.')
-    return
+            print('Key not found.')
+    if args.keys:
+        header('List top-level keys in records.', args.quiet)
+        print_key_paths([p for p in agg.key_paths() if len(p[0]) == 1],
+                        args.truncate)
+    if args.keys_recursive:
+        header('List all keys in records.', args.quiet)
+        print_key_paths(agg.key_paths(), args.truncate)
 
-def less(data_str):
-    """Pretty print JSON and pipe to less."""
-    p = Popen('less', stdin=PIPE)
-    p.stdin.write(data_str.encode())
-    p.stdin.close()
-    p.wait()
+    unsupported = [args.sample, args.chars, args.find, args.query, args.less,
+                   args.find_recursive[1:], args.limit, args.order != 'dfs']
+    if any(unsupported):
+        print('\nOnly -d, -D, -P, -F (one key, without -o or -n), -k and -K '
+              'are supported for JSON Lines.')
+
+    print('\n')
     return True
 
 # Main
 
+def as_list(val):
+    """Return list of str or list arg, empty if None."""
+    return [val] if isinstance(val, str) else list(val or [])
+
+def read_keys(filename):
+    """Return nested keys listed in file, one per line. Blank lines and
+    lines starting with # are skipped.
+    """
+    with open(filename) as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line and not line.startswith('#')]
+
+def is_batch(args):
+    """Return True if several keys are to be found together."""
+    return len(args.find) + len(args.find_recursive) > 1
+
+def inspect_args(args):
+    """Return list of inspection args from argparse."""
+    return [args.describe, args.infer, args.profile, args.sample, args.chars,
+            args.find, args.find_recursive, args.query, args.keys,
+            args.keys_recursive]
+
+def is_full_traversal(args):
+    """Return True if inspection args from argparse traverse the whole
+    document: describe, infer, profile, sample, recursive find and key
+    listing, queries with recursive descent (..), and paging the file.
+    Lazy documents are loaded in full for these instead, as traversing
+    them decodes each container once per enclosing container.
+    """
+    return (any([args.describe, args.infer, args.profile, args.sample,
+                 args.find_recursive, args.keys_recursive, args.less]) or
+            bool(args.query) and '..' in args.query or
+            not any(inspect_args(args)))
+
 def main(args):
-    """Process args from argparse."""
-    data = test_json(args.filename)
-    if not data: return False
+    """Process args from argparse. If the reader of stdout closes the pipe,
+    e.g. head, output stops quietly.
+    """
+    try:
+        ok = run(args)
+        sys.stdout.flush()
+    except IOError as e:
+        if not is_broken_pipe(e): raise
+        # later writes, including the flush at exit, would fail again
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return False
+    return ok
+
+def run(args):
+    """Process args from argparse, dispatching by mode."""
+    if args.backend:
+        try:
+            backend.use(args.backend)
+        except ValueError as e:
+            print(e)
+            return False
+
+    args.infer = args.infer or bool(args.schema)
+    args.find = as_list(args.find)
+    args.find_recursive = as_list(args.find_recursive)
+    if getattr(args, 'find_file', None):
+        try:
+            args.find = args.find + read_keys(args.find_file)
+        except IOError as e:
+            print(e)
+            return False
+
+    if args.query:
+        try:
+            query.compile(args.query)
+        except ValueError as e:
+            print(e)
+            return False
+
+    if getattr(args, 'diff', None):
+        return main_diff(args)
+
+    if args.jsonl or jsonl.is_jsonl(args.filename):
+        return main_jsonl(args)
+
+    if args.index:
+        args = main_index(args)
+        if args is None: return False
+        if not any(inspect_args(args)) and not args.less:
+            print('\n')
+            return True
+
+    if (any(inspect_args(args)) and not args.lazy and
+            use_stream(args.filename, args.stream)):
+        return main_stream(args)
+
+    data = test_json(args.filename,
+                     args.lazy and not is_full_traversal(args))
+    if data is None or not (args.lazy or data): return False
+    try:
+        return inspect(data, args)
+    except ValueError as e:
+        return lazy_error(e)
+
+def lazy_error(e):
+    """Print error e raised while decoding a lazy document; return False.
+    Lazy documents are only decoded as far as they are inspected, so that
+    invalid JSON is found after test_json has returned.
+    """
+    print('\n{}'.format(e))
+    return False
 
+def inspect(data, args):
+    """Process inspection args from argparse on loaded or lazy data."""
     if args.describe:
-        describe(data, args.quiet)
+        describe(data, args.quiet, file_chars(args.filename))
+    if args.infer or args.profile:
+        inferred = infer.infer_data(data, args.profile)
+        if args.infer:
+            infer_shapes(inferred, args.quiet, args.truncate, args.schema)
+        if args.profile:
+            profile_values(inferred, args.top, args.quiet, args.truncate)
     if args.sample:
-        sample(data, args.sample, args.quiet, args.truncate)
+        sample(data, args.sample, args.quiet, args.truncate,
+               args.sample_mode)
     if args.chars:
         get_chars(data, args.chars, args.quiet)
-    if args.find:
-        find(data, args.find, args.quiet, args.truncate)
-    if args.find_recursive:
-        find_rec(data, args.find_recursive, args.quiet, args.truncate)
+    if is_batch(args):
+        find_batch(data, args.find, args.find_recursive, args.quiet,
+                   args.truncate, args.order, args.limit)
+    elif args.find:
+        find(data, args.find[0], args.quiet, args.truncate)
+    elif args.find_recursive:
+        find_rec(data, args.find_recursive[0], args.quiet, args.truncate,
+                 args.order, args.limit)
+    if args.query:
+        select(data, args.query, args.quiet, args.truncate)
     if args.keys:
         get_keys(data, False, args.quiet, args.truncate)
     if args.keys_recursive:
-        get_keys(data, True, args.quiet, args.truncate)
+        get_keys(data, True, args.quiet, args.truncate, args.unique)
 
     print('\n')
 
-    other_args = [args.describe, args.sample, args.chars, args.find,
-                  args.find_recursive, args.keys, args.keys_recursive]
-    if args.less or not any(other_args):
-        data_str = json.dumps(data, indent=2, sort_keys=True)
-        print(data_str)
-        less(data_str)
+    if args.less or not any(inspect_args(args)):
+        page(data)
 
     return True
@@ -0,0 +1,184 @@
+"""JSON Lines (NDJSON) batch mode for jbro.
+
+Stream records one line at a time and aggregate key, structure and search
+results across records, so that memory use depends on the number of
+distinct key paths rather than the number of lines.
+"""
+
+import os
+from jsonutils import backend, codec, traverse
+from jsonutils.jbro import shapes, stats, stream
+from jsonutils.jbro.infer import Infer
+
+EXTENSIONS = ('.jsonl', '.ndjson', '.jsonlines')
+EXAMPLES = 10
+
+# Helpers
+
+def is_jsonl(filename):
+    """Return True if filename has a JSON Lines extension, possibly followed
+    by a compression extension.
+    """
+    name = codec.strip_extension(filename)
+    return os.path.splitext(name)[1].lower() in EXTENSIONS
+
+def iter_lines(f):
+    """Yield (line number, bytes) of all lines in binary file f."""
+    return enumerate(f, 1)
+
+def iter_range(f, start, end):
+    """Yield (line number, bytes) of lines starting in byte range
+    [start, end) of binary file f, numbered from 1 at start.
+    """
+    f.seek(start)
+    pos = start
+    for i, line in enumerate(f, 1):
+        if pos >= end:
+            break
+        pos += len(line)
+        yield i, line
+
+def key_children(node):
+    """Return (path, value) children of (path, value) node of dict value."""
+    path, val = node
+    return ([(path + (k,), v) for k, v in val.items()]
+            if isinstance(val, dict) else [])
+
+def key_depths(record):
+    """Return list of (path, depth) for all keys reachable through dicts,
+    where depth is jbro.max_depth of the value at path.
+    """
+    nodes = [node for _, node in traverse.dfs(((), record), key_children)]
+    depths = {}
+    # reverse pre-order visits children before their parent
+    for path, val in reversed(nodes):
+        depths[path] = (1 + max(depths[path + (k,)] for k in val)
+                        if isinstance(val, dict) and val else 0)
+    return [(path, depths[path]) for path, _ in nodes if path]
+
+def find_hits(record, key):
+    """Return (path, value) of all occurrences of key in record, in record
+    order. As with jbro.iter_key_rec, lists are searched but found values
+    are not.
+    """
+    return list(traverse.iter_key_rec(
+        record, key, lambda val: isinstance(val, dict),
+        lambda val: isinstance(val, list)))
+
+def pattern_str(path):
+    """Format path as key1.key2[*]..., with list indexes collapsed, so that
+    hits in every element of a list are counted together.
+    """
+    out = ''
+    for step in path:
+        out += (shapes.ANY_INDEX if isinstance(step, int) else
+                step if not out else
+                '.' + step)
+    return out
+
+# Aggregation
+
+class Aggregate(object):
+    """Aggregate results across records.
+    Args
+        keys: bool, count occurrences and max depth of each key path
+        describe: bool, accumulate stats.Stats over all records
+        infer: bool, accumulate infer.Infer over all records
+        profile: bool, also rank most frequent values (implies infer)
+        find: str of key to find recursively, or None
+        examples: int of example hits to keep
+    """
+
+    def __init__(self, keys=False, describe=False, find=None,
+                 examples=EXAMPLES, infer=False, profile=False):
+        self.lines, self.records, self.invalid = 0, 0, 0
+        self.paths = {} if keys else None     # path -> [count, max depth]
+        self.stats = stats.Stats() if describe else None
+        self.infer = Infer(profile) if infer or profile else None
+        self.find = find
+        self.patterns = {}                    # pattern_str -> count of hits
+        self.hits = []                        # (line, path, value)
+        self.examples = examples
+
+    def add(self, line_no, record):
+        """Add decoded record from given line number."""
+        self.records += 1
+
+        if self.paths is not None:
+            for path, depth in key_depths(record):
+                entry = self.paths.get(path)
+                if entry is None:
+                    self.paths[path] = [1, depth]
+                else:
+                    entry[0] += 1
+                    entry[1] = max(entry[1], depth)
+
+        if self.stats is not None or self.infer is not None:
+            for e in stream.events_from(record):
+                if self.stats is not None: self.stats.send(*e)
+                if self.infer is not None: self.infer.send(*e)
+
+        if self.find is not None:
+            for path, val in find_hits(record, self.find):
+                pattern = pattern_str(path)
+                self.patterns[pattern] = self.patterns.get(pattern, 0) + 1
+                if len(self.hits) < self.examples:
+                    self.hits.append((line_no, path, val))
+
+    def add_line(self, line_no, line):
+        """Decode and add line, counting it as invalid if not valid JSON.
+        Blank lines are skipped.
+        """
+        self.lines = line_no
+        if not line.strip():
+            return
+        try:
+            record = backend.loads(line)
+        except ValueError:
+            self.invalid += 1
+            return
+        self.add(line_no, record)
+
+    def merge(self, other):
+        """Merge aggregate of the lines following this one's into this one.
+        Line numbers of the other's hits are offset by this one's lines.
+        """
+        if self.paths is not None:
+            for path, (n, depth) in other.paths.items():
+                entry = self.paths.get(path)
+                if entry is None:
+                    self.paths[path] = [n, depth]
+                else:
+                    entry[0] += n
+                    entry[1] = max(entry[1], depth)
+        if self.stats is not None:
+            self.stats.merge(other.stats)
+        if self.infer is not None:
+            self.infer.merge(other.infer)
+        for pattern, n in other.patterns.items():
+            self.patterns[pattern] = self.patterns.get(pattern, 0) + n
+        room = self.examples - len(self.hits)
+        self.hits.extend([(self.lines + line_no, path, val)
+                          for line_no, path, val in other.hits[:room]])
+
+        self.lines += other.lines
+        self.records += other.records
+        self.invalid += other.invalid
+        return self
+
+    def key_paths(self):
+        """Return sorted list of (path, count, max depth)."""
+        return sorted((path, n, depth)
+                      for path, (n, depth) in self.paths.items())
+
+def scan(filename, aggregate, start=0, end=None):
+    """Add lines of JSON Lines file to aggregate, return aggregate.
+    If end is given, only lines starting in byte range [start, end) are
+    added, numbered from 1 at start; otherwise the file may be compressed.
+    """
+    with (codec.open(filename) if end is None else
+          open(filename, 'rb')) as f:
+        lines = iter_lines(f) if end is None else iter_range(f, start, end)
+        for line_no, line in lines:
+            aggregate.add_line(line_no, line)
+    return aggregate
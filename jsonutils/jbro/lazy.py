@@ -0,0 +1,218 @@
+"""Memory-mapped lazy JSON documents for jbro.
+
+Map a JSON file into memory and expose its objects and arrays as read-only
+dict-like and list-like containers that decode children on demand. Looking
+up a key scans the enclosing object only as far as that key, skipping
+unrelated values by bracket and quote matching without building Python
+objects for them. A point lookup therefore costs roughly the bytes skipped,
+rather than allocation of the whole document.
+
+Lazy containers can be passed to the jbro helpers in place of dicts.
+"""
+
+import mmap
+import re
+from jsonutils import backend
+from jsonutils.jbro import stream
+
+try:
+    from collections.abc import Mapping, Sequence
+except ImportError:
+    from collections import Mapping, Sequence
+
+SPECIAL = re.compile(br'["{}\[\]]')
+STRING_END = re.compile(br'[^"\\]*(?:\\.[^"\\]*)*"')
+
+# Scanning Helpers
+
+def next_token(buf, pos):
+    """Return (kind, value, start, end) of token at pos, skipping space."""
+    m = stream.TOKEN.match(buf, pos)
+    if m is None:
+        raise ValueError('Invalid JSON at byte {:,d}'.format(pos))
+    kind, val = stream.decode_token(m)
+    return kind, val, m.start(1), m.end()
+
+def skip_value(buf, pos):
+    """Return end offset of value starting at pos, without decoding it."""
+    kind, _, _, end = next_token(buf, pos)
+    if kind not in ('{', '['):
+        return end
+
+    depth, pos = 1, end
+    while depth:
+        m = SPECIAL.search(buf, pos)
+        if m is None:
+            raise ValueError('Unexpected end of JSON')
+        c = m.group()
+        if c == b'"':
+            start, m = m.start(), STRING_END.match(buf, m.end())
+            if m is None:
+                raise ValueError('Unterminated string at byte {:,d}'
+                                 .format(start))
+        else:
+            depth += 1 if c in b'{[' else -1
+        pos = m.end()
+    return pos
+
+def value_at(buf, pos):
+    """Return value starting at pos, lazily for objects and arrays."""
+    kind, val, start, _ = next_token(buf, pos)
+    return (LazyMap(buf, start) if kind == '{' else
+            LazyList(buf, start) if kind == '[' else
+            val)
+
+def materialize(obj):
+    """Return lazy container as Python object, for json.dumps(default=...)."""
+    if isinstance(obj, LazyContainer):
+        return obj.load()
+    raise TypeError('{!r} is not JSON serializable'.format(obj))
+
+# Lazy Containers
+
+class LazyContainer(object):
+    """Base for lazy containers over buffer buf, starting at offset start."""
+
+    def __init__(self, buf, start):
+        self.buf = buf
+        self.start = start
+        self.pos = start + 1    # scan position within container
+        self.done = False       # True once all children have been scanned
+        self.children = {}      # decoded child containers, by key or index
+
+    def child(self, key, offset):
+        """Return value of child at offset, caching containers."""
+        if key in self.children:
+            return self.children[key]
+        val = value_at(self.buf, offset)
+        if isinstance(val, LazyContainer):
+            self.children[key] = val
+        return val
+
+    def next_child(self, close):
+        """Advance past separator to next child; return False at close."""
+        kind, _, _, end = next_token(self.buf, self.pos)
+        if kind == close:
+            self.pos, self.done = end, True
+            return False
+        if self.offsets:
+            if kind != ',':
+                raise ValueError('Expected , at byte {:,d}'.format(self.pos))
+            self.pos = end
+        return True
+
+    def end(self):
+        """Return end offset of container."""
+        return skip_value(self.buf, self.start)
+
+    def load(self):
+        """Decode whole container to Python object."""
+        raw = self.buf[self.start:self.end()]
+        return backend.loads(raw)
+
+    def __repr__(self):
+        return repr(self.load())
+
+class LazyMap(LazyContainer, Mapping):
+    """Read-only dict-like view of JSON object."""
+
+    def __init__(self, buf, start):
+        LazyContainer.__init__(self, buf, start)
+        self.offsets = {}
+        self.order = []         # scanned keys, in file order
+
+    def scan_next(self):
+        """Record value offset of next key and return it, or None at end."""
+        if self.done or not self.next_child('}'):
+            return None
+        kind, key, _, end = next_token(self.buf, self.pos)
+        sep, _, _, end = next_token(self.buf, end)
+        if kind != 'string' or sep != ':':
+            raise ValueError('Expected key at byte {:,d}'.format(self.pos))
+        if key not in self.offsets:
+            self.order.append(key)
+        self.offsets[key] = end
+        self.pos = skip_value(self.buf, end)
+        return key
+
+    def scan(self, until=None):
+        """Record value offsets of keys, stopping early at key until."""
+        while True:
+            key = self.scan_next()
+            if key is None or key == until:
+                break
+
+    def offset(self, key):
+        if key not in self.offsets and not self.done:
+            self.scan(key)
+        return self.offsets.get(key)
+
+    def __getitem__(self, key):
+        offset = self.offset(key)
+        if offset is None:
+            raise KeyError(key)
+        return self.child(key, offset)
+
+    def __contains__(self, key):
+        return self.offset(key) is not None
+
+    def __iter__(self):
+        """Yield keys in file order, scanning only as far as consumed."""
+        i = 0
+        while i < len(self.order) or self.scan_next() is not None:
+            if i < len(self.order):
+                yield self.order[i]
+                i += 1
+
+    def __len__(self):
+        self.scan()
+        return len(self.offsets)
+
+class LazyList(LazyContainer, Sequence):
+    """Read-only list-like view of JSON array."""
+
+    def __init__(self, buf, start):
+        LazyContainer.__init__(self, buf, start)
+        self.offsets = []
+
+    def scan(self, until=None):
+        """Record value offsets, stopping early once index until is seen."""
+        while not self.done:
+            if until is not None and len(self.offsets) > until:
+                break
+            if not self.next_child(']'):
+                break
+            _, _, start, _ = next_token(self.buf, self.pos)
+            self.offsets.append(start)
+            self.pos = skip_value(self.buf, start)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice) or i < 0:
+            self.scan()
+            return [self.child(j, self.offsets[j])
+                    for j in range(len(self.offsets))][i]
+        self.scan(i)
+        if i >= len(self.offsets):
+            raise IndexError(i)
+        return self.child(i, self.offsets[i])
+
+    def __len__(self):
+        self.scan()
+        return len(self.offsets)
+
+    def __eq__(self, other):
+        return (isinstance(other, (list, LazyList)) and
+                list(self) == list(other))
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+# Main
+
+def load_lazy(filename):
+    """Map file into memory and return its lazy root value."""
+    with open(filename, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return value_at(buf, 0)
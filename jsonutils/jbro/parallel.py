@@ -0,0 +1,75 @@
+"""Multi-process scanning of JSON Lines files for jbro.
+
+Split a JSON Lines file into line-aligned byte ranges, aggregate each range
+in a separate process, and merge the partial jsonl.Aggregate results in file
+order.
+"""
+
+import multiprocessing
+import os
+from jsonutils import codec
+from jsonutils.jbro import jsonl
+
+# Helpers
+
+def cpu_count():
+    """Return number of CPUs, at least 1."""
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+def split_ranges(filename, n):
+    """Split file into at most n (start, end) byte ranges, each beginning
+    at the start of a line.
+    """
+    size = os.path.getsize(filename)
+    bounds = [0]
+    with open(filename, 'rb') as f:
+        for i in range(1, n):
+            pos = size * i // n
+            if pos <= bounds[-1]:
+                continue
+            # read rest of line containing byte before pos, so that a
+            # boundary already at a line start is kept as is
+            f.seek(pos - 1)
+            f.readline()
+            pos = f.tell()
+            if bounds[-1] < pos < size:
+                bounds.append(pos)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def scan_range(task):
+    """Aggregate one byte range; task is (filename, start, end, options)."""
+    filename, start, end, options = task
+    return jsonl.scan(filename, jsonl.Aggregate(**options), start, end)
+
+# Main
+
+def scan(filename, workers=None, **options):
+    """Aggregate JSON Lines file in parallel, return merged jsonl.Aggregate.
+    Args
+        filename: str of JSON Lines file
+        workers: int of processes, all CPUs if None or 0
+        options: keyword args for jsonl.Aggregate
+    Compressed files cannot be split into byte ranges, and are scanned in
+    a single process.
+    """
+    workers = workers or cpu_count()
+    if workers == 1 or codec.detect(filename):
+        return jsonl.scan(filename, jsonl.Aggregate(**options))
+
+    tasks = [(filename, start, end, options)
+             for start, end in split_ranges(filename, workers)]
+    pool = multiprocessing.Pool(min(workers, len(tasks) or 1))
+    try:
+        parts = pool.map(scan_range, tasks)
+    finally:
+        pool.close()
+        pool.join()
+
+    merged = jsonl.Aggregate(**options)
+    for part in parts:
+        merged.merge(part)
+    return merged
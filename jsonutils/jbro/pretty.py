@@ -0,0 +1,121 @@
+"""Incremental pretty-printer for jbro.
+
+Generate the output of json.dumps(obj, indent=2, sort_keys=True) as a
+stream of small chunks, so that output can be written (e.g. to a pager) as
+it is produced, without building the whole string. Traversal uses an
+explicit stack, and lazy containers are read on demand rather than
+materialized.
+"""
+
+import json
+
+try:
+    from collections.abc import Mapping, Sequence
+except ImportError:
+    from collections import Mapping, Sequence
+
+try:
+    STRING_TYPES = (str, unicode)
+    INTEGER_TYPES = (int, long)
+except NameError:
+    STRING_TYPES = (str,)
+    INTEGER_TYPES = (int,)
+
+BATCH_SIZE = 2 ** 16
+
+encode_str = json.encoder.encode_basestring_ascii
+
+# Helpers
+
+def encode_float(val):
+    """Encode float as json.dumps does."""
+    return ('NaN' if val != val else
+            'Infinity' if val == float('inf') else
+            '-Infinity' if val == float('-inf') else
+            repr(val))
+
+def encode_scalar(val):
+    """Encode scalar value as json.dumps does."""
+    return (encode_str(val) if isinstance(val, STRING_TYPES) else
+            'null' if val is None else
+            'true' if val is True else
+            'false' if val is False else
+            encode_float(val) if isinstance(val, float) else
+            str(int(val)) if isinstance(val, INTEGER_TYPES) else
+            encode_str(str(val)))
+
+def is_map(val):
+    """Return True if val is dict-like."""
+    return isinstance(val, dict) or isinstance(val, Mapping)
+
+def is_seq(val):
+    """Return True if val is list-like (but not a string)."""
+    return (isinstance(val, list) or
+            isinstance(val, Sequence) and not isinstance(val, STRING_TYPES))
+
+def items(val, sort_keys):
+    """Return iterator of (encoded key prefix, value) of dict-like val."""
+    keys = sorted(val.keys()) if sort_keys else val.keys()
+    return ((encode_str(key if isinstance(key, STRING_TYPES) else str(key)) +
+             ': ', val[key]) for key in keys)
+
+# Pretty-Printer
+
+def iter_pretty(obj, indent=2, sort_keys=True):
+    """Yield chunks of str, which joined equal
+    json.dumps(obj, indent=indent, sort_keys=sort_keys).
+    """
+    stack = []                  # [children, closing bracket, first child]
+    pending = ('', obj)         # (prefix, value) to encode next
+
+    while True:
+        if pending is not None:
+            prefix, val = pending
+            pending = None
+            if is_map(val):
+                yield prefix + '{'
+                stack.append([items(val, sort_keys), '}', True])
+            elif is_seq(val):
+                yield prefix + '['
+                stack.append([(('', child) for child in val), ']', True])
+            else:
+                yield prefix + encode_scalar(val)
+
+        if not stack:
+            return
+        frame = stack[-1]
+        children, close, first = frame
+        for key, val in children:
+            pad = '\n' + ' ' * (indent * len(stack))
+            pending = (('' if first else ',') + pad + key, val)
+            frame[2] = False
+            break
+        else:
+            stack.pop()
+            pad = '\n' + ' ' * (indent * len(stack))
+            yield close if first else pad + close
+
+def batched(chunks, size=BATCH_SIZE):
+    """Join iterable of str chunks into strings of about size chars."""
+    batch, n = [], 0
+    for chunk in chunks:
+        batch.append(chunk)
+        n += len(chunk)
+        if n >= size:
+            yield ''.join(batch)
+            batch, n = [], 0
+    if batch:
+        yield ''.join(batch)
+
+def take(chunks, n):
+    """Return first n chars of iterable of str chunks, consuming only as
+    many chunks as needed.
+    """
+    out, size = [], 0
+    for chunk in chunks:
+        if size + len(chunk) >= n:
+            out.append(chunk[:n - size])
+            break
+        out.append(chunk)
+        size += len(chunk)
+    return ''.join(out)
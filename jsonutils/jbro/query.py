@@ -0,0 +1,190 @@
+"""Compiled path queries for jbro.
+
+A query is parsed once into a Query, which matches the paths of values in a
+document. Steps are separated by dots:
+
+    a.b         key b of key a
+    a.*         any key of a
+    a.b*        keys of a matching glob pattern b* (* and ? wildcards)
+    a[0]        first element of array a
+    a[*]        any element of array a
+    ["a.b"]     key containing special characters, quoted
+    ..b         key b at any depth (recursive descent)
+    $           root, optional at the start of a query
+
+Matching runs the query as a small automaton: each value is assigned the set
+of query steps matched so far on the way to it, so a document is evaluated
+in a single traversal, and subtrees whose set is empty are never entered.
+The same transitions drive evaluation over the stream.parse events (see
+stream.Query), so in streaming mode non-matching subtrees are skipped
+without being built.
+"""
+
+import fnmatch
+import re
+
+try:
+    from collections.abc import Mapping, Sequence
+except ImportError:
+    from collections import Mapping, Sequence
+
+try:
+    STRING_TYPES = (str, unicode)
+except NameError:
+    STRING_TYPES = (str,)
+
+SEGMENT = re.compile(r'''
+    (\.\.|\.)?                                  # separator
+    (?:\[(?:(\*)|(\d+)|"((?:[^"\\]|\\.)*)"|'((?:[^'\\]|\\.)*)')\]
+      |([^.\[\]]+))                             # bracket or name step
+    ''', re.VERBOSE)
+ESCAPE = re.compile(r'\\(.)')
+
+# Helpers
+
+def is_map(val):
+    """Return True if val is dict-like."""
+    return isinstance(val, dict) or isinstance(val, Mapping)
+
+def is_seq(val):
+    """Return True if val is list-like (but not a string)."""
+    return (isinstance(val, list) or
+            isinstance(val, Sequence) and not isinstance(val, STRING_TYPES))
+
+def name_step(name):
+    """Return (kind, arg) of step for key name, which may be a glob."""
+    return (('any_key', None) if name == '*' else
+            ('glob', re.compile(fnmatch.translate(name)).match)
+            if '*' in name or '?' in name else
+            ('key', name))
+
+def parse(text):
+    """Parse query text into list of (kind, arg, recursive) steps.
+    Raises ValueError if text is not a valid query.
+    """
+    steps = []
+    pos = 1 if text.startswith('$') else 0
+    while pos < len(text):
+        m = SEGMENT.match(text, pos)
+        sep, star, index, dquoted, squoted, name = (m.groups() if m else
+                                                    (None,) * 6)
+        if m is None or (name is not None and sep is None and steps):
+            raise ValueError('Invalid query {} at char {:d}'
+                             .format(text, pos))
+        quoted = dquoted if dquoted is not None else squoted
+        kind, arg = (('any_index', None) if star else
+                     ('index', int(index)) if index is not None else
+                     ('key', ESCAPE.sub(r'\1', quoted)) if quoted is not None
+                     else name_step(name))
+        steps.append((kind, arg, sep == '..'))
+        pos = m.end()
+    return steps
+
+def step_matches(kind, arg, edge):
+    """Return True if step matches edge, a str key or int array index."""
+    if isinstance(edge, int):
+        return kind == 'any_index' or (kind == 'index' and arg == edge)
+    return (kind == 'any_key' or
+            (kind == 'key' and arg == edge) or
+            (kind == 'glob' and arg(edge) is not None))
+
+# Query
+
+class Query(object):
+    """Compiled path query.
+    Args
+        text: str of query, see module docstring
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.steps = parse(text)
+        self.final = len(self.steps)
+        self.start = frozenset([0])
+
+    def step(self, states, edge):
+        """Return states of child at edge (key or index) of a value with
+        given states; empty if nothing below the child can match.
+        """
+        nxt = set()
+        for i in states:
+            if i == self.final:
+                continue
+            kind, arg, recursive = self.steps[i]
+            if recursive:
+                nxt.add(i)
+            if step_matches(kind, arg, edge):
+                nxt.add(i + 1)
+        return frozenset(nxt)
+
+    def matches(self, states):
+        """Return True if a value with given states matches the query."""
+        return self.final in states
+
+    def lookup(self, states):
+        """Return the single key or index to look up among the children of
+        a value with given states, or None if children must be scanned.
+        """
+        if len(states) != 1:
+            return None
+        i = next(iter(states))
+        if i == self.final:
+            return None
+        kind, arg, recursive = self.steps[i]
+        return arg if kind in ('key', 'index') and not recursive else None
+
+    def children(self, path, val, states):
+        """Return list of (path, value, states) of children of val that can
+        lead to a match, in document order.
+        """
+        key = self.lookup(states)
+        if key is not None:
+            if is_map(val) and isinstance(key, str) and key in val:
+                return [(path + (key,), val[key], self.step(states, key))]
+            if is_seq(val) and isinstance(key, int):
+                try:
+                    child = val[key]
+                except IndexError:
+                    return []
+                return [(path + (key,), child, self.step(states, key))]
+            return []
+
+        edges = (val.items() if is_map(val) else
+                 enumerate(val) if is_seq(val) else
+                 [])
+        nodes = []
+        for edge, child in edges:
+            child_states = self.step(states, edge)
+            if child_states:
+                nodes.append((path + (edge,), child, child_states))
+        return nodes
+
+    def iter_matches(self, data):
+        """Yield (path, value) of matches in data, in document order, where
+        path is a tuple of keys and indexes.
+        """
+        stack = [((), data, self.start)]
+        while stack:
+            path, val, states = stack.pop()
+            if self.matches(states):
+                yield path, val
+            stack.extend(reversed(self.children(path, val, states)))
+
+    def find_all(self, data):
+        """Return list of (path, value) of all matches in data."""
+        return list(self.iter_matches(data))
+
+    def find(self, data):
+        """Return first matching value in data, or None if not found."""
+        for _, val in self.iter_matches(data):
+            return val
+        return None
+
+    def __repr__(self):
+        return 'Query({!r})'.format(self.text)
+
+def compile(text):
+    """Parse query text into reusable Query.
+    Raises ValueError if text is not a valid query.
+    """
+    return Query(text)
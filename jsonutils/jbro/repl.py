@@ -0,0 +1,291 @@
+"""Interactive jbro session (-i).
+
+Load a document once and answer describe, find, key, sample and query
+commands against the resident data, printing the run time of each command.
+Indexes are built on first use, in one traversal each, and kept for the
+rest of the session:
+
+    paths: all nested key paths key1.key2..., for listing keys and for tab
+        completion of nested keys
+    keys: occurrences (path, value) of every key in document order, not
+        searching within found values (as jbro.iter_key_rec), so that
+        recursive finds are dict lookups
+
+Tab completion requires the readline module.
+"""
+
+import bisect
+import cmd
+import itertools
+import time
+from jsonutils import backend, codec
+from jsonutils.jbro import infer, jbro, jsonl, lazy, sampling
+
+PROMPT = 'jbro> '
+
+# raised by invalid arguments, unreadable files and lookups in unexpected
+# data, and printed without ending the session
+ERRORS = codec.ERRORS + (KeyError, TypeError, IndexError)
+
+# Helpers
+
+def int_arg(arg, default=None):
+    """Return int of str arg, or default if empty.
+    Raises ValueError if arg is not a non-negative int.
+    """
+    if not arg:
+        return default
+    if not arg.isdigit():
+        raise ValueError('Expected a number, got {}'.format(arg))
+    return int(arg)
+
+def complete_prefix(names, text):
+    """Return names in sorted list names starting with text, cut after the
+    next . following text, so that nested keys complete one key at a time.
+    """
+    out = []
+    for name in itertools.islice(names, bisect.bisect_left(names, text),
+                                 None):
+        if not name.startswith(text):
+            break
+        i = name.find('.', len(text))
+        cut = name if i < 0 else name[:i + 1]
+        if not out or out[-1] != cut:
+            out.append(cut)
+    return out
+
+# Indexes
+
+def key_index(data):
+    """Return dict of each key in data to list of (path, value) of its
+    occurrences, in document order. Occurrences within the value of an
+    occurrence of the same key are left out, as in jbro.iter_key_rec.
+    """
+    index = {}
+    stack = [((), data, False)]
+    while stack:
+        path, val, is_key = stack.pop()
+        # record keys as they are popped, i.e. in pre-order
+        if is_key and path[-1] not in path[:-1]:
+            index.setdefault(path[-1], []).append((path, val))
+        if jbro.is_dict(val):
+            stack.extend((path + (key,), child, True)
+                         for key, child in reversed(list(val.items())))
+        elif jbro.is_list(val):
+            stack.extend((path + (i,), val[i], False)
+                         for i in reversed(range(len(val))))
+    return index
+
+# Session
+
+class Session(cmd.Cmd):
+    """Interactive session over data loaded from filename.
+    Args
+        data: parsed JSON value or lazy root
+        filename: str of file data was loaded from
+        quiet: bool, suppress output descriptions
+        truncate: bool, truncate output to < 80 chars
+    """
+
+    prompt = PROMPT
+
+    def __init__(self, data, filename, quiet=False, truncate=False):
+        cmd.Cmd.__init__(self)
+        self.data = data
+        self.filename = filename
+        self.quiet = quiet
+        self.truncate = truncate
+        self.started = None
+        self._paths = None
+        self._sorted_paths = None
+        self._keys = None
+        self._sorted_keys = None
+        self._inferred = None
+
+    # Indexes, built on first use
+
+    def decoded(self):
+        """Return data, first loading a lazy root in full for commands that
+        traverse the whole document (see jbro.is_full_traversal).
+        """
+        if isinstance(self.data, lazy.LazyContainer):
+            self.data = self.data.load()
+        return self.data
+
+    def paths(self):
+        """Return list of all nested key paths, in jbro -K order."""
+        if self._paths is None:
+            self._paths = jbro.get_all_keys(self.decoded())
+            self._sorted_paths = sorted(self._paths)
+        return self._paths
+
+    def keys(self):
+        """Return key index (see key_index)."""
+        if self._keys is None:
+            self._keys = key_index(self.decoded())
+            self._sorted_keys = sorted(self._keys)
+        return self._keys
+
+    def inferred(self, profile):
+        """Return collapsed infer.Infer of data, profiled if profile."""
+        if self._inferred is None or profile and not self._inferred.profile:
+            self._inferred = infer.infer_data(self.decoded(), profile)
+        return self._inferred
+
+    # Command Loop
+
+    def preloop(self):
+        try:
+            import readline
+        except ImportError:
+            return
+        # complete nested keys, which may contain most punctuation
+        readline.set_completer_delims(' \t\n')
+
+    def precmd(self, line):
+        self.started = time.time()
+        return line
+
+    def postcmd(self, stop, line):
+        if not stop and line.strip() and self.started is not None:
+            print('({:,.1f} ms)'.format(1000 * (time.time() - self.started)))
+        return stop
+
+    def onecmd(self, line):
+        try:
+            return cmd.Cmd.onecmd(self, line)
+        except ERRORS as e:
+            if isinstance(e, IOError) and jbro.is_broken_pipe(e):
+                raise
+            print('{}: {}'.format(type(e).__name__, e)
+                  if isinstance(e, (KeyError, TypeError, IndexError)) else e)
+            return False
+
+    def emptyline(self):
+        return False
+
+    def default(self, line):
+        print('Unknown command {}, see help.'.format(line.split()[0]))
+
+    # Completion
+
+    def complete_path(self, text, *ignored):
+        self.paths()
+        return complete_prefix(self._sorted_paths, text)
+
+    def complete_key(self, text, *ignored):
+        self.keys()
+        return complete_prefix(self._sorted_keys, text)
+
+    complete_find = complete_path
+    complete_keys = complete_path
+    complete_findrec = complete_key
+
+    # Commands
+
+    def do_describe(self, arg):
+        """describe: describe structure of file"""
+        jbro.describe(self.decoded(), self.quiet,
+                      jbro.file_chars(self.filename))
+
+    def do_infer(self, arg):
+        """infer: infer types and statistics of all paths"""
+        jbro.infer_shapes(self.inferred(False), self.quiet, self.truncate)
+
+    def do_profile(self, arg):
+        """profile [k]: estimate top k values of all paths (default 10)"""
+        jbro.profile_values(self.inferred(True), int_arg(arg, 10),
+                            self.quiet, self.truncate)
+
+    def do_sample(self, arg):
+        """sample n [sorted|first|random]: sample n (key, value) pairs"""
+        args = arg.split()
+        mode = args[1] if len(args) > 1 else 'sorted'
+        if not args or mode not in sampling.MODES:
+            raise ValueError('Usage: sample n [sorted|first|random]')
+        jbro.sample(self.decoded(), int_arg(args[0]), self.quiet,
+                    self.truncate, mode)
+
+    def do_chars(self, arg):
+        """chars n: show first n chars of file"""
+        jbro.get_chars(self.data, int_arg(arg, 1000), self.quiet)
+
+    def do_find(self, arg):
+        """find key1.key2...: find value of nested key"""
+        if not arg:
+            raise ValueError('Usage: find key1.key2...')
+        jbro.find(self.data, arg, self.quiet, self.truncate)
+
+    def do_findrec(self, arg):
+        """findrec key [n]: find all occurrences of key, or the first n"""
+        args = arg.split()
+        if not args:
+            raise ValueError('Usage: findrec key [n]')
+        limit = int_arg(args[1]) if len(args) > 1 else None
+        jbro.header('Find key {} recursively in data'.format(args[0]),
+                    self.quiet)
+        hits = self.keys().get(args[0], [])
+        jbro.print_matches(hits[:limit], self.truncate, 'Key not found.')
+
+    def do_query(self, arg):
+        """query q: find all values matching path query, e.g. a.*[0]..key"""
+        jbro.select(self.decoded() if '..' in arg else self.data, arg,
+                    self.quiet, self.truncate)
+
+    def do_keys(self, arg):
+        """keys [key1.key2...]: list top-level keys, or keys of nested key"""
+        val = self.data if not arg else jbro.find_key(self.data, arg)
+        if not jbro.is_dict(val):
+            print('Key not found.' if val is None else 'Not an object.')
+            return
+        jbro.header('List keys of {}.'.format(arg or 'data'), self.quiet)
+        jbro.print_keys(sorted(val.keys()), self.truncate)
+
+    def do_keysrec(self, arg):
+        """keysrec: list all keys recursively in form key1.key2"""
+        jbro.header(jbro.keys_msg(True), self.quiet)
+        jbro.print_keys(self.paths(), self.truncate)
+
+    def do_shapes(self, arg):
+        """shapes: list unique key shapes with counts"""
+        jbro.get_keys(self.decoded(), True, self.quiet, self.truncate, True)
+
+    def do_truncate(self, arg):
+        """truncate [on|off]: toggle truncating output to < 80 chars"""
+        self.truncate = (arg == 'on' if arg in ('on', 'off') else
+                         not self.truncate)
+        print('Truncate {}.'.format('on' if self.truncate else 'off'))
+
+    def do_quit(self, arg):
+        """quit: end session"""
+        return True
+
+    do_exit = do_quit
+
+    def do_EOF(self, arg):
+        """EOF (Ctrl-D): end session"""
+        print('')
+        return True
+
+# Main
+
+def main(args):
+    """Load file of args from argparse and run an interactive session."""
+    if args.backend:
+        try:
+            backend.use(args.backend)
+        except ValueError as e:
+            print(e)
+            return False
+    if args.jsonl or jsonl.is_jsonl(args.filename):
+        print('Interactive mode (-i) is not supported for JSON Lines.')
+        return False
+
+    started = time.time()
+    data = jbro.test_json(args.filename, args.lazy)
+    if data is None: return False
+    print('Loaded {} in {:,.1f} s; type help for commands.'.format(
+        args.filename, time.time() - started))
+
+    Session(data, args.filename, args.quiet, args.truncate).cmdloop()
+    return True
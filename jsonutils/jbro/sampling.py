@@ -0,0 +1,69 @@
+"""Sampling strategies for jbro sample (-s).
+
+Each strategy selects n items from an iterable in a single pass, holding at
+most n items, so that neither the full key list nor a sort of it is needed:
+
+    sorted: the n smallest items, with a bounded heap
+    first: the first n items, stopping after n
+    random: a uniform random sample (reservoir sampling), in input order
+"""
+
+import heapq
+import itertools
+import random
+
+MODES = ('sorted', 'first', 'random')
+
+# Selectors
+
+class Reservoir(object):
+    """Uniform random sample of up to n items from a stream (Algorithm R).
+    Args
+        n: int of items to keep
+        rng: random.Random instance, or None for a new unseeded one
+    """
+
+    def __init__(self, n, rng=None):
+        self.n = n
+        self.rng = rng or random.Random()
+        self.seen = 0
+        self.items = []     # (position, item)
+
+    def add(self, item):
+        """Offer next item of stream."""
+        if len(self.items) < self.n:
+            self.items.append((self.seen, item))
+        else:
+            i = self.rng.randrange(self.seen + 1)
+            if i < self.n:
+                self.items[i] = (self.seen, item)
+        self.seen += 1
+
+    def sample(self):
+        """Return sampled items, in stream order."""
+        return [item for _, item in sorted(self.items, key=lambda x: x[0])]
+
+def smallest(items, n):
+    """Return n smallest items, sorted."""
+    return heapq.nsmallest(n, items)
+
+def first(items, n):
+    """Return first n items, consuming no more than n."""
+    return list(itertools.islice(items, n))
+
+def reservoir(items, n, rng=None):
+    """Return uniform random sample of n items, in input order."""
+    r = Reservoir(n, rng)
+    for item in items:
+        r.add(item)
+    return r.sample()
+
+def select(items, n, mode='sorted', rng=None):
+    """Select n of iterable items by mode, one of MODES.
+    Raises ValueError if mode is unknown.
+    """
+    if mode not in MODES:
+        raise ValueError('Unknown sample mode {}'.format(mode))
+    return (smallest(items, n) if mode == 'sorted' else
+            first(items, n) if mode == 'first' else
+            reservoir(items, n, rng))
@@ -0,0 +1,133 @@
+"""Unique key shapes for jbro recursive key listing (-K -u).
+
+Key paths are collected into a trie with array indexes collapsed to [*], so
+that the keys of every element of an array share one path. Once all paths
+are added, repeated schema-like subtrees are collapsed as well: where an
+object has two or more keys whose values are objects with identical key
+structure (e.g. records keyed by ID), those keys are merged into a single
+* step. Each resulting shape is listed with the number of keys it covers.
+
+Memory use depends on the number of distinct paths after collapsing array
+indexes, not on the size of the document.
+"""
+
+ANY_INDEX = '[*]'
+ANY_KEY = '*'
+
+# types of decoded scalars, skipped cheaply when scanning lists
+SCALARS = frozenset([str, int, float, bool, type(None)])
+
+# Trie
+
+class Node(object):
+    """Shape trie node: children by step, count of keys at this path, and
+    signature of the key structure below it (set by Shapes.collapse).
+    """
+
+    __slots__ = ('children', 'count', 'sig')
+
+    def __init__(self):
+        self.children = {}
+        self.count = 0
+        self.sig = ()
+
+    def update(self, other):
+        """Add statistics of node other, of the same shape, to this node."""
+        self.count += other.count
+
+def merge(into, other):
+    """Add statistics and children of node other into node into."""
+    stack = [(into, other)]
+    while stack:
+        a, b = stack.pop()
+        a.update(b)
+        for step, child in b.children.items():
+            if step in a.children:
+                stack.append((a.children[step], child))
+            else:
+                a.children[step] = child
+
+def collapse(root):
+    """Merge keys of objects whose values share the same non-empty key
+    structure into a single * step, from the leaves up. Works on trees of
+    Node and its subclasses.
+    """
+    order, stack = [], [root]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        stack.extend(node.children.values())
+
+    # children before parents, so parents compare collapsed children
+    for node in reversed(order):
+        children = node.children
+        sigs = set(child.sig for child in children.values())
+        if (len(children) > 1 and ANY_INDEX not in children and
+                len(sigs) == 1 and next(iter(sigs))):
+            merged = node.__class__()
+            for child in children.values():
+                merge(merged, child)
+            merged.sig = sigs.pop()
+            node.children = {ANY_KEY: merged}
+        node.sig = tuple(sorted((step, child.sig)
+                                for step, child in node.children.items()))
+
+class Shapes(object):
+    """Trie of key path shapes with counts."""
+
+    def __init__(self):
+        self.root = Node()
+
+    def add(self, path):
+        """Add key path, a tuple of keys and int array indexes."""
+        node = self.root
+        for step in path:
+            step = ANY_INDEX if isinstance(step, int) else step
+            child = node.children.get(step)
+            if child is None:
+                child = node.children[step] = Node()
+            node = child
+        node.count += 1
+
+    def add_data(self, data, is_dict, is_list):
+        """Add key paths of all keys in data, including within lists.
+        Args
+            data: parsed JSON value
+            is_dict, is_list: functions returning True for dicts and lists
+        """
+        stack = [(self.root, data)]
+        while stack:
+            node, val = stack.pop()
+            if is_dict(val):
+                for key, child_val in val.items():
+                    child = node.children.get(key)
+                    if child is None:
+                        child = node.children[key] = Node()
+                    child.count += 1
+                    stack.append((child, child_val))
+            elif is_list(val):
+                child = node.children.get(ANY_INDEX)
+                if child is None:
+                    child = node.children[ANY_INDEX] = Node()
+                stack.extend((child, item) for item in val
+                             if type(item) not in SCALARS)
+        return self
+
+    def collapse(self):
+        """Merge repeated subtrees, see collapse."""
+        collapse(self.root)
+        return self
+
+    def lines(self):
+        """Yield (shape, count) of key shapes, depth-first in key order."""
+        stack = [('', self.root)]
+        while stack:
+            prefix, node = stack.pop()
+            if prefix and node.count:
+                yield prefix, node.count
+            nodes = []
+            for step in sorted(node.children):
+                shape = (prefix + step if step == ANY_INDEX or not prefix else
+                         prefix + '.' + step)
+                nodes.append((shape, node.children[step]))
+            stack.extend(reversed(nodes))
@@ -0,0 +1,210 @@
+"""Bounded-memory sketches of value streams for jbro.
+
+HyperLogLog estimates the number of distinct values in a stream in fixed
+memory: 2 ** p one-byte registers, with a standard error of about
+1.04 / sqrt(2 ** p), i.e. about 3% for the default p = 10.
+
+CountMin estimates how often each value occurs, in a fixed table of
+counters: estimates are never below the true count, and exceed it by at
+most e / width of the total count with probability 1 - exp(-depth). TopK
+ranks a bounded set of candidate values by their CountMin estimates to
+find the most frequent values (heavy hitters).
+
+Values are hashed with a stable hash rather than hash(), so that sketches
+built in different processes (see parallel) can be merged; merged
+sketches estimate the combined stream.
+"""
+
+import array
+import hashlib
+import math
+import operator
+import struct
+
+P = 10
+HASH_BITS = 64
+WIDTH = 1024
+DEPTH = 4
+CANDIDATES = 100
+
+# Helpers
+
+def fingerprint(val):
+    """Return stable 64-bit int hash of JSON scalar val."""
+    raw = (b's' + val.encode('utf-8', 'surrogatepass')
+           if isinstance(val, str) else
+           b'v' + repr(val).encode('ascii'))
+    return struct.unpack('<Q', hashlib.md5(raw).digest()[:8])[0]
+
+def alpha(m):
+    """Return HyperLogLog bias correction constant for m registers."""
+    return (0.673 if m == 16 else
+            0.697 if m == 32 else
+            0.709 if m == 64 else
+            0.7213 / (1 + 1.079 / m))
+
+# Sketches
+
+class HyperLogLog(object):
+    """Estimate of the number of distinct values added.
+    Args
+        p: int of precision, 4 to 16; uses 2 ** p registers
+    """
+
+    def __init__(self, p=P):
+        if not 4 <= p <= 16:
+            raise ValueError('HyperLogLog precision must be 4 to 16')
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def add(self, val):
+        """Add JSON scalar val."""
+        self.add_hash(fingerprint(val))
+
+    def add_hash(self, h):
+        """Add 64-bit hash of a value."""
+        i = h & (self.m - 1)
+        rank = HASH_BITS - self.p - (h >> self.p).bit_length() + 1
+        if rank > self.registers[i]:
+            self.registers[i] = rank
+
+    def merge(self, other):
+        """Merge other HyperLogLog of the same precision into this one."""
+        if other.p != self.p:
+            raise ValueError('Cannot merge HyperLogLog of precision {:d} '
+                             'into {:d}'.format(other.p, self.p))
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def estimate(self):
+        """Return int estimate of the number of distinct values added."""
+        m = self.m
+        e = alpha(m) * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(b'\x00')
+        # linear counting is more accurate while many registers are empty
+        if e <= 2.5 * m and zeros:
+            e = m * math.log(float(m) / zeros)
+        return int(round(e))
+
+class CountMin(object):
+    """Estimate of the number of times each value was added.
+    Args
+        width: int of counters per row
+        depth: int of rows, each with its own hash of the value
+    """
+
+    def __init__(self, width=WIDTH, depth=DEPTH):
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self.table = array.array('L', [0]) * (width * depth)
+
+    def cells(self, h):
+        """Return indexes in table of 64-bit hash h, one per row."""
+        # row hashes derived from two halves of h (Kirsch-Mitzenmacher)
+        a, b = h & 0xffffffff, (h >> 32) | 1
+        width = self.width
+        return [row * width + (a + row * b) % width
+                for row in range(self.depth)]
+
+    def add_hash(self, h, n=1):
+        """Add n occurrences of value of hash h, return its new estimate."""
+        table = self.table
+        cells = self.cells(h)
+        self.total += n
+        # conservative update: raise only the counters below the estimate
+        est = min([table[i] for i in cells]) + n
+        for i in cells:
+            if table[i] < est:
+                table[i] = est
+        return est
+
+    def estimate_hash(self, h):
+        """Return estimated count of value of hash h."""
+        return min(self.table[i] for i in self.cells(h))
+
+    def add(self, val, n=1):
+        """Add n occurrences of JSON scalar val, return its new estimate."""
+        return self.add_hash(fingerprint(val), n)
+
+    def estimate(self, val):
+        """Return estimated count of JSON scalar val."""
+        return self.estimate_hash(fingerprint(val))
+
+    def error(self):
+        """Return bound on the overestimate of any count, which holds with
+        probability 1 - exp(-depth).
+        """
+        return math.e * self.total / self.width
+
+    def merge(self, other):
+        """Merge other CountMin of the same dimensions into this one."""
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError('Cannot merge CountMin of {:d}x{:d} into '
+                             '{:d}x{:d}'.format(other.width, other.depth,
+                                                self.width, self.depth))
+        self.table = array.array('L', map(operator.add, self.table,
+                                          other.table))
+        self.total += other.total
+        return self
+
+class TopK(object):
+    """Most frequent values, as up to capacity candidates ranked by their
+    CountMin estimates. A new value displaces the least frequent candidate
+    once its estimate exceeds that candidate's.
+    Args
+        capacity: int of candidate values to track
+        width, depth: dimensions of CountMin
+    """
+
+    def __init__(self, capacity=CANDIDATES, width=WIDTH, depth=DEPTH):
+        self.capacity = capacity
+        self.counts = CountMin(width, depth)
+        self.candidates = {}    # hash -> [estimate, value]
+        self.floor = 0          # at most the lowest candidate estimate
+
+    def add_hash(self, h, val):
+        """Add JSON scalar val of 64-bit hash h."""
+        est = self.counts.add_hash(h)
+        entry = self.candidates.get(h)
+        if entry is not None:
+            entry[0] = est
+        elif len(self.candidates) < self.capacity:
+            self.candidates[h] = [est, val]
+        elif est > self.floor:
+            # floor may be stale, as candidate estimates only grow
+            low = min(self.candidates, key=lambda k: self.candidates[k][0])
+            if est > self.candidates[low][0]:
+                del self.candidates[low]
+                self.candidates[h] = [est, val]
+            self.floor = min(e for e, _ in self.candidates.values())
+
+    def add(self, val):
+        """Add JSON scalar val."""
+        self.add_hash(fingerprint(val), val)
+
+    def merge(self, other):
+        """Merge other TopK into this one, re-ranking the candidates of
+        both by the merged counts.
+        """
+        self.counts.merge(other.counts)
+        values = dict((h, val) for h, (_, val) in self.candidates.items())
+        values.update((h, val) for h, (_, val) in other.candidates.items())
+        ranked = sorted(((self.counts.estimate_hash(h), h) for h in values),
+                        reverse=True)[:self.capacity]
+        self.candidates = dict((h, [est, values[h]]) for est, h in ranked)
+        self.floor = ranked[-1][0] if ranked else 0
+        return self
+
+    def top(self, k):
+        """Return list of (value, estimated count) of the k most frequent
+        values, most frequent first; k is at most capacity. Values whose
+        estimates are within the error bound of CountMin, and so may not be
+        frequent at all, are left out.
+        """
+        error = self.counts.error()
+        entries = sorted([entry for entry in self.candidates.values()
+                          if entry[0] > error],
+                         key=lambda entry: (-entry[0], repr(entry[1])))
+        return [(val, est) for est, val in entries[:k]]
@@ -0,0 +1,170 @@
+"""Single-pass structure statistics for jbro describe.
+
+Compute all describe statistics together in one traversal of parse events,
+from either the streaming parser or an in-memory document, without
+re-serializing the document.
+"""
+
+from jsonutils.jbro import stream
+
+TYPES = {'start_map': 'object', 'start_array': 'array', 'string': 'string',
+         'number': 'number', 'boolean': 'boolean', 'null': 'null'}
+TYPE_ORDER = ['object', 'array', 'string', 'number', 'boolean', 'null']
+
+# Helpers
+
+def path_str(path):
+    """Format path tuple as key1.key2[0]..., or (root) for empty path."""
+    out = ''
+    for step in path:
+        out += ('[{:d}]'.format(step) if isinstance(step, int) else
+                step if not out else
+                '.' + step)
+    return out or '(root)'
+
+def bucket(n):
+    """Return power-of-two bucket of non-negative int n."""
+    return 0 if n == 0 else n.bit_length()
+
+def bucket_str(b):
+    """Return label of bucket b, e.g. 4-7."""
+    lo, hi = (0, 0) if b == 0 else (2 ** (b - 1), 2 ** b - 1)
+    return '{:,d}'.format(lo) if lo == hi else '{:,d}-{:,d}'.format(lo, hi)
+
+class Summary(object):
+    """Running count, min, mean and max of ints."""
+
+    def __init__(self):
+        self.count, self.total = 0, 0
+        self.min, self.max = None, None
+
+    def add(self, n):
+        self.count += 1
+        self.total += n
+        self.min = n if self.min is None else min(self.min, n)
+        self.max = n if self.max is None else max(self.max, n)
+
+    def merge(self, other):
+        """Merge other Summary into this one."""
+        if not other.count:
+            return
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def __str__(self):
+        if not self.count:
+            return '0'
+        return '{:,d} (min {:,d}, mean {:,.1f}, max {:,d})'.format(
+            self.count, self.min, float(self.total) / self.count, self.max)
+
+# Stats
+
+class Stats(object):
+    """Accumulate describe statistics from parse events.
+    Total keys and max depth follow jbro.count_keys and jbro.max_depth in
+    counting nested dicts only; all other statistics cover arrays too.
+    """
+
+    def __init__(self):
+        self.top, self.total, self.depth = 0, 0, 0
+        self.nesting = 0
+        self.chars = None
+        self.types = dict((t, 0) for t in TYPE_ORDER)
+        self.array_lens = Summary()
+        self.string_lens = Summary()
+        self.string_buckets = {}
+        self.widest = (None, -1)
+        self.arrays = 0     # number of open arrays
+        self.counts = []    # child counts of open containers
+
+    def send(self, path, event, value, start, end):
+        if event == 'end_map' or event == 'end_array':
+            n = self.counts.pop()
+            if event == 'end_array':
+                self.arrays -= 1
+                self.array_lens.add(n)
+            elif n > self.widest[1]:
+                self.widest = (path, n)
+            if not path and end is not None:
+                self.chars = end - start
+            return False
+
+        if self.counts:
+            self.counts[-1] += 1
+        if path and self.arrays == 0:
+            self.top += len(path) == 1
+            self.total += 1
+            self.depth = max(self.depth, len(path))
+        self.nesting = max(self.nesting, len(path))
+        self.types[TYPES[event]] += 1
+
+        if event == 'start_map':
+            self.counts.append(0)
+        elif event == 'start_array':
+            self.counts.append(0)
+            self.arrays += 1
+        else:
+            if event == 'string':
+                n = len(value)
+                self.string_lens.add(n)
+                b = bucket(n)
+                self.string_buckets[b] = self.string_buckets.get(b, 0) + 1
+            if not path and end is not None:
+                self.chars = end - start
+        return False
+
+    def merge(self, other):
+        """Merge Stats of other completed documents into this one.
+        Total chars becomes the sum of both, if known for both.
+        """
+        self.top += other.top
+        self.total += other.total
+        self.depth = max(self.depth, other.depth)
+        self.nesting = max(self.nesting, other.nesting)
+        self.chars = (None if self.chars is None or other.chars is None else
+                      self.chars + other.chars)
+        for t in TYPE_ORDER:
+            self.types[t] += other.types[t]
+        self.array_lens.merge(other.array_lens)
+        self.string_lens.merge(other.string_lens)
+        for b, n in other.string_buckets.items():
+            self.string_buckets[b] = self.string_buckets.get(b, 0) + n
+        if other.widest[1] > self.widest[1]:
+            self.widest = other.widest
+        return self
+
+    def lines(self, chars=None):
+        """Return list of (label, string) pairs of statistics.
+        Total chars is given by chars if provided, else the byte span of the
+        parsed root value.
+        """
+        chars = self.chars if chars is None else chars
+        types = ', '.join(['{} {:,d}'.format(t, self.types[t])
+                           for t in TYPE_ORDER if self.types[t]])
+        buckets = ', '.join(['{}: {:,d}'.format(bucket_str(b),
+                                                self.string_buckets[b])
+                             for b in sorted(self.string_buckets)])
+        path, width = self.widest
+        widest = ('-' if path is None else
+                  '{} ({:,d} keys)'.format(path_str(path), width))
+
+        return [('Top-level keys', '{:,d}'.format(self.top)),
+                ('Total keys', '{:,d}'.format(self.total)),
+                ('Max depth', '{:,d}'.format(self.depth)),
+                ('Total chars', '-' if chars is None else
+                 '{:,d}'.format(chars)),
+                ('Max nesting', '{:,d}'.format(self.nesting)),
+                ('Types', types),
+                ('Array lengths', str(self.array_lens)),
+                ('String lengths', str(self.string_lens)),
+                ('Length buckets', buckets or '-'),
+                ('Widest object', widest)]
+
+def describe_data(data):
+    """Return Stats of in-memory data, in a single traversal."""
+    stats = Stats()
+    for e in stream.events_from(data):
+        stats.send(*e)
+    return stats
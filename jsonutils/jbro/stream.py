@@ -0,0 +1,561 @@
+"""Streaming JSON parser for jbro.
+
+Tokenize a JSON file incrementally from a binary file object and yield
+parse events, so that large files can be inspected in a single pass without
+loading the whole document into memory.
+
+Each event is a tuple (path, event, value, start, end):
+    path: tuple of keys (str) and array indices (int) leading to the value
+    event: one of start_map, end_map, start_array, end_array, string,
+           number, boolean, null
+    value: Python value for scalar events, None otherwise
+    start, end: byte offsets of the value in the file; for end_map and
+                end_array, start is the offset of the opening bracket
+"""
+
+import bisect
+import json
+import re
+from jsonutils import backend
+from jsonutils.jbro import sampling
+
+try:
+    from collections.abc import Mapping, Sequence
+except ImportError:
+    from collections import Mapping, Sequence
+
+try:
+    STRING_TYPES = (str, unicode)
+except NameError:
+    STRING_TYPES = (str,)
+
+CHUNK_SIZE = 2 ** 16
+# incomplete tokens (e.g. an unterminated string) longer than this are
+# reported as invalid rather than buffered until the end of the file
+MAX_TOKEN = 2 ** 27
+
+TOKEN = re.compile(br'[ \t\n\r]*(([{}\[\],:])|'
+                   br'"([^"\\]*(?:\\.[^"\\]*)*)"|'
+                   br'(-?(?:0|[1-9][0-9]*)(\.[0-9]+)?([eE][-+]?[0-9]+)?)|'
+                   br'(true|false|null|NaN|Infinity|-Infinity))')
+SPACE = re.compile(br'[ \t\n\r]*')
+STRING_BODY = re.compile(br'[^"\\]*(?:\\.[^"\\]*)*')
+
+# NaN and Infinity are not JSON, but are accepted as by json.loads
+LITERALS = {b'true': True, b'false': False, b'null': None,
+            b'NaN': float('nan'), b'Infinity': float('inf'),
+            b'-Infinity': float('-inf')}
+LONGEST_LITERAL = max(len(literal) for literal in LITERALS)
+
+# Tokenizer
+
+def decode_string(raw):
+    """Decode body of JSON string token (bytes, without quotes)."""
+    return (raw.decode('utf-8') if b'\\' not in raw else
+            json.loads(b'"'.join([b'', raw, b'']).decode('utf-8')))
+
+def decode_number(raw, frac, exp):
+    """Decode JSON number token (bytes) to int or float."""
+    return float(raw) if frac or exp else int(raw)
+
+def decode_token(m):
+    """Decode TOKEN match to (kind, value)."""
+    _, struct, string, number, frac, exp, literal = m.groups()
+    if struct is not None:
+        return struct.decode('ascii'), None
+    elif string is not None:
+        return 'string', decode_string(string)
+    elif number is not None:
+        return 'number', decode_number(number, frac, exp)
+    val = LITERALS[literal]
+    return ('null' if val is None else
+            'boolean' if isinstance(val, bool) else
+            'number'), val
+
+def tokenize(f, chunk_size=CHUNK_SIZE, max_token=MAX_TOKEN):
+    """Yield tokens from binary file object f as (kind, value, start, end).
+    Kind is the structural character for {}[],: and one of string, number,
+    boolean or null for scalars. Start and end are byte offsets.
+    Raises ValueError on invalid tokens, as soon as they cannot be the start
+    of a valid token, or once longer than max_token bytes.
+    """
+    buf, pos, base, eof = b'', 0, 0, False
+    scan = None     # end of scanned part of string open at pos, if any
+
+    while True:
+        if scan is not None:
+            # resume scanning open string, rather than rescan it from pos
+            scan = STRING_BODY.match(buf, scan).end()
+            if scan < len(buf) - 1 or buf[scan:] == b'"':
+                scan = None
+        m = TOKEN.match(buf, pos) if scan is None else None
+        # token may be truncated at buffer boundary (a number may match
+        # without its trailing '.5' or 'e-5'), read more and retry
+        if not eof and (m is None or len(buf) - m.end() < 3):
+            if m is None:
+                pos = SPACE.match(buf, pos).end()
+                if scan is None and buf[pos:pos + 1] == b'"':
+                    scan = STRING_BODY.match(buf, pos + 1).end()
+                    # string ends before buffer, so is invalid
+                    invalid = scan < len(buf) - 1
+                else:
+                    # prefixes of numbers match, and of literals cannot be
+                    # longer than the longest literal
+                    invalid = (scan is None and
+                               len(buf) - pos >= LONGEST_LITERAL)
+                if invalid:
+                    raise ValueError('Invalid JSON at byte {:,d}'
+                                     .format(base + pos))
+                if len(buf) - pos > max_token:
+                    raise ValueError('Token longer than {:,d} bytes at byte '
+                                     '{:,d}'.format(max_token, base + pos))
+            # grow buffer geometrically for long tokens, so that copying it
+            # stays linear in their length
+            chunk = f.read(max(chunk_size, len(buf) - pos))
+            eof = not chunk
+            base += pos
+            if scan is not None:
+                scan -= pos
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+
+        if m is None:
+            rest = SPACE.match(buf, pos).end()
+            if rest == len(buf):
+                return
+            if scan is not None:
+                raise ValueError('Unterminated string at byte {:,d}'
+                                 .format(base + rest))
+            raise ValueError('Invalid JSON at byte {:,d}'.format(base + rest))
+
+        kind, val = decode_token(m)
+        yield kind, val, base + m.start(1), base + m.end()
+        pos = m.end()
+
+# Parser
+
+def parse(f, chunk_size=CHUNK_SIZE):
+    """Yield parse events (path, event, value, start, end) from binary file f.
+    Raises ValueError on malformed JSON.
+    """
+    path, stack = [], []
+    need = 'value'
+
+    for kind, val, start, end in tokenize(f, chunk_size):
+        if need == 'done':
+            raise ValueError('Extra data at byte {:,d}'.format(start))
+
+        if need == 'key' or need == 'key_or_end':
+            if kind == 'string':
+                path.append(val)
+                need = 'colon'
+                continue
+            if kind != '}' or need == 'key':
+                raise ValueError('Expected key at byte {:,d}'.format(start))
+            # empty map: no key on path to remove
+            _, open_start = stack.pop()
+            yield tuple(path), 'end_map', None, open_start, end
+
+        elif need == 'colon':
+            if kind != ':':
+                raise ValueError('Expected : at byte {:,d}'.format(start))
+            need = 'value'
+            continue
+
+        elif need == 'comma_or_end':
+            container = stack[-1][0]
+            if kind == ',':
+                if container == 'map':
+                    path.pop()
+                    need = 'key'
+                else:
+                    path[-1] += 1
+                    need = 'value'
+                continue
+            if kind != ('}' if container == 'map' else ']'):
+                raise ValueError('Expected , at byte {:,d}'.format(start))
+            path.pop()
+            _, open_start = stack.pop()
+            event = 'end_map' if container == 'map' else 'end_array'
+            yield tuple(path), event, None, open_start, end
+
+        elif kind == ']' and need == 'value_or_end':
+            path.pop()
+            _, open_start = stack.pop()
+            yield tuple(path), 'end_array', None, open_start, end
+
+        elif kind == '{':
+            yield tuple(path), 'start_map', None, start, end
+            stack.append(('map', start))
+            need = 'key_or_end'
+            continue
+
+        elif kind == '[':
+            yield tuple(path), 'start_array', None, start, end
+            stack.append(('array', start))
+            path.append(0)
+            need = 'value_or_end'
+            continue
+
+        elif kind in ('string', 'number', 'boolean', 'null'):
+            yield tuple(path), kind, val, start, end
+
+        else:
+            raise ValueError('Expected value at byte {:,d}'.format(start))
+
+        need = 'comma_or_end' if stack else 'done'
+
+    if need != 'done':
+        raise ValueError('Unexpected end of JSON')
+
+class Builder(object):
+    """Build Python object from events sent after its opening event."""
+
+    def __init__(self, event, value=None):
+        self.value = ({} if event == 'start_map' else
+                      [] if event == 'start_array' else
+                      value)
+        is_container = event in ('start_map', 'start_array')
+        self.stack = [self.value] if is_container else []
+
+    def send(self, path, event, value, start, end):
+        """Add event to object; return True once the object is complete."""
+        if event == 'end_map' or event == 'end_array':
+            self.stack.pop()
+            return not self.stack
+
+        val = ({} if event == 'start_map' else
+               [] if event == 'start_array' else
+               value)
+        parent = self.stack[-1]
+        if isinstance(parent, dict):
+            parent[path[-1]] = val
+        else:
+            parent.append(val)
+        if event == 'start_map' or event == 'start_array':
+            self.stack.append(val)
+        return False
+
+def build(event, value, events):
+    """Build Python object from events, starting with given event and value.
+    Consumes events from iterator up to the end of the value.
+    """
+    builder = Builder(event, value)
+    if builder.stack:
+        for e in events:
+            if builder.send(*e):
+                break
+    return builder.value
+
+def scalar_event(value):
+    """Return event name for scalar Python value."""
+    return ('string' if isinstance(value, STRING_TYPES) else
+            'boolean' if isinstance(value, bool) else
+            'null' if value is None else
+            'number')
+
+def events_from(obj):
+    """Yield parse events for Python object, with byte offsets of None.
+    Other mappings and sequences (e.g. lazy containers) are treated as
+    dicts and lists.
+    """
+    stack = [((), obj, None)]
+    while stack:
+        path, obj, end_event = stack.pop()
+        if end_event is not None:
+            yield path, end_event, None, None, None
+        elif isinstance(obj, list) or (isinstance(obj, Sequence) and
+                                       not isinstance(obj, STRING_TYPES)):
+            yield path, 'start_array', None, None, None
+            stack.append((path, None, 'end_array'))
+            stack.extend([(path + (i,), obj[i], None)
+                          for i in reversed(range(len(obj)))])
+        elif isinstance(obj, Mapping):
+            yield path, 'start_map', None, None, None
+            stack.append((path, None, 'end_map'))
+            stack.extend([(path + (k,), v, None)
+                          for k, v in reversed(list(obj.items()))])
+        else:
+            yield path, scalar_event(obj), obj, None, None
+
+def read_value(f, start, end):
+    """Read and decode value at byte range [start, end) of binary file f."""
+    f.seek(start)
+    return backend.loads(f.read(end - start))
+
+# Single-Pass Consumers
+# Each consumer accepts events via send() and returns True once it needs no
+# further events, so that several commands can share one pass over the file.
+
+class TopKeys(object):
+    """Collect top-level keys."""
+
+    def __init__(self):
+        self.keys = []
+
+    def send(self, path, event, value, start, end):
+        if len(path) == 1 and event not in ('end_map', 'end_array'):
+            self.keys.append(path[0])
+        return False
+
+class AllKeys(object):
+    """Collect all nested keys in form key1.key2..., in file order.
+    As with jbro.get_all_keys, lists are not descended.
+    Args
+        emit: function called with each key as it is found; by default keys
+            are collected in keys
+    """
+
+    def __init__(self, emit=None):
+        self.keys = []
+        self.emit = emit or self.keys.append
+        self.count = 0
+        self.arrays = 0
+
+    def send(self, path, event, value, start, end):
+        if event == 'end_array':
+            self.arrays -= 1
+        elif path and self.arrays == 0 and event != 'end_map':
+            self.count += 1
+            self.emit('.'.join(path))
+        if event == 'start_array':
+            self.arrays += 1
+        return False
+
+class KeyShapes(object):
+    """Add all key paths, including those within lists, to shapes.Shapes."""
+
+    def __init__(self, shapes):
+        self.shapes = shapes
+
+    def send(self, path, event, value, start, end):
+        if (path and not isinstance(path[-1], int) and
+                event != 'end_map' and event != 'end_array'):
+            self.shapes.add(path)
+        return False
+
+class Find(object):
+    """Find value at nested key in form key1.key2..., stop once found."""
+
+    def __init__(self, nested_key):
+        self.target = tuple(nested_key.split('.'))
+        self.builder = None
+
+    def send(self, path, event, value, start, end):
+        if self.builder is not None:
+            return self.builder.send(path, event, value, start, end)
+        if path == self.target and event not in ('end_map', 'end_array'):
+            self.builder = Builder(event, value)
+            return not self.builder.stack
+        return False
+
+    @property
+    def value(self):
+        return self.builder.value if self.builder is not None else None
+
+class FindAll(object):
+    """Find all occurrences of key, as (path, value) pairs, in file order.
+    As with jbro.iter_key_rec, lists are searched but found values are not.
+    Args
+        key: str of key to find
+        limit: int of hits after which to stop, or None
+        emit: function called with (path, value) of each hit once read;
+            by default hits are collected in hits
+    """
+
+    def __init__(self, key, limit=None, emit=None):
+        self.key = key
+        self.limit = limit
+        self.count = 0
+        self.hits = []
+        self.emit = emit or (lambda path, val: self.hits.append((path, val)))
+        self.builder = None
+        self.path = None
+
+    def found(self, path, value):
+        """Emit hit, return True once limit is reached."""
+        self.count += 1
+        self.emit(path, value)
+        return self.limit is not None and self.count >= self.limit
+
+    def send(self, path, event, value, start, end):
+        builder = self.builder
+        if builder is not None:
+            if builder.send(path, event, value, start, end):
+                self.builder = None
+                return self.found(self.path, builder.value)
+            return False
+        if (path and path[-1] == self.key and
+                event != 'end_map' and event != 'end_array'):
+            builder = Builder(event, value)
+            if not builder.stack:
+                return self.found(path, builder.value)
+            self.builder, self.path = builder, path
+        return False
+
+class Lookup(object):
+    """Find nested and recursive keys of batch.Trie together, calling
+    emit(key, path, value) as each hit is complete (see batch.resolve).
+    Stops once all nested keys are found, if there are no recursive keys
+    or all have reached the limit of the trie.
+    """
+
+    def __init__(self, trie, emit):
+        self.trie = trie
+        self.emit = emit
+        self.found = set()      # (key, recursive) of keys with hits
+        self.counts = {}        # hits of recursive keys
+        self.builders = []      # (key, path, builder) of hits being read
+        self.states = []        # (trie node, keys) of enclosing containers
+        self.skip = 0           # depth within a skipped subtree
+
+    def hit(self, key, path, event, value):
+        self.found.add((key, path is not None))
+        builder = Builder(event, value)
+        if builder.stack:
+            self.builders.append((key, path, builder))
+        else:
+            self.emit(key, path, builder.value)
+
+    def done(self):
+        nested = sum(1 for _, recursive in self.found if not recursive)
+        return (not self.trie.keys - self.trie.exhausted(self.counts) and
+                not self.builders and nested == len(self.trie.targets))
+
+    def send(self, path, event, value, start, end):
+        if self.builders:
+            pending = []
+            for key, hit_path, builder in self.builders:
+                if builder.send(path, event, value, start, end):
+                    self.emit(key, hit_path, builder.value)
+                else:
+                    pending.append((key, hit_path, builder))
+            self.builders = pending
+        if event == 'end_map' or event == 'end_array':
+            if self.skip:
+                self.skip -= 1
+            else:
+                self.states.pop()
+            return self.done()
+        if self.skip:
+            self.skip += event == 'start_map' or event == 'start_array'
+            return False
+
+        trie = self.trie
+        if path:
+            node, keys = self.states[-1]
+            if self.counts:
+                keys = keys - trie.exhausted(self.counts)
+            key = path[-1]
+            child = trie.child(node, key)
+            if child is not None and child.target is not None:
+                self.hit(child.target, None, event, value)
+            if key in keys and trie.count(self.counts, key):
+                self.hit(key, path, event, value)
+                keys = keys - frozenset([key])
+            node = child
+        else:
+            node, keys = trie.root, trie.keys
+        if ((event == 'start_map' and trie.descend(node, keys)) or
+                (event == 'start_array' and keys)):
+            self.states.append((node, keys))
+        elif event == 'start_map' or event == 'start_array':
+            self.skip = 1
+        return self.done()
+
+class Query(object):
+    """Collect (path, value) of all values matching compiled query.Query.
+    Values are only built for matches; subtrees that cannot lead to a match
+    are skipped without building them.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        self.hits = []
+        self.builders = []      # builders of matches still being read
+        self.states = []        # query states of enclosing containers
+        self.skip = 0           # depth within a skipped subtree
+
+    def send(self, path, event, value, start, end):
+        if self.builders:
+            self.builders = [b for b in self.builders
+                             if not b.send(path, event, value, start, end)]
+        if event == 'end_map' or event == 'end_array':
+            if self.skip:
+                self.skip -= 1
+            else:
+                self.states.pop()
+            return False
+        if self.skip:
+            self.skip += event == 'start_map' or event == 'start_array'
+            return False
+
+        query = self.query
+        states = (query.step(self.states[-1], path[-1]) if path else
+                  query.start)
+        if query.matches(states):
+            builder = Builder(event, value)
+            self.hits.append((path, builder.value))
+            if builder.stack:
+                self.builders.append(builder)
+        if event == 'start_map' or event == 'start_array':
+            if states:
+                self.states.append(states)
+            else:
+                self.skip = 1
+        return False
+
+class Sample(object):
+    """Track byte ranges of n top-level values, selected by mode (see
+    sampling.MODES): the n smallest keys, the first n in file order, or a
+    random sample. The first n mode stops once n values have been seen.
+    """
+
+    def __init__(self, n, mode='sorted', rng=None):
+        self.n = n
+        self.mode = mode
+        self.ranges = []
+        self.reservoir = (sampling.Reservoir(n, rng) if mode == 'random'
+                          else None)
+
+    def send(self, path, event, value, start, end):
+        if len(path) != 1 or event in ('start_map', 'start_array'):
+            return False
+        item = (path[0], start, end)
+        if self.mode == 'first':
+            self.ranges.append(item)
+            return len(self.ranges) >= self.n
+        if self.reservoir is not None:
+            self.reservoir.add(item)
+        elif len(self.ranges) < self.n or path[0] < self.ranges[-1][0]:
+            bisect.insort(self.ranges, item)
+            del self.ranges[self.n:]
+        return False
+
+    def pairs(self, f):
+        """Read sampled (key, value) pairs from binary file f. Values are
+        read in file order, so that f is only read forward.
+        """
+        ranges = (self.reservoir.sample() if self.reservoir is not None
+                  else self.ranges)
+        values = dict((start, read_value(f, start, end))
+                      for _, start, end in sorted(ranges,
+                                                  key=lambda r: r[1]))
+        return [(key, values[start]) for key, start, _ in ranges]
+
+def run(f, consumers, chunk_size=CHUNK_SIZE):
+    """Feed events from binary file f to all consumers in a single pass.
+    Parsing stops early once every consumer is done.
+    """
+    active = list(consumers)
+    if not active:
+        return
+    for e in parse(f, chunk_size):
+        i = 0
+        while i < len(active):
+            if active[i].send(*e):
+                del active[i]
+            else:
+                i += 1
+        if not active:
+            break
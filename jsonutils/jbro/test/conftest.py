@@ -0,0 +1,37 @@
+"""Shared fixtures for jbro tests, assumes Pytest."""
+
+import argparse
+import json
+import pytest
+
+
+@pytest.fixture
+def write_json(tmpdir):
+    """Return function that writes obj as JSON file in tmpdir and returns
+    its filename.
+    """
+    def write(obj, name='data.json', indent=None):
+        path = tmpdir.join(name)
+        path.write(json.dumps(obj, indent=indent))
+        return str(path)
+    return write
+
+
+@pytest.fixture
+def jbro_args():
+    """Return function that returns argparse.Namespace of jbro args, with
+    the defaults of bin/jbro overridden by keyword args.
+    """
+    def make(**kwargs):
+        args = argparse.Namespace(
+            filename=None, quiet=False, truncate=False, stream=False,
+            index=False, jsonl=False, workers=None, backend=None,
+            lazy=False, interactive=False, describe=False, infer=False,
+            schema=None, profile=False, top=10, sample=None,
+            sample_mode='sorted', chars=None, find=None, find_recursive=None,
+            order='dfs', limit=None, find_file=None, query=None, keys=False,
+            keys_recursive=False, unique=False, diff=None, less=False)
+        for name, val in kwargs.items():
+            setattr(args, name, val)
+        return args
+    return make
@@ -0,0 +1,116 @@
+"""Test cases for jbro batch module, assumes Pytest."""
+
+import io
+import json
+
+from jsonutils.jbro import batch, jbro, lazy, stream
+
+
+DATA = {'a': {'b': {'c': 1}, 'x': 2},
+        'd': [{'x': 3}],
+        'x': {'x': 4, 'y': {'x': 5}}}
+
+
+def resolve(data, nested_keys, keys, order='dfs', limit=None):
+    trie = batch.Trie(nested_keys, keys, limit)
+    return list(batch.resolve(data, trie, jbro.is_dict, jbro.is_list,
+                              order))
+
+
+class TestTrie:
+    """Test building the trie."""
+
+    def test_add(self):
+        trie = batch.Trie(['a.b', 'a.c', 'a.b', 'd'], ['x'])
+        assert trie.targets == ['a.b', 'a.c', 'd']
+        assert sorted(trie.root.children) == ['a', 'd']
+        assert sorted(trie.root.children['a'].children) == ['b', 'c']
+        assert trie.keys == frozenset(['x'])
+
+    def test_missing(self):
+        trie = batch.Trie(['a.b', 'a.z'], ['x', 'z'])
+        found = set([('a.b', False), ('x', True)])
+        assert batch.missing(trie, found) == [('a.z', False), ('z', True)]
+
+
+class TestResolve:
+    """Test single-traversal lookups against find_key and find_key_rec."""
+
+    def test_nested(self):
+        nested_keys = ['a.b', 'a.b.c', 'x.y', 'a.z', 'd.x']
+        hits = dict((key, val) for key, _, val in
+                    resolve(DATA, nested_keys, []))
+        for key in nested_keys:
+            assert hits.get(key) == jbro.find_key(DATA, key)
+
+    def test_recursive(self):
+        """Recursive keys are also found in lists."""
+        for key in ['x', 'b', 'z']:
+            hits = [(path, val) for _, path, val in
+                    resolve(DATA, [], [key])]
+            assert hits == list(jbro.iter_key_rec(DATA, key))
+        assert ('x', ('d', 0, 'x'), 3) in resolve(DATA, [], ['x'])
+
+    def test_order_limit(self):
+        """Order and limit of recursive keys match iter_key_rec."""
+        for order in ['dfs', 'bfs']:
+            expected = list(jbro.iter_key_rec(DATA, 'x', order))
+            for limit in [None, 0, 1, 2]:
+                hits = [(path, val) for _, path, val in
+                        resolve(DATA, [], ['x'], order, limit)]
+                assert hits == expected[:limit]
+        hits = resolve(DATA, ['d'], ['x', 'c'], 'bfs', 1)
+        assert hits == [('d', None, DATA['d']), ('x', ('x',), DATA['x']),
+                        ('c', ('a', 'b', 'c'), 1)]
+
+    def test_combined(self):
+        """Recursive keys are still found within other keys' hits."""
+        hits = resolve(DATA, ['a'], ['x', 'c'])
+        assert ('a', None, DATA['a']) in hits
+        assert ('c', ('a', 'b', 'c'), 1) in hits
+        assert ('x', ('a', 'x'), 2) in hits
+
+    def test_lazy(self, tmpdir):
+        """Without recursive keys, only trie keys are looked up."""
+        path = str(tmpdir.join('data.json'))
+        with open(path, 'w') as f:
+            json.dump(DATA, f)
+        d = lazy.load_lazy(path)
+        assert resolve(d, ['a.x'], []) == [('a.x', None, 2)]
+        assert list(d.offsets) == ['a']
+
+
+class TestLookup:
+    """Test streaming lookups."""
+
+    def run(self, nested_keys, keys, limit=None):
+        hits = []
+        f = io.BytesIO(json.dumps(DATA).encode('utf-8'))
+        c = stream.Lookup(batch.Trie(nested_keys, keys, limit),
+                          lambda *hit: hits.append(hit))
+        stream.run(f, [c])
+        return hits, c
+
+    def test_equal(self):
+        """Streaming hits equal in-memory hits."""
+        args = (['a.b', 'a.b.c', 'x.y', 'a.z'], ['x', 'c'])
+        hits, c = self.run(*args)
+        assert sorted(hits, key=str) == sorted(resolve(DATA, *args), key=str)
+        assert ('a.z', False) not in c.found
+        assert not c.done()
+
+    def test_early_stop(self):
+        """Lookup is done once all nested keys are found."""
+        hits, c = self.run(['a.x', 'a.b'], [])
+        assert hits == [('a.b', None, {'c': 1}), ('a.x', None, 2)]
+        assert c.done()
+        assert c.states[0][0] is c.trie.root
+
+    def test_limit(self):
+        """Lookup is done once all recursive keys reach the limit."""
+        hits, c = self.run([], ['x'], 2)
+        assert hits == resolve(DATA, [], ['x'], limit=2)
+        assert c.done()
+        hits, c = self.run(['x.y'], ['x', 'c'], 1)
+        assert sorted(hits, key=str) == sorted(
+            resolve(DATA, ['x.y'], ['x', 'c'], limit=1), key=str)
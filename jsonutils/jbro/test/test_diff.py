@@ -0,0 +1,118 @@
+"""Test cases for jbro diff module, assumes Pytest."""
+
+import json
+
+from jsonutils.jbro import diff, index, lazy
+
+OLD = {'a': {'x': 1, 'y': [1, 2, 3], 'z': {'q': 's'}},
+       'b': 'same',
+       'c': [{'k': 1}, {'k': 2}],
+       'gone': 1}
+NEW = {'a': {'x': 2, 'y': [1, 5], 'z': {'q': 's', 'r': True}},
+       'b': 'same',
+       'c': [{'k': 1}, {'k': 3}],
+       'new': {'n': None}}
+EXPECTED = [('~', ('a', 'x'), 1, 2),
+            ('~', ('a', 'y', 1), 2, 5),
+            ('-', ('a', 'y', 2), 3, None),
+            ('+', ('a', 'z', 'r'), None, True),
+            ('~', ('c', 1, 'k'), 2, 3),
+            ('-', ('gone',), 1, None),
+            ('+', ('new',), None, {'n': None})]
+
+
+def loaded(diffs):
+    """Return list of diffs with lazy values decoded."""
+    return [(op, path, json.loads(json.dumps(old, default=lazy.materialize)),
+             json.loads(json.dumps(new, default=lazy.materialize)))
+            for op, path, old, new in diffs]
+
+
+class TestHelpers:
+    """Test the comparison helpers."""
+
+    def test_same_span(self):
+        """Compare byte ranges, across chunks."""
+        f = diff.same_span
+        a, b = b'x' * 100000 + b'a', b'y' + b'x' * 100000 + b'b'
+        assert f(a, 0, 100000, b, 1, 100001)
+        assert not f(a, 0, 100001, b, 1, 100002)
+        assert not f(a, 0, 10, b, 1, 12)
+
+
+class TestDiff:
+    """Test diff of decoded and lazy documents."""
+
+    def test_diff(self):
+        """Added, removed and changed paths in document order."""
+        assert list(diff.diff(OLD, NEW)) == EXPECTED
+        assert list(diff.diff(OLD, OLD)) == []
+
+    def test_types(self):
+        """Values of different types are changed, not descended into."""
+        assert list(diff.diff({'a': [1]}, {'a': {'0': 1}})) == [
+            ('~', ('a',), [1], {'0': 1})]
+        assert list(diff.diff([1], 1)) == [('~', (), [1], 1)]
+
+    def test_bool(self):
+        """Booleans differ from 1 and 0, but ints do not from floats."""
+        assert list(diff.diff({'a': 1, 'b': [0]},
+                              {'a': True, 'b': [False]})) == [
+            ('~', ('a',), 1, True), ('~', ('b', 0), 0, False)]
+        assert list(diff.diff({'a': [1, {'b': 2}]},
+                              {'a': [1.0, {'b': 2.0}]})) == []
+
+    def test_nan(self):
+        """Unchanged NaN is not a difference, in and out of containers."""
+        old = json.loads('{"a": {"x": NaN, "y": [NaN, 1]}, "b": NaN}')
+        new = json.loads('{"a": {"x": NaN, "y": [NaN, 2]}, "b": NaN}')
+        assert diff.same(old['a']['x'], new['a']['x'])
+        assert diff.same(old['b'], json.loads('NaN'))
+        assert not diff.same(old['b'], 1.0)
+        assert diff.same({'x': old['b']}, {'x': new['b']})
+        assert list(diff.diff(old, new)) == [('~', ('a', 'y', 1), 1, 2)]
+
+    def test_lazy(self, write_json):
+        """Lazy documents give the same diff, whatever their formatting."""
+        old = lazy.load_lazy(write_json(OLD, 'old.json'))
+        new = lazy.load_lazy(write_json(NEW, 'new.json', 2))
+        assert loaded(diff.diff(old, new)) == EXPECTED
+        same = lazy.load_lazy(write_json(OLD, 'same.json', 2))
+        assert list(diff.diff(old, same)) == []
+        old = lazy.load_lazy(write_json({'a': 1}, 'int.json'))
+        new = lazy.load_lazy(write_json({'a': True}, 'bool.json'))
+        assert list(diff.diff(old, new)) == [('~', ('a',), 1, True)]
+
+
+class TestDiffIndex:
+    """Test diff of indexed documents."""
+
+    def test_diff_index(self, tmpdir, write_json):
+        """Indexed documents give the same diff as decoded documents."""
+        old = write_json(OLD, 'old.json')
+        new = write_json(NEW, 'new.json', 2)
+        same = write_json(OLD, 'same.json', 1)
+        with index.Index(old, str(tmpdir)) as idx_a, \
+                index.Index(new, str(tmpdir)) as idx_b, \
+                index.Index(same, str(tmpdir)) as idx_c:
+            assert list(diff.diff_index(idx_a, idx_b)) == EXPECTED
+            assert list(diff.diff_index(idx_a, idx_c)) == []
+            assert list(diff.diff_index(idx_a, idx_a)) == []
+
+    def test_bool(self, tmpdir, write_json):
+        """Booleans differ from 1 and 0."""
+        old = write_json({'a': 1}, 'int.json')
+        new = write_json({'a': True}, 'bool.json')
+        with index.Index(old, str(tmpdir)) as idx_a, \
+                index.Index(new, str(tmpdir)) as idx_b:
+            assert list(diff.diff_index(idx_a, idx_b)) == [
+                ('~', ('a',), 1, True)]
+
+    def test_not_object(self, tmpdir, write_json):
+        """Documents that are not objects are compared as values."""
+        old = write_json([1, {'a': 2}], 'old.json')
+        new = write_json([1, {'a': 3}], 'new.json')
+        with index.Index(old, str(tmpdir)) as idx_a, \
+                index.Index(new, str(tmpdir)) as idx_b:
+            assert list(diff.diff_index(idx_a, idx_b)) == [
+                ('~', (1, 'a'), 2, 3)]
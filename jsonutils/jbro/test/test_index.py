@@ -0,0 +1,122 @@
+"""Test cases for jbro index module, assumes Pytest."""
+
+import os
+
+from jsonutils.jbro import index, jbro
+
+DATA = {'z': {'b': 1, 'a': {'y': [{'a': 2}], 'x': {'a': 3}}},
+        'a': {'c': [1, {'b': 4}]},
+        'b': 'str'}
+
+
+class TestIndex:
+    """Test building and querying the index."""
+
+    def test_find_key(self, tmpdir, write_json):
+        """Seek to nested values."""
+        path = write_json({'a': {'b': {'c': 0}}, 'd': [1, {'e': 2}]})
+        with index.Index(path, str(tmpdir)) as idx:
+            assert idx.find_key('a.b') == {'c': 0}
+            assert idx.find_key('a.b.c') == 0
+            assert idx.find_key('d') == [1, {'e': 2}]
+            assert idx.find_key('d.e') is None
+            assert idx.entry('a.b')[:2] == (2, 'object')
+
+    def test_find_key_rec(self, tmpdir, write_json):
+        """Find all occurrences, without descending into hits."""
+        path = write_json({'a': 'b', 'c': 'd',
+                           'e': {'a': {'a': 'f'}}})
+        with index.Index(path, str(tmpdir)) as idx:
+            assert idx.find_key_rec('a') == [(('a',), 'b'),
+                                             (('e', 'a'), {'a': 'f'})]
+            assert idx.find_key_rec('z') == []
+
+    def test_key_path(self, tmpdir, write_json):
+        """Paths of hits skip earlier siblings at each depth."""
+        path = write_json({'x': {'y': {'z': 0}},
+                           'e': {'y': [{'a': 1}], 'z': {'a': 2}}})
+        with index.Index(path, str(tmpdir)) as idx:
+            assert idx.find_key_rec('a') == [(('e', 'z', 'a'), 2)]
+
+    def test_find_key_rec_arrays(self, tmpdir, write_json):
+        """With search, keys within arrays are found as by iter_key_rec."""
+        data = {'a': [{'b': 1}, [{'b': {'b': 2}}]], 'b': [{'b': 3}],
+                'c': {'d': [4, {'b': 5}]}}
+        path = write_json(data)
+        with index.Index(path, str(tmpdir)) as idx:
+            assert idx.find_key_rec('b', jbro.iter_key_rec) == list(
+                jbro.iter_key_rec(data, 'b'))
+            assert idx.find_key_rec('b') == [(('b',), [{'b': 3}])]
+        data = [{'b': 1}, {'a': {'b': 2}}]
+        path = write_json(data, 'list.json')
+        with index.Index(path, str(tmpdir)) as idx:
+            assert idx.find_key_rec('b', jbro.iter_key_rec) == list(
+                jbro.iter_key_rec(data, 'b'))
+
+    def test_get_all_keys(self, tmpdir, write_json):
+        """Keys in file order."""
+        path = write_json({'a': 'b', 'c': 'd', 'e': {'a': 'f'}})
+        with index.Index(path, str(tmpdir)) as idx:
+            assert idx.get_all_keys() == ['a', 'c', 'e', 'e.a']
+
+    def test_children(self, tmpdir, write_json):
+        """Keys of object at byte range, in file order."""
+        path = write_json({'a': {'c': 1, 'b': [2]}, 'd': {'c': 3}})
+        with index.Index(path, str(tmpdir)) as idx:
+            assert [row[:2] for row in idx.children(1, 0, 10 ** 6)] == [
+                ('a', 'object'), ('d', 'object')]
+            _, _, start, end = idx.entry('a')
+            assert [row[:2] for row in idx.children(2, start, end)] == [
+                ('c', 'number'), ('b', 'array')]
+
+    def test_rebuild(self, tmpdir, write_json):
+        """Index is reused while file is unchanged, rebuilt otherwise."""
+        path = write_json({'a': 1})
+        with index.Index(path, str(tmpdir)) as idx:
+            assert idx.built
+        with index.Index(path, str(tmpdir)) as idx:
+            assert not idx.built
+
+        write_json({'a': 22})
+        st = os.stat(path)
+        os.utime(path, (st.st_atime, st.st_mtime + 10))
+        with index.Index(path, str(tmpdir)) as idx:
+            assert idx.built
+            assert idx.find_key('a') == 22
+
+
+class TestMain:
+    """Output with the index matches output without it."""
+
+    def output(self, capsys, args):
+        assert jbro.main(args) is not False
+        return capsys.readouterr().out
+
+    def test_same_output(self, tmpdir, monkeypatch, capsys, write_json,
+                         jbro_args):
+        """Batch finds, in both orders and with limits, and key listings."""
+        monkeypatch.setattr(index, 'INDEX_DIR', str(tmpdir))
+        path = write_json(DATA)
+        outputs = []
+        for opts in [dict(find=['a', 'b']),
+                     dict(find=['z.x', 'z.a.x', 'b', 'z.b']),
+                     dict(find=['z.a'], find_recursive=['a', 'b']),
+                     dict(find_recursive=['a', 'b'], order='bfs'),
+                     dict(find_recursive=['a', 'y'], limit=1),
+                     dict(find=['a'], keys_recursive=True),
+                     dict(keys_recursive=True)]:
+            plain = self.output(capsys, jbro_args(filename=path, quiet=True,
+                                                  **opts))
+            indexed = self.output(capsys, jbro_args(
+                filename=path, quiet=True, index=True, **opts))
+            assert indexed == plain
+            outputs.append(plain)
+        assert "a\t{'c': [1, {'b': 4}]}" in outputs[0]
+        assert outputs[-1].split() == jbro.get_all_keys(DATA)
+
+    def test_get_all_keys(self, tmpdir, write_json):
+        """Keys are listed as by jbro.get_all_keys."""
+        path = write_json(DATA)
+        with index.Index(path, str(tmpdir)) as idx:
+            assert idx.get_all_keys() == jbro.get_all_keys(DATA)
+
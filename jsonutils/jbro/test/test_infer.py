@@ -0,0 +1,139 @@
+"""Test cases for jbro infer module, assumes Pytest."""
+
+import io
+import json
+
+import pytest
+
+from jsonutils.jbro import infer, stream
+from jsonutils.lws import lws
+
+
+DATA = {'stocks': {'C': {'price': 5.06, 'name': 'Citigroup'},
+                   'BAC': {'price': 25, 'name': 'Bank of America'}},
+        'path': '/apps',
+        'users': [{'id': 1, 'tags': ['a', 'b']},
+                  {'id': 2, 'email': None},
+                  {'id': 3, 'email': 'x@y.z', 'tags': []}]}
+
+
+def field(inferred, *steps):
+    """Return field of inferred at steps."""
+    node = inferred.root
+    for step in steps:
+        node = node.children[step]
+    return node
+
+
+class TestInfer:
+    """Test inference of type shapes."""
+
+    def test_types(self):
+        """Types and counts per path, with array elements merged."""
+        inferred = infer.infer_data(DATA)
+        users = field(inferred, 'users', '[*]')
+        assert users.types == {'object': 3}
+        assert field(inferred, 'users', '[*]', 'email').types == \
+            {'null': 1, 'string': 1}
+        tags = field(inferred, 'users', '[*]', 'tags')
+        assert (tags.count, tags.arrays.min, tags.arrays.max) == (2, 0, 2)
+        ids = field(inferred, 'users', '[*]', 'id')
+        assert (ids.numbers.min, ids.numbers.max) == (1, 3)
+        assert ids.distinct.estimate() == 3
+        assert ids.examples == [1, 2, 3]
+
+    def test_big_int(self):
+        """Integers beyond the machine word are typed as integers."""
+        inferred = infer.infer_data({'a': 2 ** 64})
+        assert field(inferred, 'a').types == {'integer': 1}
+
+    def test_collapse(self):
+        """Sibling objects of the same key structure are merged."""
+        inferred = infer.infer_data(DATA)
+        stocks = field(inferred, 'stocks')
+        assert list(stocks.children) == ['*']
+        price = field(inferred, 'stocks', '*', 'price')
+        assert price.types == {'float': 1, 'integer': 1}
+        assert (price.numbers.min, price.numbers.max) == (5.06, 25)
+
+    def test_lines(self):
+        """Presence is relative to the objects of the parent path."""
+        lines = dict(infer.infer_data(DATA).lines())
+        assert list(lines)[:3] == ['(root)', 'path', 'stocks']
+        assert lines['users[*].email'].startswith(
+            'string 50%, null 50%, count 2, present 67%, ~2 distinct')
+        assert 'present' not in lines['stocks.*']
+        assert lines['stocks.*.name'].endswith(
+            'e.g. "Citigroup" "Bank of America"')
+
+    def test_stream(self):
+        """Streaming events give the same inference."""
+        inferred = infer.Infer()
+        stream.run(io.BytesIO(json.dumps(DATA).encode()), [inferred])
+        assert list(inferred.collapse().lines()) == \
+            list(infer.infer_data(DATA).lines())
+
+    def test_merge(self):
+        """Merging inferences of documents equals sending both."""
+        docs = [{'a': 1, 'b': [1]}, {'a': 'x', 'c': {'d': None}}]
+        both, merged = infer.Infer(), infer.Infer()
+        for doc in docs:
+            part = infer.Infer()
+            for e in stream.events_from(doc):
+                both.send(*e)
+                part.send(*e)
+            merged.merge(part)
+        assert list(merged.lines()) == list(both.lines())
+        assert field(both, 'a').types == {'integer': 1, 'string': 1}
+
+
+class TestProfile:
+    """Test value profiling."""
+
+    def test_profile(self):
+        """Distinct counts and top values of profiled paths."""
+        data = {'users': [{'country': c} for c in 'aabacaab'] + [{}]}
+        inferred = infer.infer_data(data, profile=True)
+        assert list(inferred.profile_lines(2)) == [
+            ('users[*].country', '~3 distinct of 8 values'),
+            ('  "a"', '~5 (62%)'),
+            ('  "b"', '~2 (25%)')]
+        assert field(inferred, 'users', '[*]', 'country').top is not None
+        assert list(infer.infer_data(data).profile_lines(2)) == []
+
+    def test_merge(self):
+        """Profiles of documents merge."""
+        merged = infer.Infer(profile=True)
+        for doc in [{'a': 1}, {'a': 1}, {'a': 2}]:
+            part = infer.Infer(profile=True)
+            for e in stream.events_from(doc):
+                part.send(*e)
+            merged.merge(part)
+        assert list(merged.profile_lines(5))[1:] == [('  1', '~2 (67%)'),
+                                                     ('  2', '~1 (33%)')]
+
+
+class TestSchema:
+    """Test lws schema emitted from inference."""
+
+    def test_schema(self):
+        """Nested objects become schema dicts, other values leaves."""
+        schema = infer.infer_data(DATA).schema()
+        stocks = schema[('stocks', str, 'stocks')]
+        assert stocks == {('*', str, '.*', '*'): {
+            ('price', str, 'price'): ('price', (int, float)),
+            ('name', str, 'name'): ('name', str)}}
+        assert schema[('users', str, 'users')] == ('users', list)
+        assert infer.infer_data({'a.b': [None]}).schema() == \
+            {('a.b', str, r'a\.b'): ('a.b', list)}
+        with pytest.raises(ValueError):
+            infer.infer_data([1]).schema()
+
+    def test_validate(self):
+        """Inferred schema validates its data without errors."""
+        data = {'root': DATA}
+        schema = {('root', str): infer.infer_data(DATA).schema()}
+        assert lws.gen_schema_output(lws.validate_schema(schema, data))[:2] \
+            == (0, 0)
+        assert lws.gen_data_output(lws.validate_data(schema, data))[:2] == \
+            (0, 0)
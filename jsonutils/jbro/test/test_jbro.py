@@ -67,6 +67,18 @@ class TestHelpers:
         assert f(d3, 'a.b.c') == 0
         assert f(d3, 'e') is None
         assert f(d3, 'a.d') is None
+        assert f(d3, 'x.y') is None
+
+    def test_deep_nesting(self):
+        """Traverse dicts nested beyond the recursion limit."""
+        depth = 10000
+        d = 0
+        for _ in range(depth):
+            d = {'k': d}
+
+        assert jbro.count_keys(d) == depth
+        assert jbro.max_depth(d) == depth
+        assert jbro.find_key(d, '.'.join(['k'] * depth)) == 0
 
     def test_find_key_rec(self):
         """Find key recursively in dict."""
@@ -95,3 +107,18 @@ class TestHelpers:
 
         assert set(f(d1)) == set(['a', 'b', 'c'])
         assert set(f(d2)) == set(['a', 'c', 'e', 'e.a'])
+
+    def test_is_full_traversal(self, jbro_args):
+        """Lookups are lazy; whole-document traversals are not."""
+        f = jbro.is_full_traversal
+        assert not f(jbro_args(find=['a.b'], keys=True, chars=10))
+        assert not f(jbro_args(query='a.*[0]'))
+        assert f(jbro_args(find=['a.b'], describe=True))
+        assert f(jbro_args(query='a..b'))
+        assert f(jbro_args(keys_recursive=True))
+        assert f(jbro_args())
+
+    def test_iter_all_keys(self):
+        """Keys are yielded depth-first, sorted within each dict."""
+        d = {'b': {'d': 1, 'c': {'e': 2}}, 'a': 0}
+        assert list(jbro.iter_all_keys(d)) == ['a', 'b', 'b.c', 'b.c.e', 'b.d']
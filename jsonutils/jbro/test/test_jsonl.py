@@ -0,0 +1,65 @@
+"""Test cases for jbro jsonl module, assumes Pytest."""
+
+from jsonutils.jbro import jbro, jsonl
+
+LINES = [b'{"a": 1, "b": {"c": {"d": 2}}, "x": [{"a": 5}]}\n',
+         b'not json\n',
+         b'\n',
+         b'{"a": {"a": 3}, "e": "str"}\n',
+         b'{"b": {"c": 1}}\n']
+
+
+def write_jsonl(tmpdir, lines, name='data.jsonl'):
+    """Write lines to file in tmpdir, return filename."""
+    path = str(tmpdir.join(name))
+    with open(path, 'wb') as f:
+        f.writelines(lines)
+    return path
+
+
+class TestHelpers:
+    """Test the per-record helpers."""
+
+    def test_is_jsonl(self):
+        """Detect by extension."""
+        assert jsonl.is_jsonl('a/b.jsonl')
+        assert jsonl.is_jsonl('b.NDJSON')
+        assert not jsonl.is_jsonl('b.json')
+
+    def test_key_depths(self):
+        """Depth of each key path matches jbro.max_depth."""
+        record = {'a': {'b': {'c': 0}, 'd': [{'e': 1}]}, 'f': {}}
+        depths = dict(jsonl.key_depths(record))
+        assert depths == {('a',): 2, ('a', 'b'): 1, ('a', 'b', 'c'): 0,
+                          ('a', 'd'): 0, ('f',): 0}
+        assert depths[('a',)] == jbro.max_depth(record['a'])
+
+    def test_find_hits(self):
+        """Match jbro.iter_key_rec, searching within lists."""
+        record = {'a': 'b', 'c': [{'a': 1}, [{'x': {'a': 2}}]],
+                  'e': {'a': {'a': 'f'}}}
+        assert jsonl.find_hits(record, 'a') == \
+            list(jbro.iter_key_rec(record, 'a'))
+        assert [path for path, _ in jsonl.find_hits(record, 'a')] == [
+            ('a',), ('c', 0, 'a'), ('c', 1, 0, 'x', 'a'), ('e', 'a')]
+
+    def test_pattern_str(self):
+        """List indexes are collapsed."""
+        assert jsonl.pattern_str(('c', 1, 0, 'x', 'a')) == 'c[*][*].x.a'
+        assert jsonl.pattern_str((0, 'a')) == '[*].a'
+
+
+class TestAggregate:
+    """Test aggregation across records."""
+
+    def test_scan(self, tmpdir):
+        """Aggregate keys, stats and hits in one pass."""
+        path = write_jsonl(tmpdir, LINES)
+        agg = jsonl.scan(path, jsonl.Aggregate(keys=True, describe=True,
+                                                find='a', examples=1))
+        assert (agg.records, agg.invalid) == (3, 1)
+        assert agg.key_paths()[:3] == [(('a',), 2, 1), (('a', 'a'), 1, 0),
+                                       (('b',), 2, 2)]
+        assert agg.stats.total == 10
+        assert agg.patterns == {'a': 2, 'x[*].a': 1}
+        assert agg.hits == [(1, ('a',), 1)]
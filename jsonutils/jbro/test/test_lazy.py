@@ -0,0 +1,80 @@
+"""Test cases for jbro lazy module, assumes Pytest."""
+
+import json
+import pytest
+
+from jsonutils.jbro import jbro, lazy
+
+
+class TestScanning:
+    """Test the scanning helpers."""
+
+    def test_skip_value(self):
+        """Skip containers, including brackets and quotes in strings."""
+        f = lazy.skip_value
+        buf = b'{"a": ["]", "\\"}", {"b": 1}], "c": 2} '
+        assert f(buf, 0) == len(buf) - 1
+        assert f(buf, 5) == buf.index(b', "c"')
+        assert f(b' 123, 4', 0) == 4
+
+    def test_nan(self, tmpdir):
+        """NaN and Infinity decode as with json.loads."""
+        raw = '{"a": {"b": NaN}, "c": [Infinity, -Infinity], "d": 1}'
+        path = tmpdir.join('nan.json')
+        path.write(raw)
+        d = lazy.load_lazy(str(path))
+        assert d['c'][1] == float('-inf') and d['d'] == 1
+        assert (json.dumps(d, default=lazy.materialize) ==
+                json.dumps(json.loads(raw)))
+
+    def test_skip_value_truncated(self):
+        """Truncated containers and strings raise ValueError."""
+        for buf in [b'{"a": [1, 2', b'{"a": "xyz', b'{"a": "x\\"}']:
+            with pytest.raises(ValueError):
+                lazy.skip_value(buf, 0)
+
+
+class TestLazyContainers:
+    """Test lazy containers against the parsed document."""
+
+    obj = {'a': {'b': {'c': 0}},
+           'd': [1, 'two', {'e': None}],
+           'f': 'g'}
+
+    def test_lookup(self, write_json):
+        """Lookups scan only as far as needed."""
+        d = lazy.load_lazy(write_json(self.obj, indent=1))
+        assert d['a']['b']['c'] == 0
+        assert list(d.offsets) == ['a']
+        assert 'f' in d
+        assert 'z' not in d
+        assert d.done
+
+    def test_iter(self, write_json):
+        """Iteration scans keys only as far as consumed."""
+        d = lazy.load_lazy(write_json(self.obj, indent=1))
+        keys = iter(d)
+        assert next(keys) == 'a'
+        assert list(d.offsets) == ['a']
+        assert d['f'] == 'g'
+        assert list(keys) == ['d', 'f']
+
+    def test_containers(self, write_json):
+        """Containers behave like dicts and lists."""
+        d = lazy.load_lazy(write_json(self.obj, indent=1))
+        assert d == self.obj
+        assert sorted(d.keys()) == ['a', 'd', 'f']
+        assert len(d['d']) == 3
+        assert d['d'][2]['e'] is None
+        assert d['d'][-1].load() == {'e': None}
+        assert d.load() == self.obj
+
+    def test_jbro_helpers(self, write_json):
+        """Lazy documents plug into jbro helpers."""
+        d = lazy.load_lazy(write_json(self.obj, indent=1))
+        assert jbro.find_key(d, 'a.b.c') == 0
+        assert jbro.find_key(d, 'a.x') is None
+        assert jbro.count_keys(d) == jbro.count_keys(self.obj)
+        assert jbro.max_depth(d) == jbro.max_depth(self.obj)
+        assert json.dumps(d, sort_keys=True, default=lazy.materialize) == \
+            json.dumps(self.obj, sort_keys=True)
@@ -0,0 +1,59 @@
+"""Test cases for jbro parallel module, assumes Pytest."""
+
+import json
+
+from jsonutils.jbro import jsonl, parallel
+
+
+def write_records(tmpdir, n, name='data.jsonl'):
+    """Write n varied records as JSON Lines in tmpdir, return filename."""
+    path = str(tmpdir.join(name))
+    with open(path, 'w') as f:
+        for i in range(n):
+            record = {'id': i, 'user': {'name': 'u' * (i % 7)}}
+            if i % 3 == 0:
+                record['tags'] = [{'id': i}] * (i % 4)
+            if i % 5 == 0:
+                record['user']['id'] = i
+            f.write(json.dumps(record) + '\n')
+            if i % 11 == 0:
+                f.write('\n' if i % 2 else 'invalid\n')
+    return path
+
+
+class TestParallel:
+    """Test splitting and merging of partial aggregates."""
+
+    def test_split_ranges(self, tmpdir):
+        """Ranges cover the file and start at line starts."""
+        path = write_records(tmpdir, 50)
+        with open(path, 'rb') as f:
+            raw = f.read()
+        for n in (1, 2, 3, 7, 500):
+            ranges = parallel.split_ranges(path, n)
+            assert ranges[0][0] == 0 and ranges[-1][1] == len(raw)
+            assert len(ranges) <= n
+            for (_, end), (start, _) in zip(ranges, ranges[1:]):
+                assert end == start
+                assert raw[start - 1:start] == b'\n'
+
+    def test_merge(self, tmpdir):
+        """Merged parallel results match a sequential scan."""
+        path = write_records(tmpdir, 200)
+        options = dict(keys=True, describe=True, find='id', examples=5,
+                       infer=True, profile=True)
+        seq = jsonl.scan(path, jsonl.Aggregate(**options))
+        for workers in (2, 3):
+            par = parallel.scan(path, workers, **options)
+            assert (par.lines, par.records, par.invalid) == \
+                (seq.lines, seq.records, seq.invalid)
+            assert par.key_paths() == seq.key_paths()
+            assert par.stats.lines() == seq.stats.lines()
+            assert list(par.infer.collapse().lines()) == \
+                list(seq.infer.collapse().lines())
+            # ties of rare values may keep different candidates
+            par_name, seq_name = (agg.infer.root.children['user']
+                                  .children['name'].top for agg in (par, seq))
+            assert par_name.top(3) == seq_name.top(3)
+            assert par.patterns == seq.patterns
+            assert par.hits == seq.hits
@@ -0,0 +1,89 @@
+"""Test cases for jbro pretty module, assumes Pytest."""
+
+import json
+
+from jsonutils.jbro import lazy, pretty
+
+
+def dumps(obj):
+    """Return reference pretty print of obj."""
+    return json.dumps(obj, indent=2, sort_keys=True)
+
+
+class FirstItemList(list):
+    """List that fails if iterated past its first item."""
+
+    def __iter__(self):
+        yield 0
+        raise AssertionError('consumed past first item')
+
+
+class TestIterPretty:
+    """Test incremental pretty print against json.dumps."""
+
+    objs = [{}, [], 0, 'a', None, [[[]]], {'a': {'b': {}}},
+            {'b': [1, {}, [], {'x': None}], 'a': 'tab\t "q"',
+             'c': -1.5e-10, 'd': True, 'e': False, 'f': 2 ** 70},
+            [float('nan'), float('inf'), float('-inf')]]
+
+    def test_equal(self):
+        """Joined chunks equal json.dumps output."""
+        for obj in self.objs:
+            assert ''.join(pretty.iter_pretty(obj)) == dumps(obj)
+
+    def test_big_int(self):
+        """Integers beyond the machine word are encoded as numbers."""
+        for val in [12345678901234567890, -2 ** 64, [2 ** 100]]:
+            assert ''.join(pretty.iter_pretty(val)) == dumps(val)
+        assert pretty.encode_scalar(2 ** 64) == '18446744073709551616'
+
+    def test_unsorted_indent(self):
+        """Key order and indent are honoured."""
+        obj = {'b': [1, 2], 'a': {'c': 3}}
+        out = ''.join(pretty.iter_pretty(obj, indent=4, sort_keys=False))
+        assert out == json.dumps(obj, indent=4)
+
+    def test_deep_nesting(self):
+        """Nesting beyond the recursion limit is printed."""
+        obj = 0
+        for _ in range(5000):
+            obj = {'k': [obj]}
+        out = ''.join(pretty.iter_pretty(obj))
+        assert out.count('"k"') == 5000
+
+    def test_incremental(self):
+        """First chunks are produced without consuming the document."""
+        chunks = pretty.iter_pretty(FirstItemList())
+        assert next(chunks) == '['
+        assert next(chunks) == '\n  0'
+
+    def test_lazy(self, tmpdir):
+        """Lazy containers are printed without materializing."""
+        obj = {'a': [1, {'b': 'c'}], 'd': None}
+        path = str(tmpdir.join('data.json'))
+        with open(path, 'w') as f:
+            json.dump(obj, f)
+        d = lazy.load_lazy(path)
+        assert ''.join(pretty.iter_pretty(d)) == dumps(obj)
+
+
+class TestTake:
+    """Test early termination."""
+
+    def test_take(self):
+        """Only as many chunks as needed are consumed."""
+        obj = {'a': 1, 'b': 2}
+        for n in (0, 1, 5, 100):
+            chunks = pretty.iter_pretty(obj)
+            assert pretty.take(chunks, n) == dumps(obj)[:n]
+        chunks = pretty.iter_pretty(FirstItemList())
+        assert pretty.take(chunks, 4) == '[\n  '
+
+
+class TestBatched:
+    """Test batching of chunks."""
+
+    def test_batched(self):
+        chunks = ['ab', 'c', 'def', 'g']
+        assert list(pretty.batched(chunks, 3)) == ['abc', 'def', 'g']
+        assert list(pretty.batched([], 3)) == []
@@ -0,0 +1,78 @@
+"""Test cases for jbro query module, assumes Pytest."""
+
+import io
+import json
+
+import pytest
+
+from jsonutils.jbro import lazy, query, stream
+
+
+DATA = {'a': {'b': [{'c': 1}, {'c': 2, 'd': {'c': 3}}], 'bb': 5},
+        'x.y': 7,
+        'c': {'c': [1]}}
+
+QUERIES = ['a.b', 'a.b[1].c', 'a.b[*].c', 'a.b*', '..c', 'a..c', '$["x.y"]',
+           '*', 'a.b[5]', '', 'a.b[0].c.z', '..b[*]..c', '..*', '..[*]']
+
+
+class TestParse:
+    """Test query parsing."""
+
+    def test_steps(self):
+        steps = query.parse('$.a[0]..b[*].*["c.d"]')
+        assert [(kind, rec) for kind, _, rec in steps] == [
+            ('key', False), ('index', False), ('key', True),
+            ('any_index', False), ('any_key', False), ('key', False)]
+        assert steps[-1][1] == 'c.d'
+
+    def test_invalid(self):
+        for text in ['a..', 'a[', 'a[x]', 'a[0]b', '.']:
+            with pytest.raises(ValueError):
+                query.compile(text)
+
+
+class TestFind:
+    """Test in-memory evaluation."""
+
+    def test_paths(self):
+        """Matches with full paths, in document order."""
+        q = query.compile('..c')
+        assert q.find_all(DATA) == [(('a', 'b', 0, 'c'), 1),
+                                    (('a', 'b', 1, 'c'), 2),
+                                    (('a', 'b', 1, 'd', 'c'), 3),
+                                    (('c',), {'c': [1]}),
+                                    (('c', 'c'), [1])]
+        assert query.compile('a.b*').find_all(DATA) == [
+            (('a', 'b'), DATA['a']['b']), (('a', 'bb'), 5)]
+
+    def test_find(self):
+        """First match, or None."""
+        assert query.compile('a.b[1].d.c').find(DATA) == 3
+        assert query.compile('a.z').find(DATA) is None
+        assert query.compile('').find(DATA) == DATA
+
+    def test_lazy(self, tmpdir):
+        """Literal steps look up keys without scanning whole objects."""
+        path = str(tmpdir.join('data.json'))
+        with open(path, 'w') as f:
+            json.dump(DATA, f)
+        d = lazy.load_lazy(path)
+        assert query.compile('a.b[0].c').find(d) == 1
+        assert list(d.offsets) == ['a']
+        assert query.compile('..c').find_all(d) == \
+            query.compile('..c').find_all(DATA)
+
+
+class TestStream:
+    """Test evaluation over parse events."""
+
+    def test_equal(self):
+        """Streaming matches equal in-memory matches."""
+        f = io.BytesIO(json.dumps(DATA).encode('utf-8'))
+        for text in QUERIES:
+            q = query.compile(text)
+            c = stream.Query(q)
+            f.seek(0)
+            stream.run(f, [c])
+            assert c.hits == q.find_all(DATA), text
@@ -0,0 +1,102 @@
+"""Test cases for jbro repl module, assumes Pytest."""
+
+from jsonutils.jbro import jbro, lazy, repl
+
+DATA = {'a': {'b': 1, 'c': {'a': 2}},
+        'ab': [{'a': 3}, 4],
+        'd': {'e.f': {'a': 5}}}
+
+
+class TestHelpers:
+    """Test completion and index helpers."""
+
+    def test_complete_prefix(self):
+        """Complete one nested key at a time."""
+        f = repl.complete_prefix
+        names = sorted(jbro.get_all_keys(DATA))
+        assert f(names, '') == ['a', 'a.', 'ab', 'd', 'd.']
+        assert f(names, 'a.') == ['a.b', 'a.c', 'a.c.']
+        assert f(names, 'a.c.') == ['a.c.a']
+        assert f(names, 'x') == []
+
+    def test_key_index(self):
+        """Occurrences match recursive find, in document order."""
+        index = repl.key_index(DATA)
+        for key in ['a', 'b', 'e.f', 'x']:
+            assert (index.get(key, []) ==
+                    list(jbro.iter_key_rec(DATA, key)))
+        assert [path for path, _ in index['a']] == [
+            ('a',), ('ab', 0, 'a'), ('d', 'e.f', 'a')]
+
+    def test_key_index_order(self):
+        """Nested occurrences come before those in later siblings."""
+        data = {'z': {'x': 1, 'y': [{'x': 3}]}, 'x': 2}
+        index = repl.key_index(data)
+        assert index['x'] == list(jbro.iter_key_rec(data, 'x')) == [
+            (('z', 'x'), 1), (('z', 'y', 0, 'x'), 3), (('x',), 2)]
+
+
+class TestSession:
+    """Test session commands against resident data."""
+
+    def test_commands(self, capsys):
+        """Commands print results and timing; indexes are built once."""
+        session = repl.Session(DATA, 'data.json', quiet=True)
+        assert session._keys is None
+        session.onecmd(session.precmd('findrec a 2'))
+        session.postcmd(False, 'findrec a 2')
+        out = capsys.readouterr().out
+        assert "a\t{'b': 1, 'c': {'a': 2}}" in out
+        assert 'ab[0].a\t3' in out
+        assert 'd.e.f.a' not in out
+        assert out.rstrip().endswith('ms)')
+
+        keys = session._keys
+        session.onecmd('findrec b')
+        assert session._keys is keys
+        assert 'a.b\t1' in capsys.readouterr().out
+
+    def test_lazy(self, capsys, write_json):
+        """Lookups keep a lazy root; traversals load it in full, once."""
+        session = repl.Session(lazy.load_lazy(write_json(DATA)), 'data.json',
+                               quiet=True)
+        session.onecmd('find a.b')
+        assert isinstance(session.data, lazy.LazyContainer)
+        session.onecmd('keysrec')
+        assert session.data == DATA and isinstance(session.data, dict)
+        assert capsys.readouterr().out.split()[1:] == jbro.get_all_keys(DATA)
+
+    def test_keys(self, capsys):
+        """List keys of data or of a nested key."""
+        session = repl.Session(DATA, 'data.json', quiet=True)
+        session.onecmd('keys a.c')
+        assert capsys.readouterr().out.split() == ['a']
+        session.onecmd('keys a.b')
+        assert 'Not an object.' in capsys.readouterr().out
+        session.onecmd('keysrec')
+        assert capsys.readouterr().out.split() == jbro.get_all_keys(DATA)
+
+    def test_errors(self, capsys):
+        """Invalid arguments and commands print a message."""
+        session = repl.Session(DATA, 'data.json', quiet=True)
+        assert not session.onecmd('sample x')
+        assert not session.onecmd('bogus')
+        out = capsys.readouterr().out
+        assert 'Expected a number, got x' in out
+        assert 'Unknown command bogus' in out
+        assert session.onecmd('quit')
+
+    def test_read_errors(self, capsys, monkeypatch, tmpdir):
+        """Unreadable files and failed lookups print a message and keep the
+        session.
+        """
+        session = repl.Session(DATA, str(tmpdir.join('gone.json')),
+                               quiet=True)
+        assert not session.onecmd('describe')
+        assert 'gone.json' in capsys.readouterr().out
+
+        def find(*args):
+            raise KeyError('b')
+        monkeypatch.setattr(jbro, 'find', find)
+        assert not session.onecmd('find a.b')
+        assert "KeyError: 'b'" in capsys.readouterr().out
@@ -0,0 +1,49 @@
+"""Test cases for jbro sampling module, assumes Pytest."""
+
+import random
+
+import pytest
+
+from jsonutils.jbro import sampling
+
+
+class TestSelect:
+    """Test sampling strategies."""
+
+    items = ['d', 'b', 'e', 'a', 'c']
+
+    def test_sorted(self):
+        """Smallest items, sorted."""
+        assert sampling.select(iter(self.items), 2) == ['a', 'b']
+        assert sampling.select(iter(self.items), 10) == sorted(self.items)
+
+    def test_first(self):
+        """First items, consuming no more than needed."""
+        items = iter(self.items)
+        assert sampling.select(items, 2, 'first') == ['d', 'b']
+        assert next(items) == 'e'
+
+    def test_random(self):
+        """Random items, in input order."""
+        rng = random.Random(0)
+        sample = sampling.select(iter(self.items), 3, 'random', rng)
+        assert len(sample) == 3
+        assert sample == [x for x in self.items if x in sample]
+        assert sampling.select(iter(self.items), 10, 'random') == self.items
+
+    def test_unknown(self):
+        with pytest.raises(ValueError):
+            sampling.select(self.items, 2, 'median')
+
+
+class TestReservoir:
+    """Test reservoir sampling."""
+
+    def test_uniform(self):
+        """Each item is kept with roughly equal probability."""
+        rng = random.Random(1)
+        counts = [0] * 10
+        for _ in range(2000):
+            for i in sampling.reservoir(range(10), 3, rng):
+                counts[i] += 1
+        assert all(500 < c < 700 for c in counts)
@@ -0,0 +1,55 @@
+"""Test cases for jbro shapes module, assumes Pytest."""
+
+import io
+import json
+
+from jsonutils.jbro import jbro, shapes, stream
+
+
+DATA = {'stocks': {'C': {'price': 1, 'name': 'x'},
+                   'BAC': {'price': 2, 'name': 'y'}},
+        'path': 'p',
+        'users': [{'id': 1, 'tags': [{'t': 1}]},
+                  {'id': 2, 'x': {'a': 1}}]}
+
+
+class TestShapes:
+    """Test collapsing of key paths into shapes."""
+
+    def test_arrays(self):
+        """Array indexes are collapsed."""
+        s = shapes.Shapes()
+        for path in [('a', 0, 'b'), ('a', 1, 'b'), ('a', 1, 'c'), ('d',)]:
+            s.add(path)
+        assert list(s.collapse().lines()) == [
+            ('a[*].b', 2), ('a[*].c', 1), ('d', 1)]
+
+    def test_subtrees(self):
+        """Keys with identical non-empty structure are collapsed."""
+        assert list(jbro.key_shapes(DATA).lines()) == [
+            ('path', 1),
+            ('stocks', 1), ('stocks.*', 2), ('stocks.*.name', 2),
+            ('stocks.*.price', 2),
+            ('users', 1), ('users[*].id', 2), ('users[*].tags', 1),
+            ('users[*].tags[*].t', 1), ('users[*].x', 1),
+            ('users[*].x.a', 1)]
+
+    def test_scalars(self):
+        """Keys of scalars, or of differing structure, are not collapsed."""
+        d = {'a': 1, 'b': 2, 'c': {'x': 1}, 'd': {'y': 1}}
+        assert [shape for shape, _ in jbro.key_shapes(d).lines()] == \
+            ['a', 'b', 'c', 'c.x', 'd', 'd.y']
+
+    def test_nested(self):
+        """Collapsed children make their parents' subtrees identical."""
+        d = {'u1': {'k1': {'v': 1}, 'k2': {'v': 2}},
+             'u2': {'k3': {'v': 3}, 'k4': {'v': 4}}}
+        assert list(jbro.key_shapes(d).lines()) == [
+            ('*', 2), ('*.*', 4), ('*.*.v', 4)]
+
+    def test_stream(self):
+        """Streamed shapes equal in-memory shapes."""
+        c = stream.KeyShapes(shapes.Shapes())
+        stream.run(io.BytesIO(json.dumps(DATA).encode('utf-8')), [c])
+        assert list(c.shapes.collapse().lines()) == \
+            list(jbro.key_shapes(DATA).lines())
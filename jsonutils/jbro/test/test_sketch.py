@@ -0,0 +1,107 @@
+"""Test cases for jbro sketch module, assumes Pytest."""
+
+import pytest
+
+from jsonutils.jbro import sketch
+
+
+class TestHyperLogLog:
+    """Test distinct count estimates."""
+
+    def test_fingerprint(self):
+        """Hashes are stable and distinguish types."""
+        f = sketch.fingerprint
+        assert f('a') == f('a')
+        assert len(set([f('1'), f(1), f(1.0), f(True), f(None)])) == 5
+        assert 0 <= f(u'\ud800') < 2 ** 64
+
+    def test_small(self):
+        """Small counts are nearly exact."""
+        hll = sketch.HyperLogLog()
+        for i in range(100):
+            hll.add(i % 10)
+        assert hll.estimate() == 10
+        assert sketch.HyperLogLog().estimate() == 0
+
+    def test_large(self):
+        """Large counts are within a few standard errors."""
+        hll = sketch.HyperLogLog()
+        for i in range(50000):
+            hll.add('value {:d}'.format(i))
+        assert abs(hll.estimate() - 50000) < 50000 * 0.1
+
+    def test_merge(self):
+        """Merged sketch equals sketch of all values."""
+        a, b, both = (sketch.HyperLogLog() for _ in range(3))
+        for i in range(3000):
+            (a if i % 2 else b).add(i)
+            both.add(i)
+        assert a.merge(b).registers == both.registers
+        with pytest.raises(ValueError):
+            a.merge(sketch.HyperLogLog(12))
+        with pytest.raises(ValueError):
+            sketch.HyperLogLog(20)
+
+
+class TestCountMin:
+    """Test frequency estimates."""
+
+    def test_estimate(self):
+        """Estimates are never below the true count."""
+        cms = sketch.CountMin(width=64, depth=3)
+        for i in range(1000):
+            cms.add(i % 50)
+        cms.add('x', 5)
+        assert cms.total == 1005
+        assert all(cms.estimate(i) >= 20 for i in range(50))
+        assert cms.estimate('x') >= 5
+        assert sketch.CountMin().estimate('missing') == 0
+
+    def test_merge(self):
+        """Merged counts bound the counts of both streams."""
+        a, b = sketch.CountMin(), sketch.CountMin()
+        a.add('x', 3)
+        b.add('x', 4)
+        assert a.merge(b).estimate('x') == 7
+        with pytest.raises(ValueError):
+            a.merge(sketch.CountMin(width=16))
+
+
+class TestTopK:
+    """Test heavy hitters."""
+
+    def skewed(self, n):
+        """Return list of n values, value i occurring about n / 2 ** i
+        times, mixed with unique values.
+        """
+        out = []
+        for i in range(n):
+            level = (i & -i).bit_length() if i else 1
+            out.append('v{:d}'.format(level) if level < 6 else i)
+        return out
+
+    def test_top(self):
+        """Most frequent values are found in order despite eviction."""
+        top = sketch.TopK(capacity=10)
+        for val in self.skewed(20000):
+            top.add(val)
+        assert [val for val, _ in top.top(4)] == ['v1', 'v2', 'v3', 'v4']
+        assert top.top(1)[0][1] >= 10000
+
+    def test_noise(self):
+        """Values within the error bound are not reported."""
+        top = sketch.TopK(width=16)
+        for i in range(1000):
+            top.add(i)
+        assert top.top(5) == []
+
+    def test_merge(self):
+        """Merged candidates are ranked by merged counts."""
+        values = self.skewed(20000)
+        a, b = sketch.TopK(capacity=10), sketch.TopK(capacity=10)
+        for i, val in enumerate(values):
+            (a if i % 3 else b).add(val)
+        whole = sketch.TopK(capacity=10)
+        for val in values:
+            whole.add(val)
+        assert a.merge(b).top(5) == whole.top(5)
@@ -0,0 +1,56 @@
+"""Test cases for jbro stats module, assumes Pytest."""
+
+import io
+import json
+
+from jsonutils.jbro import jbro, stats, stream
+
+
+class TestHelpers:
+    """Test the formatting helpers."""
+
+    def test_path_str(self):
+        """Paths in form key1.key2[0]..."""
+        f = stats.path_str
+        assert f(()) == '(root)'
+        assert f(('a', 'b')) == 'a.b'
+        assert f(('a', 0, 'b')) == 'a[0].b'
+
+    def test_bucket(self):
+        """Power-of-two buckets."""
+        assert [stats.bucket(n) for n in (0, 1, 2, 3, 4, 7, 8)] == \
+            [0, 1, 2, 2, 3, 3, 4]
+        assert stats.bucket_str(0) == '0'
+        assert stats.bucket_str(1) == '1'
+        assert stats.bucket_str(3) == '4-7'
+
+
+class TestStats:
+    """Test statistics computed in a single pass."""
+
+    obj = {'1': {'2': 0},
+           '3': 'abc',
+           '4': [0, 'de', {'5': {'6': None}}, []],
+           '7': {'a': 1, 'b': 2, 'c': True}}
+
+    def test_describe_data(self):
+        """Match jbro.count_keys and jbro.max_depth, plus richer stats."""
+        s = stats.describe_data(self.obj)
+        assert s.top == 4
+        assert s.total == jbro.count_keys(self.obj)
+        assert s.depth == jbro.max_depth(self.obj)
+        assert s.nesting == 4
+        assert s.types == {'object': 5, 'array': 2, 'string': 2,
+                           'number': 4, 'boolean': 1, 'null': 1}
+        assert (s.array_lens.count, s.array_lens.max) == (2, 4)
+        assert (s.string_lens.min, s.string_lens.max) == (2, 3)
+        assert s.string_buckets == {2: 2}
+        assert s.widest == ((), 4)
+        assert s.chars is None
+
+    def test_stream(self):
+        """Streamed stats match in-memory stats, with byte counts."""
+        raw = json.dumps(self.obj).encode('utf-8')
+        s = stats.Stats()
+        stream.run(io.BytesIO(raw), [s])
+        assert s.lines() == stats.describe_data(self.obj).lines(len(raw))
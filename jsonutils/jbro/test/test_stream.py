@@ -0,0 +1,149 @@
+"""Test cases for jbro stream module, assumes Pytest."""
+
+import io
+import json
+import pytest
+
+from jsonutils.jbro import stream
+
+
+def events(obj, chunk_size=stream.CHUNK_SIZE):
+    """Return list of parse events for JSON serialization of obj."""
+    f = io.BytesIO(json.dumps(obj).encode('utf-8'))
+    return list(stream.parse(f, chunk_size))
+
+
+class TestParser:
+    """Test the tokenizer and event parser."""
+
+    def test_tokenize(self):
+        """Tokens carry byte offsets."""
+        f = io.BytesIO(b' {"a": [1, 2.5, true, null]}')
+        toks = list(stream.tokenize(f, 4))
+        assert toks[0] == ('{', None, 1, 2)
+        assert toks[1] == ('string', 'a', 2, 5)
+        assert ('number', 2.5, 11, 14) in toks
+        assert ('boolean', True, 16, 20) in toks
+        assert ('null', None, 22, 26) in toks
+
+    def test_parse_paths(self):
+        """Events carry path to each value."""
+        evs = events({'a': {'b': [1, 'x']}})
+        paths = [(path, event) for path, event, _, _, _ in evs]
+        assert paths == [((), 'start_map'),
+                         (('a',), 'start_map'),
+                         (('a', 'b'), 'start_array'),
+                         (('a', 'b', 0), 'number'),
+                         (('a', 'b', 1), 'string'),
+                         (('a', 'b'), 'end_array'),
+                         (('a',), 'end_map'),
+                         ((), 'end_map')]
+
+    def test_small_chunks(self):
+        """Tokens split across chunk boundaries are reassembled."""
+        obj = {'keyé': ['va"lue', 12345, -1.5e3, False, {}, []]}
+        for chunk_size in (1, 2, 3, 7):
+            assert events(obj, chunk_size) == events(obj)
+
+    def test_invalid_early(self):
+        """Invalid tokens are reported without reading to the end."""
+        for raw, msg in [(b'[1, xyz', 'Invalid JSON at byte 4'),
+                         (b'["a\\\nb"', 'Invalid JSON at byte 1')]:
+            f = io.BytesIO(raw + b' ' * 1000)
+            with pytest.raises(ValueError) as e:
+                list(stream.tokenize(f, 2))
+            assert str(e.value) == msg
+            assert f.tell() < 20
+        with pytest.raises(ValueError) as e:
+            list(stream.tokenize(io.BytesIO(b'["abc\\"'), 2))
+        assert str(e.value) == 'Unterminated string at byte 1'
+        f = io.BytesIO(b'["' + b'a' * 1000)
+        with pytest.raises(ValueError) as e:
+            list(stream.tokenize(f, 2, 100))
+        assert str(e.value) == 'Token longer than 100 bytes at byte 1'
+        assert f.tell() < 200
+
+    def test_nan(self):
+        """NaN and Infinity decode as with json.loads, across chunks."""
+        raw = b'{"a": [NaN, Infinity, -Infinity, -1], "b": NaN}'
+        for chunk_size in (1, 2, 3, stream.CHUNK_SIZE):
+            it = stream.parse(io.BytesIO(raw), chunk_size)
+            _, event, value, _, _ = next(it)
+            # NaN != NaN, so compare encodings
+            assert (json.dumps(stream.build(event, value, it)) ==
+                    json.dumps(json.loads(raw.decode('ascii'))))
+        toks = list(stream.tokenize(io.BytesIO(b'[-Infinity]')))
+        assert toks[1] == ('number', float('-inf'), 1, 10)
+        with pytest.raises(ValueError):
+            list(stream.tokenize(io.BytesIO(b'[Infinit]')))
+
+    def test_build(self):
+        """Rebuild Python objects from events."""
+        obj = {'a': [1, {'b': None}], 'c': {'d': 'e'}}
+        it = iter(events(obj))
+        _, event, value, _, _ = next(it)
+        assert stream.build(event, value, it) == obj
+
+    def test_events_from(self):
+        """In-memory events match parsed events, without offsets."""
+        obj = {'a': [1, {'b': None}, []], 'c': {}, 'd': 'e'}
+        parsed = [e[:3] for e in events(obj)]
+        assert [e[:3] for e in stream.events_from(obj)] == parsed
+
+    def test_invalid(self):
+        """Malformed JSON raises ValueError."""
+        for raw in (b'{"a": 1', b'{"a" 1}', b'[1 2]', b'{} {}', b'', b'{a}'):
+            with pytest.raises(ValueError):
+                list(stream.parse(io.BytesIO(raw)))
+
+
+class TestConsumers:
+    """Test single-pass consumers against their in-memory equivalents."""
+
+    def run(self, obj, consumers):
+        f = io.BytesIO(json.dumps(obj).encode('utf-8'))
+        stream.run(f, consumers)
+        return f
+
+    def test_keys(self):
+        """Top-level and recursive keys."""
+        top, every = stream.TopKeys(), stream.AllKeys()
+        self.run({'a': 'b', 'c': 'd', 'e': {'a': 'f'}}, [top, every])
+        assert top.keys == ['a', 'c', 'e']
+        assert every.keys == ['a', 'c', 'e', 'e.a']
+
+    def test_find(self):
+        """Find nested key, stopping once found."""
+        hit, miss = stream.Find('a.b'), stream.Find('a.d')
+        self.run({'a': {'b': {'c': [0]}}}, [hit, miss])
+        assert hit.value == {'c': [0]}
+        assert miss.value is None
+
+    def test_find_all(self):
+        """Find all occurrences of key with path, including in lists."""
+        c = stream.FindAll('a')
+        self.run({'a': 'b', 'c': [{'a': 'd'}], 'e': {'a': {'a': 'f'}}}, [c])
+        assert c.hits == [(('a',), 'b'), (('c', 0, 'a'), 'd'),
+                          (('e', 'a'), {'a': 'f'})]
+
+    def test_find_all_limit(self):
+        """Stop after limit hits, emitting each."""
+        hits = []
+        c = stream.FindAll('a', 2, lambda *hit: hits.append(hit))
+        self.run({'a': 'b', 'c': [{'a': 'd'}], 'e': {'a': {'a': 'f'}}}, [c])
+        assert hits == [(('a',), 'b'), (('c', 0, 'a'), 'd')]
+        assert c.hits == []
+
+    def test_sample(self):
+        """Sample smallest keys, reading values by byte range."""
+        c = stream.Sample(2)
+        f = self.run({'c': 3, 'a': [1], 'b': {'x': 2}}, [c])
+        assert c.pairs(f) == [('a', [1]), ('b', {'x': 2})]
+
+    def test_sample_modes(self):
+        """Sample first keys in file order, or random keys."""
+        obj = {'c': 3, 'a': [1], 'b': {'x': 2}}
+        first, rand = stream.Sample(2, 'first'), stream.Sample(3, 'random')
+        f = self.run(obj, [first, rand])
+        assert first.pairs(f) == [('c', 3), ('a', [1])]
+        assert rand.pairs(f) == list(obj.items())
@@ -1 +1 @@
-__all__ = ['lws', 'lws_logger']
+__all__ = ['bulk', 'lws', 'lws_logger']
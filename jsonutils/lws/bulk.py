@@ -0,0 +1,179 @@
+"""Bulk validation of many documents against one lws schema.
+
+The schema is loaded and compiled once, and each record is validated with
+lws.find_errors, which counts errors as lws.validate does without building
+logs. Records are the lines of a JSON Lines file, or the files of a
+directory (each line of JSON Lines files in it), and may be compressed.
+
+Records are read, validated and reported one at a time, with a line of
+PASS or FAIL and the first errors of each. Errors are aggregated by kind
+and schema path, e.g. 'root.dict of stocks.ticker.stock price', where
+unknown data keys are counted under the path of their level followed by
+'*', so that memory use depends on the size of the schema rather than on
+the number of records or of distinct data keys.
+"""
+
+import os
+import pickle
+import sys
+from jsonutils import backend, codec
+from jsonutils.jbro import jsonl
+from jsonutils.lws import lws
+
+EXAMPLES = 3
+
+# raised by missing files, files that are not pickles, and pickles that are
+# not lws schemas
+SCHEMA_ERRORS = (IOError, EOFError, ValueError, TypeError, AttributeError,
+                 pickle.UnpicklingError)
+
+# Records
+
+def iter_file(filename, lines):
+    """Yield (filename, line number, bytes) of records of file: each line
+    if lines, else the whole file as line 1. Blank lines are skipped.
+    """
+    with codec.open(filename) as f:
+        records = jsonl.iter_lines(f) if lines else [(1, f.read())]
+        for line_no, raw in records:
+            if raw.strip():
+                yield filename, line_no, raw
+
+def iter_records(path, lines=False):
+    """Yield (filename, line number, bytes) of records of path.
+    Args
+        path: str of file, or of directory whose files are read in name
+            order, skipping hidden files
+        lines: bool, treat files as JSON Lines (default for .jsonl and
+            .ndjson files)
+    """
+    if not os.path.isdir(path):
+        return iter_file(path, lines or jsonl.is_jsonl(path))
+    names = sorted(name for name in os.listdir(path)
+                   if not name.startswith('.') and
+                   os.path.isfile(os.path.join(path, name)))
+    return (record for name in names
+            for record in iter_file(os.path.join(path, name),
+                                    lines or jsonl.is_jsonl(name)))
+
+def check(validator, raw):
+    """Return list of errors of JSON bytes raw (see lws.find_errors), or
+    None if raw is not valid JSON.
+    """
+    try:
+        record = backend.loads(raw)
+    except ValueError:
+        return None
+    return lws.find_errors(validator, {'root': record})
+
+# Summary
+
+def error_path(error):
+    """Return str of schema path of (kind, path, key) error, as aggregated
+    by Summary.
+    """
+    kind, path, key = error
+    return '.'.join(str(name) for name in
+                    path + ('*' if kind == lws.UNKNOWN else key,))
+
+def error_str(error):
+    """Return str of (kind, path, key) error of a record."""
+    kind, path, key = error
+    return '{} {}'.format(kind,
+                          '.'.join(str(name) for name in path + (key,)))
+
+def record_str(filename, line_no, errors):
+    """Return str of result of validating record at filename, line_no."""
+    status = ('invalid JSON' if errors is None else
+              'PASS' if not errors else
+              'FAIL\t{:,d} errors: {}{}'.format(
+                  len(errors), '; '.join(map(error_str, errors[:EXAMPLES])),
+                  '; ...' if len(errors) > EXAMPLES else ''))
+    return '{}:{}\t{}'.format(filename, line_no, status)
+
+class Summary(object):
+    """Aggregate results of validating records."""
+
+    def __init__(self):
+        self.records, self.passed, self.failed, self.invalid = 0, 0, 0, 0
+        self.errors = {}        # (kind, schema path) -> count
+
+    def add(self, errors):
+        """Add errors of a record, or None for invalid JSON."""
+        self.records += 1
+        if errors is None:
+            self.invalid += 1
+        elif not errors:
+            self.passed += 1
+        else:
+            self.failed += 1
+            for error in errors:
+                key = (error[0], error_path(error))
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def counts(self):
+        """Return list of (count, kind, schema path), most frequent first."""
+        return sorted(((n, kind, path)
+                       for (kind, path), n in self.errors.items()),
+                      key=lambda t: (-t[0], t[1], t[2]))
+
+    def report(self):
+        """Return str of summary."""
+        lines = ['Records:\t{:,d}'.format(self.records),
+                 'Passed:\t\t{:,d}'.format(self.passed),
+                 'Failed:\t\t{:,d}'.format(self.failed),
+                 'Invalid JSON:\t{:,d}'.format(self.invalid)]
+        if self.errors:
+            lines.extend(['', '{:>10}  {:<14} {}'.format('count', 'error',
+                                                         'path')])
+            lines.extend('{:>10,d}  {:<14} {}'.format(n, kind, path)
+                         for n, kind, path in self.counts())
+        return '\n'.join(lines)
+
+# Main
+
+def validate(validator, records, out=None, failures=False):
+    """Validate records against validator, return Summary.
+    Args
+        validator: lws.Validator, e.g. from lws.load_validator
+        records: iterable of (filename, line number, bytes)
+        out: file to write a line per record to, or None
+        failures: bool, only write lines of records that did not pass
+    """
+    summary = Summary()
+    for filename, line_no, raw in records:
+        errors = check(validator, raw)
+        summary.add(errors)
+        if out is not None and (errors != [] or not failures):
+            out.write(record_str(filename, line_no, errors) + '\n')
+    return summary
+
+def main(args):
+    """Validate records of args from argparse, print results and summary.
+    Return True if all records passed.
+    """
+    if args.backend:
+        try:
+            backend.use(args.backend)
+        except ValueError as e:
+            print(e)
+            return False
+
+    try:
+        validator = lws.load_validator(args.schema)
+    except SCHEMA_ERRORS as e:
+        print('Could not read schema {}: {}'.format(args.schema, e))
+        return False
+
+    out = None if args.summary else sys.stdout
+    try:
+        summary = validate(validator, iter_records(args.path, args.jsonl),
+                           out, args.failures)
+    except codec.ERRORS as e:
+        print('Could not read {}: {}'.format(args.path, e))
+        return False
+
+    if out is not None:
+        print('')
+    print(summary.report())
+    return summary.records == summary.passed
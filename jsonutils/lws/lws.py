@@ -3,17 +3,27 @@
 Validate both schema against data and data against schema, where
 schema is a pickled dictionary object and data is JSON.
 
+Schemas are compiled once into a Validator (see compile_schema), which
+can be reused to validate any number of documents.
+
 Generate graph of data as adjacency list and pass to lws_logger for
 generating a string of validation report.
 """
 
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 import sys
 import re
-import json
 import pickle
+from jsonutils import backend, codec, traverse
 from jsonutils.lws import lws_logger
 
+try:
+    from types import MappingProxyType
+except ImportError:
+    # Python 2: compiled trees are the dicts themselves, not read-only views
+    def MappingProxyType(d):
+        return d
+
 ERRORS = {'key': hash('error key'),
           'key_str': '*** Key error',
           'val': hash('error value'),
@@ -27,15 +37,25 @@ def return_errors():
 
 # Type Validation
 
+def fullmatch(rule):
+    """Return function matching regex rule against whole strings, as
+    re.fullmatch (Python 3.4+).
+    """
+    pattern = re.compile(rule)
+    if hasattr(pattern, 'fullmatch'):
+        return pattern.fullmatch
+    return re.compile('(?:{})\\Z'.format(rule)).match
+
 def valid_text(val, rule):
-    """Return True if regex fully matches non-empty string of value."""
-    if callable(rule):
-        match = rule(val)
-    else:
-        match = re.findall(rule, val)
-    return (False if not match or not val else
-            True if match is True else
-            match[0] == val)
+    """Return True if regex fully matches non-empty string of value, or if
+    function rule returns True (or a match of the whole value).
+    """
+    if not val:
+        return False
+    if not callable(rule):
+        return fullmatch(rule)(val) is not None
+    match = rule(val)
+    return True if match is True else bool(match) and match[0] == val
 
 def valid_num(val, rule):
     """Default True, check against rule if provided."""
@@ -142,6 +162,13 @@ def valid_length(repeat, keys):
             True if repeat == '?' and len(keys) < 2 else
             False)
 
+def match_data_keys(data, spec):
+    """Return all keys in data matched by KeySpec spec, or none if their
+    number does not satisfy its repetition pattern.
+    """
+    found_keys = [data_key for data_key in data if spec.match(data_key)]
+    return found_keys if valid_length(spec.repeat, found_keys) else []
+
 def find_data_keys(data, schema_key):
     """Return all keys in data that match the schema key definition.
     Args
@@ -150,11 +177,7 @@ def find_data_keys(data, schema_key):
     Returns
         list of found keys
     """
-    dtype, rule, repeat = parse_schema_key(schema_key)
-    found_keys = [data_key for data_key in data
-                  if valid_data_key(data_key, dtype, rule)]
-
-    return found_keys if valid_length(repeat, found_keys) else []
+    return match_data_keys(data, compile_key(schema_key))
 
 def find_schema_keys(schema, data_key):
     """Return all keys in schema that match the data key definition.
@@ -164,13 +187,193 @@ def find_schema_keys(schema, data_key):
     Returns
         list of found keys
     """
-    found_keys = []
-    for schema_key in schema:
-        dtype, rule, _ = parse_schema_key(schema_key)
-        if valid_data_key(data_key, dtype, rule):
-            found_keys.append(schema_key)
+    specs = dict((key, compile_key(key)) for key in schema)
+    return list(match_key(index_keys(schema, specs), data_key))
+
+# Key Index
+# Each schema level indexes its keys by rule, so that a data key is matched
+# against the level with one dict lookup for literal rules and one regex
+# scan for the other regex rules, rather than with one regex call per key.
+# Regex rules are combined into one alternation, each followed by an empty
+# named group k<i> identifying the rule. Since a data key may match several
+# rules, the alternation of the rules after a matched rule is scanned next.
+# Results are cached per level for up to CACHE_SIZE distinct data keys, as
+# the same keys recur across the objects of a level and across documents.
+
+KeyIndex = namedtuple('KeyIndex', ['literals', 'patterns', 'others', 'order',
+                                   'tails', 'cache'])
+
+CACHE_SIZE = 4096
+
+LITERAL = re.compile(r'[^.^$*+?{}\[\]\\|()]+\Z')
+
+def is_literal(rule):
+    """Return True if regex rule only matches its own text."""
+    return isinstance(rule, str) and LITERAL.match(rule) is not None
+
+def is_combinable(rule):
+    """Return True if regex rule can be part of an alternation, i.e. has no
+    global flags, named groups or references to groups.
+    """
+    pattern = re.compile(rule)
+    return (pattern.flags == re.UNICODE and not pattern.groupindex and
+            re.search(r'\\[1-9]|\(\?\(', rule) is None)
+
+def index_keys(schema, specs):
+    """Return KeyIndex of keys of schema level.
+    Args
+        schema: dict of schema level
+        specs: dict of schema keys to KeySpec
+    Returns
+        KeyIndex of literals, dict of literal rules to tuples of keys;
+        patterns, list of (key, rule) of combinable regex rules; others,
+        list of (key, match) of other keys of text type; order, dict of
+        keys to position in level; tails, cache of compiled alternations;
+        and cache, of data keys to matching keys
+    """
+    literals, patterns, others, order = {}, [], [], {}
+    for i, key in enumerate(schema):
+        order[key] = i
+        dtype, rule, _ = parse_schema_key(key)
+        if classify(dtype) != 'text':
+            continue
+        elif is_literal(rule):
+            literals[rule] = literals.get(rule, ()) + (key,)
+        elif isinstance(rule, str) and is_combinable(rule):
+            patterns.append((key, rule))
+        else:
+            others.append((key, specs[key].match))
+    return KeyIndex(literals, patterns, others, order, {}, {})
+
+def tail(index, i):
+    """Return fullmatch of alternation of regex rules i... of KeyIndex
+    index, compiled on first use.
+    """
+    match = index.tails.get(i)
+    if match is None:
+        match = index.tails[i] = fullmatch('|'.join(
+            '(?:{})(?P<k{}>)'.format(rule, j)
+            for j, (_, rule) in enumerate(index.patterns) if j >= i))
+    return match
+
+def resolve_key(index, data_key):
+    """Return tuple of keys of schema level with KeyIndex index matching
+    data_key, in schema order, as valid_data_key.
+    """
+    found = index.cache.get(data_key)
+    if found is None:
+        if len(index.cache) >= CACHE_SIZE:
+            index.cache.clear()
+        found = index.cache[data_key] = match_key(index, data_key)
+    return found
+
+def match_key(index, data_key):
+    """Return tuple of keys of schema level with KeyIndex index matching
+    data_key, in schema order, without caching.
+    """
+    if data_key == '':
+        return ()
+    found = list(index.literals.get(data_key, ()))
+    i = 0
+    while i < len(index.patterns):
+        m = tail(index, i)(data_key)
+        if m is None:
+            break
+        i = int(m.lastgroup[1:])
+        found.append(index.patterns[i][0])
+        i += 1
+    found.extend(key for key, match in index.others if match(data_key))
+    return tuple(found if len(found) < 2 else
+                 sorted(found, key=index.order.get))
+
+# Schema Compilation
+# Schema key and value tuples are parsed, and their regexes compiled, once
+# per schema rather than once per data node. The compiled tree has the
+# shape of the schema, with leaf values replaced by Leaf checkers.
+
+KeySpec = namedtuple('KeySpec', ['name', 'match', 'repeat'])
+Leaf = namedtuple('Leaf', ['val', 'check'])
+Validator = namedtuple('Validator', ['tree', 'keys', 'index'])
+
+def always(val):
+    """Always True."""
+    return True
+
+def never(val):
+    """Always False."""
+    return False
+
+def compile_text(rule):
+    """Return function validating text against rule, as valid_text."""
+    if not isinstance(rule, str):
+        return lambda val: valid_text(val, rule)
+    match = fullmatch(rule)
+    return lambda val: val != '' and match(val) is not None
+
+def compile_key(key):
+    """Return KeySpec of schema key, matching data keys as valid_data_key.
+    """
+    dtype, rule, repeat = parse_schema_key(key)
+    match = compile_text(rule) if classify(dtype) == 'text' else never
+    return KeySpec(key[0], match, repeat)
 
-    return found_keys
+def compile_val(val):
+    """Return Leaf of schema value, checking data values as valid_data_val.
+    Type checks and rule checks are dispatched on the type of the value.
+    """
+    dtype, rule = parse_schema_val(val)
+    dtype = type(None) if dtype is None else dtype
+    is_type = (is_text if classify(dtype) == 'text' else
+               lambda data_val: isinstance(data_val, dtype))
+    equal = (rule if callable(rule) else
+             (lambda data_val: data_val == rule) if rule else
+             always)
+    checks = {str: compile_text(rule),
+              int: equal,
+              float: equal,
+              list: equal,
+              bool: (lambda data_val: data_val is rule) if rule != '' else
+                    always,
+              type(None): always,
+              dict: never}
+
+    def check(data_val):
+        rule_check = checks.get(type(data_val))
+        return is_type(data_val) and (
+            rule_check(data_val) if rule_check is not None else
+            match_vals(rule, data_val))
+
+    return Leaf(val, check)
+
+def compile_schema(schema):
+    """Compile schema dict into immutable Validator.
+    Returns
+        Validator of tree, read-only dicts of schema keys to compiled
+        subtrees or Leaf values; keys, read-only dict of every schema key
+        to its KeySpec; and index, read-only dict of id of every level of
+        tree to its KeyIndex (levels are kept alive by tree)
+    """
+    keys, index, tree = {}, {}, {}
+    stack = [(schema, tree, MappingProxyType(tree))]
+    root = stack[0][2]
+    while stack:
+        level, out, proxy = stack.pop()
+        for key, val in level.items():
+            if key not in keys:
+                keys[key] = compile_key(key)
+            if isinstance(val, dict):
+                sub = {}
+                out[key] = MappingProxyType(sub)
+                stack.append((val, sub, out[key]))
+            else:
+                out[key] = compile_val(val)
+        index[id(proxy)] = index_keys(level, keys)
+    return Validator(root, MappingProxyType(keys),
+                     MappingProxyType(index))
+
+def as_validator(schema):
+    """Return Validator of schema dict, or schema if already compiled."""
+    return schema if isinstance(schema, Validator) else compile_schema(schema)
 
 # Validation Helpers
 
@@ -192,29 +395,148 @@ def node_to_str(node):
 
 def walk(d, path):
     """Walk dict d using path as sequential list of keys, return last value."""
-    if not path: return d
-    return walk(d[path[0]], path[1:])
+    return traverse.walk(d, path)
+
+# Reconciliation
+
+def reconcile(schema, data):
+    """Validate schema against data and data against schema together, in
+    one traversal of both, checking each data value against its schema
+    value once.
+    Args
+        schema: dict of schema, or Validator compiled from it
+        data: dict of data
+    Returns
+        tuple of schema-centric log and data-centric log, each a graph of
+        validation as adjacency list
+    """
+
+    schema_log, data_log = defaultdict(list), defaultdict(list)
+    validator = as_validator(schema)
+    schema_root, data_root = validator.tree[('root', str)], data['root']
 
-def update_stack(fst_path, snd_path, fst, fst_key, snd_key):
-    """Update validation stack.
-    Accepts path walked in fst and snd dicts so far and returns next possible
-    keys in fst dict.
+    # stack of (schema log node, data log node, schema level, data dict),
+    # schema log node is None below schema keys with too few or many matches
+    stack = [(('root', 'root'), ('root', 'root'), schema_root, data_root)]
+    while stack:
+        s_parent, d_parent, schema_sub, data_sub = stack.pop()
+        index = validator.index[id(schema_sub)]
+
+        # as in the separate schema-centric and data-centric traversals,
+        # logs list the keys of each level in reverse order, and subtrees
+        # are visited last key first
+
+        # data-centric: match data keys, check values of matches
+        found = {}
+        for d_key, d_val in reversed(list(data_sub.items())):
+            s_keys = resolve_key(index, d_key)
+            # error case: data key not found in schema
+            if not s_keys:
+                data_log[d_parent].append((d_key, ERRORS['key']))
+                continue
+
+            for s_key in s_keys:
+                s_val = schema_sub[s_key]
+                # not end of branch, subtrees are added to stack below
+                if isinstance(d_val, dict) and not isinstance(s_val, Leaf):
+                    valid = None
+                    data_log[d_parent].append((d_key, s_key[0]))
+                # end of branch, check data value against schema
+                else:
+                    valid = isinstance(s_val, Leaf) and s_val.check(d_val)
+                    data_log[d_parent].append(
+                        (d_key, s_val.val if valid else ERRORS['val']))
+                found.setdefault(s_key, []).append((d_key, d_val, valid))
+
+        # schema-centric: log matches of each schema key, descend
+        subtrees = []
+        for s_key, s_val in reversed(list(schema_sub.items())):
+            matches = found.get(s_key, [])[::-1]
+            logged = (s_parent is not None and len(matches) > 0 and
+                      valid_length(validator.keys[s_key].repeat, matches))
+            # error case: schema key not found in data
+            if s_parent is not None and not logged:
+                schema_log[s_parent].append((s_key[0], ERRORS['key']))
+
+            for d_key, d_val, valid in matches:
+                if valid is None:
+                    node = (s_key[0], d_key) if logged else None
+                    subtrees.append((node, (d_key, s_key[0]), s_val, d_val))
+                    if logged:
+                        schema_log[s_parent].append(node)
+                elif logged:
+                    schema_log[s_parent].append(
+                        (s_key[0], d_val if valid else ERRORS['val']))
+        stack.extend(reversed(subtrees))
+
+    return schema_log, data_log
+
+MISSING, UNKNOWN, INVALID = 'missing key', 'unknown key', 'invalid value'
+
+def find_errors(schema, data):
+    """Return errors of data as reconcile finds them, in one traversal,
+    without building logs: key errors of schema keys (MISSING), key errors
+    of data keys (UNKNOWN), and value errors (INVALID) of data keys whose
+    values match none of their schema keys, as counted by gen_log.
     Args
-        fst_path: list of fst dict keys walked thus far
-        snd_path: list of snd dict keys walked thus far
-        fst: dict of fst dict
-        fst_key: string of next fst dict key
-        snd_key: string of next snd dict key
+        schema: dict of schema, or Validator compiled from it
+        data: dict of data
     Returns
-        List of tuples, one tuple per next schema key:
-        (updated s_path, string of next schema key, updated d_path).
+        list of (kind, path, key), where path is the tuple of schema key
+        names from root to the level of the error, and key the schema key
+        name (the first matching one for INVALID), or the data key for
+        UNKNOWN
     """
-    new_fst_path = fst_path + [fst_key]
-    new_snd_path = snd_path + [snd_key]
-    fst_keys = walk(fst, new_fst_path).keys()
 
-    return [(new_fst_path, new_fst_key, new_snd_path)
-            for new_fst_key in fst_keys]
+    errors = []
+    validator = as_validator(schema)
+    schema_root, data_root = validator.tree[('root', str)], data['root']
+    if not isinstance(data_root, dict):
+        return [(INVALID, (), 'root')]
+
+    # stack of (path, schema-centric, schema level, data dict), where
+    # schema-centric is False below schema keys with too few or many matches
+    stack = [(('root',), True, schema_root, data_root)]
+    while stack:
+        path, centric, schema_sub, data_sub = stack.pop()
+        index = validator.index[id(schema_sub)]
+
+        found, subtrees = {}, []
+        for d_key, d_val in data_sub.items():
+            s_keys = index.cache.get(d_key)
+            if s_keys is None:
+                s_keys = resolve_key(index, d_key)
+            # error case: data key not found in schema
+            if not s_keys:
+                errors.append((UNKNOWN, path, d_key))
+                continue
+
+            # error case: value matches none of the schema keys
+            valid = False
+            for s_key in s_keys:
+                found[s_key] = found.get(s_key, 0) + 1
+                s_val = schema_sub[s_key]
+                if isinstance(s_val, Leaf):
+                    valid = valid or s_val.check(d_val)
+                elif isinstance(d_val, dict):
+                    subtrees.append((s_key, d_val))
+                    valid = True
+            if not valid:
+                errors.append((INVALID, path, s_keys[0][0]))
+
+        matched = {}
+        for s_key in schema_sub if centric else ():
+            n = found.get(s_key, 0)
+            matched[s_key] = n > 0 and valid_length(
+                validator.keys[s_key].repeat, range(n))
+            # error case: schema key not found in data
+            if not matched[s_key]:
+                errors.append((MISSING, path, s_key[0]))
+        stack.extend((path + (s_key[0],), matched.get(s_key, False),
+                      schema_sub[s_key], d_val)
+                     for s_key, d_val in reversed(subtrees))
+
+    return errors
 
 # Schema Validation
 
@@ -224,43 +546,14 @@ def gen_schema_output(log):
     return lws_logger.gen_log(log, root, node_to_str, ERRORS)
 
 def validate_schema(schema, data):
-    """Schema-centric validation.
+    """Schema-centric validation, the first log of reconcile.
     Args
-        schema: dict of schema
+        schema: dict of schema, or Validator compiled from it
         data: dict of data
     Returns
-        string of validation graph as adjacency list
+        graph of validation as adjacency list
     """
-
-    log = defaultdict(list)
-
-    stack = update_stack([], [], schema, ('root', str), 'root')
-    while stack:
-        s_path, s_key, d_path = stack.pop()
-        prev_s, prev_d = s_path[-1][0], d_path[-1]
-        schema_sub = walk(schema, s_path)
-        data_sub = walk(data, d_path)
-
-        d_keys = find_data_keys(data_sub, s_key)
-        # error case: schema key not found in data
-        if not d_keys:
-            log[(prev_s, prev_d)].append((s_key[0], ERRORS['key']))
-            continue
-
-        s_val = schema_sub[s_key]
-        for d_key in d_keys:
-            d_val = data_sub[d_key]
-            # not end of branch, add path to stack
-            if isinstance(s_val, dict):
-                stack.extend(update_stack(s_path, d_path, schema, s_key,
-                                          d_key))
-                log[(prev_s, prev_d)].append((s_key[0], d_key))
-            # end of branch, check data value against schema
-            else:
-                val = d_val if valid_data_val(s_val, d_val) else ERRORS['val']
-                log[(prev_s, prev_d)].append((s_key[0], val))
-
-    return log
+    return reconcile(schema, data)[0]
 
 # Data Validation
 
@@ -270,42 +563,14 @@ def gen_data_output(log):
     return lws_logger.gen_log(log, root, node_to_str, ERRORS)
 
 def validate_data(schema, data):
-    """Data-centric validation.
+    """Data-centric validation, the second log of reconcile.
     Args
-        schema: dict of schema
+        schema: dict of schema, or Validator compiled from it
         data: dict of data
     Returns
-        string of validation graph as adjacency list
+        graph of validation as adjacency list
     """
-
-    log = defaultdict(list)
-
-    stack = update_stack([], [], data, 'root', ('root', str))
-    while stack:
-        d_path, d_key, s_path = stack.pop()
-        prev_d, prev_s = d_path[-1], s_path[-1][0]
-        data_sub = walk(data, d_path)
-        schema_sub = walk(schema, s_path)
-
-        s_keys = find_schema_keys(schema_sub, d_key)
-        # error case: data key not found in schema
-        if not s_keys:
-            log[(prev_d, prev_s)].append((d_key, ERRORS['key']))
-            continue
-
-        d_val = data_sub[d_key]
-        for s_key in s_keys:
-            s_val = schema_sub[s_key]
-            # not end of branch, add path to stack
-            if isinstance(d_val, dict):
-                stack.extend(update_stack(d_path, s_path, data, d_key, s_key))
-                log[(prev_d, prev_s)].append((d_key, s_key[0]))
-            # end of branch, check data value against schema
-            else:
-                val = s_val if valid_data_val(s_val, d_val) else ERRORS['val']
-                log[(prev_d, prev_s)].append((d_key, val))
-
-    return log
+    return reconcile(schema, data)[1]
 
 # Main
 
@@ -317,20 +582,41 @@ def join_logs(schema_log, data_log):
 
 def load_schema(schema_path):
     """Load schema from pickle file, adding root node."""
-    with open(schema_path, 'r') as f:
+    with open(schema_path, 'rb') as f:
         raw = pickle.load(f)
         schema = {('root', str): raw}
     return schema
 
 
 def load_data(data_path):
-    """Load data from JSON file, adding root node."""
-    with open(data_path, 'r') as f:
-        raw = json.load(f)
+    """Load data from JSON file, which may be compressed, adding root node.
+    """
+    with codec.open(data_path) as f:
+        raw = backend.load(f)
         data = {'root': raw}
     return data
 
 
+def load_validator(schema_path):
+    """Load schema from pickle file and compile it into a Validator."""
+    return compile_schema(load_schema(schema_path))
+
+
+def validate(validator, data):
+    """Validate data against compiled schema; see main for return value.
+    Args
+        validator: Validator, e.g. from load_validator
+        data: dict of data with root node, e.g. from load_data
+    """
+
+    schema_log, data_log = reconcile(validator, data)
+    s_key_err, s_val_err, schema_out = gen_schema_output(schema_log)
+    d_key_err, d_val_err, data_out = gen_data_output(data_log)
+
+    output = join_logs(schema_out, data_out)
+    return s_key_err, s_val_err, d_key_err, d_val_err, output
+
+
 def main(schema_path, data_path):
     """Main.
     Return string of validation results.
@@ -343,16 +629,7 @@ def main(schema_path, data_path):
                string of log output).
     """
 
-    schema = load_schema(schema_path)
-    data = load_data(data_path)
-
-    schema_log = validate_schema(schema, data)
-    s_key_err, s_val_err, schema_out = gen_schema_output(schema_log)
-    data_log = validate_data(schema, data)
-    d_key_err, d_val_err, data_out = gen_data_output(data_log)
-
-    output = join_logs(schema_out, data_out)
-    return s_key_err, s_val_err, d_key_err, d_val_err, output
+    return validate(load_validator(schema_path), load_data(data_path))
 
 if __name__ == '__main__':
     if len(sys.argv) == 3:
@@ -1,15 +1,15 @@
 """Convert validation graphs from JSON lws to pretty print strings."""
 
 from collections import defaultdict
+from jsonutils import traverse
+
+def is_list(item):
+    """Return True if item is list."""
+    return isinstance(item, list)
 
 def flatten_list(nested):
     """Accepts arbitrarily nested lists and returns generator for flat list."""
-    for outer in nested:
-        if isinstance(outer, list):
-            for inner in flatten_list(outer):
-                yield inner
-        else:
-            yield outer
+    return traverse.flatten(nested, is_list)
 
 def filter_errors(seq, errors):
     """Helper for filter_keys.
@@ -24,8 +24,9 @@ def filter_errors(seq, errors):
     key_err, val_err = errors['key'], errors['val']
     key_err_str, val_err_str = errors['key_str'], errors['val_str']
 
-    return ([key_err_str] if set(seq) == set([key_err]) else
-            [val_err_str] if set(seq) == set([val_err]) else
+    # values may be unhashable (e.g. lists), so compare rather than hash
+    return ([key_err_str] if all(s == key_err for s in seq) else
+            [val_err_str] if all(s == val_err for s in seq) else
             [s for s in seq if s not in (key_err, val_err)])
 
 def filter_keys(pairs, errors):
@@ -61,16 +62,21 @@ def dict_to_tree(d, key, tree, errors={}, depth=0):
         key: initial key value ("root" of dict)
         tree: list, initialized as singleton [(root value, 0)]
         errors: dict representing error values
-        depth: current depth of tree / recursive call; root is 0
+        depth: depth of initial key; root is 0
     Returns
         Nested list of (value, int of depth) pairs.
     """
-    if key not in d:
-        return tree
-    else:
-        pairs = filter_keys(d[key], errors) if errors else d[key]
-        return tree + [dict_to_tree(d, p, [(p, depth + 1)], errors, depth + 1)
-                       for p in pairs]
+    def children(node):
+        # leaf nodes may hold unhashable values (e.g. lists)
+        try:
+            pairs = d.get(node)
+        except TypeError:
+            pairs = None
+        if pairs is None:
+            return []
+        return filter_keys(pairs, errors) if errors else pairs
+
+    return tree + traverse.nest(key, children, depth)[1:]
 
 def parse_errors(nodes, errors):
     """Count errors in nodes.
@@ -0,0 +1,110 @@
+"""Test cases for lws bulk module, assumes Pytest."""
+
+import argparse
+import gzip
+import json
+import pickle
+
+from jsonutils.lws import bulk, lws
+
+SCHEMA = {
+    ('path', str, 'path'): ('path', str),
+    ('stocks', str, 'stocks'): {
+        ('ticker', str, '[A-Z]+', '*'): ('price', float)
+    }
+}
+PASS = {'path': 'p', 'stocks': {'A': 1.0, 'B': 2.0}}
+FAIL = {'stocks': {'A': 'x', 'b': 1.0}}
+
+
+def write_schema(tmpdir):
+    path = str(tmpdir.join('schema.pkl'))
+    with open(path, 'wb') as f:
+        pickle.dump(SCHEMA, f)
+    return path
+
+
+def write_lines(tmpdir, name, lines):
+    path = str(tmpdir.join(name))
+    with gzip.open(path, 'wt') as f:
+        f.write(''.join(line + '\n' for line in lines))
+    return path
+
+
+def validator():
+    return lws.compile_schema({('root', str): SCHEMA})
+
+
+class TestRecords:
+    """Test reading records from files and directories."""
+
+    def test_jsonl(self, tmpdir):
+        """Lines of compressed JSON Lines files, skipping blank lines."""
+        path = write_lines(tmpdir, 'a.jsonl.gz', ['{}', '', '[1]'])
+        assert list(bulk.iter_records(path)) == [(path, 1, b'{}\n'),
+                                                 (path, 3, b'[1]\n')]
+
+    def test_directory(self, tmpdir):
+        """Files of directories in name order, JSON Lines by line."""
+        sub = tmpdir.mkdir('d')
+        sub.join('b.json').write('{"b": 1}')
+        sub.join('.hidden').write('{}')
+        write_lines(sub, 'a.jsonl.gz', ['{}', '{}'])
+        records = [(name.split('/')[-1], line_no) for name, line_no, _
+                   in bulk.iter_records(str(sub))]
+        assert records == [('a.jsonl.gz', 1), ('a.jsonl.gz', 2),
+                           ('b.json', 1)]
+
+
+class TestValidate:
+    """Test validation and aggregation of records."""
+
+    def test_check(self):
+        """Errors of valid JSON, None of invalid JSON."""
+        assert bulk.check(validator(), json.dumps(PASS)) == []
+        assert sorted(bulk.check(validator(), json.dumps(FAIL))) == [
+            (lws.INVALID, ('root', 'stocks'), 'ticker'),
+            (lws.MISSING, ('root',), 'path'),
+            (lws.UNKNOWN, ('root', 'stocks'), 'b')]
+        assert bulk.check(validator(), '{"a": ') is None
+
+    def test_summary(self):
+        """Errors are counted by kind and schema path."""
+        records = [('f', i, json.dumps(record))
+                   for i, record in enumerate([PASS, FAIL, FAIL], 1)]
+        records.append(('f', 4, '{'))
+        summary = bulk.validate(validator(), records)
+        assert (summary.records, summary.passed, summary.failed,
+                summary.invalid) == (4, 1, 2, 1)
+        assert summary.counts() == [
+            (2, lws.INVALID, 'root.stocks.ticker'),
+            (2, lws.MISSING, 'root.path'),
+            (2, lws.UNKNOWN, 'root.stocks.*')]
+
+    def test_main(self, tmpdir, capsys):
+        """Records are listed and summarized."""
+        path = write_lines(tmpdir, 'a.jsonl.gz',
+                           [json.dumps(PASS), json.dumps(FAIL)])
+        args = argparse.Namespace(schema=write_schema(tmpdir), path=path,
+                                  jsonl=False, failures=True, summary=False,
+                                  backend=None)
+        assert bulk.main(args) is False
+        out = capsys.readouterr()[0]
+        assert ':1\t' not in out
+        assert '{}:2\tFAIL\t3 errors'.format(path) in out
+        assert 'Passed:\t\t1' in out
+
+        args.path = write_lines(tmpdir, 'b.jsonl.gz', [json.dumps(PASS)])
+        assert bulk.main(args) is True
+
+    def test_main_schema(self, tmpdir, capsys):
+        """Schemas that cannot be read are reported."""
+        path = write_lines(tmpdir, 'a.jsonl', [json.dumps(PASS)])
+        args = argparse.Namespace(schema=str(tmpdir.join('none.pkl')),
+                                  path=path, jsonl=False, failures=False,
+                                  summary=False, backend=None)
+        assert bulk.main(args) is False
+        args.schema = path
+        assert bulk.main(args) is False
+        out = capsys.readouterr()[0]
+        assert out.count('Could not read schema') == 2
@@ -1,5 +1,9 @@
 """Test cases for JSON LWS module, assumes Pytest."""
 
+import json
+import pickle
+import pytest
+
 from jsonutils.lws import lws
 
 
@@ -188,6 +192,122 @@ class TestValidateKeys:
         lws.find_schema_keys(schema, data_key) == expected
 
 
+class TestKeyIndex:
+    """Test matching of data keys against schema levels."""
+
+    def index(self, schema):
+        specs = dict((key, lws.compile_key(key)) for key in schema)
+        return lws.index_keys(schema, specs)
+
+    def test_is_literal(self):
+        """Rules without regex syntax are literals."""
+        assert lws.is_literal('magic_number') is True
+        assert lws.is_literal('path to directory') is True
+        assert lws.is_literal('[A-Z]*') is False
+        assert lws.is_literal('a.b') is False
+        assert lws.is_literal(lambda k: True) is False
+
+    def test_index_keys(self):
+        """Keys are split into literals, combined patterns and others."""
+        schema = {('a', str, 'name'): 1, ('b', str, '[A-Z]+'): 2,
+                  ('c', str, r'(a)\1'): 3, ('d', str, lambda k: True): 4,
+                  ('e', int): 5}
+        index = self.index(schema)
+        assert index.literals == {'name': (('a', str, 'name'),)}
+        assert index.patterns == [(('b', str, '[A-Z]+'), '[A-Z]+')]
+        assert [key[0] for key, _ in index.others] == ['c', 'd']
+
+    def test_resolve_key(self):
+        """All matching keys are found, in schema order."""
+        schema = {('any', str, '.*'): 1, ('upper', str, '[A-Z]+'): 2,
+                  ('lit', str, 'AB'): 3, ('ab', str, '[AB]+'): 4,
+                  ('none', str, 'x'): 5}
+        index = self.index(schema)
+        names = lambda data_key: [key[0] for key in
+                                  lws.resolve_key(index, data_key)]
+        assert names('AB') == ['any', 'upper', 'lit', 'ab']
+        assert names('C') == ['any', 'upper']
+        assert names('x') == ['any', 'none']
+        assert names('') == []
+
+    def test_resolve_key_cache(self, monkeypatch):
+        """Matches are cached, for a bounded number of data keys."""
+        monkeypatch.setattr(lws, 'CACHE_SIZE', 2)
+        index = self.index({('upper', str, '[A-Z]+'): 1})
+        for data_key in ['A', 'B', 'A', 'x']:
+            assert (lws.resolve_key(index, data_key) ==
+                    lws.match_key(index, data_key))
+        assert index.cache == {'x': ()}
+
+
+class TestCompile:
+    """Test schema compilation."""
+
+    def test_compile_key(self):
+        """Compiled keys match as valid_data_key."""
+        spec = lws.compile_key(('ticker', str, r'[A-Z]+', '+'))
+        assert spec.name == 'ticker' and spec.repeat == '+'
+        assert spec.match('BAC') is True
+        assert spec.match('Bac') is False
+        assert spec.match('') is False
+        assert lws.compile_key(('n', int, '1')).match('1') is False
+        assert lws.compile_key(('f', str, lambda k: 'e' in k)).match('e')
+
+    def test_compile_val(self):
+        """Compiled values check as valid_data_val."""
+        cases = [(('t', str, 'text'), ['text', 'other', '', 1]),
+                 (('t', str), ['a', '', None]),
+                 (('f', float, 7.0), [7.0, 7, None]),
+                 (('b', bool, True), [True, False, 1]),
+                 (('e', int, lambda x: x % 2 == 0), [2, 3, True]),
+                 (('l', list, [1, 2]), [[1, 2], [1], {}]),
+                 (('d', int), [{}, 5, 5.0])]
+        for val, data_vals in cases:
+            leaf = lws.compile_val(val)
+            assert leaf.val is val
+            for data_val in data_vals:
+                assert (leaf.check(data_val) ==
+                        lws.valid_data_val(val, data_val)), (val, data_val)
+
+    def test_compile_val_types(self):
+        """Type is checked before rule, so rules of other types never fail
+        on data values.
+        """
+        assert lws.compile_val(('f', float, 7.0)).check('x') is False
+        assert lws.compile_val(('n', None)).check(None) is True
+
+    def test_compile_schema(self):
+        """Compiled tree has the shape of the schema and is read-only."""
+        schema = {('root', str): {('a', str, 'a'): {('b', str, 'b'):
+                                                    ('b', int)}}}
+        validator = lws.compile_schema(schema)
+        leaf = validator.tree[('root', str)][('a', str, 'a')][('b', str, 'b')]
+        assert leaf.val == ('b', int)
+        assert set(validator.keys) == {('root', str), ('a', str, 'a'),
+                                       ('b', str, 'b')}
+        with pytest.raises(TypeError):
+            validator.tree[('root', str)][('c', str)] = ('c', int)
+        assert lws.as_validator(validator) is validator
+
+    def test_validate(self, tmpdir):
+        """Compiled validator is reused across documents."""
+        schema = {('stocks', str, 'stocks'): {
+            ('ticker', str, r'[A-Z]+', '*'): ('price', float)}}
+        schema_path = str(tmpdir.join('schema.pkl'))
+        with open(schema_path, 'wb') as f:
+            pickle.dump(schema, f)
+        validator = lws.load_validator(schema_path)
+
+        for stocks, errors in [({'C': 1.0}, (0, 0, 0, 0)),
+                               ({'C': 'x', 'b': 1.0}, (0, 1, 1, 1))]:
+            data_path = str(tmpdir.join('data.json'))
+            with open(data_path, 'w') as f:
+                json.dump({'stocks': stocks}, f)
+            ret = lws.validate(validator, lws.load_data(data_path))
+            assert ret[:4] == errors
+            assert ret == lws.main(schema_path, data_path)
+
+
 class TestValidationHelpers:
     """Test the schema and data validation helpers."""
 
@@ -216,19 +336,6 @@ class TestValidationHelpers:
         assert f(d, ['a']) == {'b': 'c'}
         assert f(d, ['a', 'b']) == 'c'
 
-    def test_update_stack(self):
-        """Test stack updating."""
-        f = lws.update_stack
-        s_path = [('a', str), ('b', str)]
-        d_path = ['a', 'b']
-        schema = {('a', str): {('b', str): {('c', str): {('d', str): 'e'}}}}
-        s_key = ('c', str)
-        d_key = 'c'
-        expected = [([('a', str), ('b', str), ('c', str)],
-                     ('d', str),
-                     ['a', 'b', 'c'])]
-        assert f(s_path, d_path, schema, s_key, d_key) == expected
-
 
 class TestSampleData:
     """Test graphs generated by sample data."""
@@ -294,3 +401,116 @@ class TestSampleData:
 
         assert dict(lws.validate_schema(schema, data)) == expected_schema
         assert dict(lws.validate_data(schema, data)) == expected_data
+
+    def test_shape_mismatch(self):
+        """Values where schema has a level, and objects where schema has a
+        value, are value errors.
+        """
+
+        schema = {
+            ('root', str): {
+                ('a', str, 'a'): {('b', str, 'b'): ('b', int)},
+                ('c', str, 'c'): ('c', int)
+            }
+        }
+        data = {'root': {'a': 'abc', 'c': {'d': 1}}}
+
+        ERRORS = lws.return_errors()
+        expected = [('a', ERRORS['val']), ('c', ERRORS['val'])]
+        s_log = lws.validate_schema(schema, data)
+        d_log = lws.validate_data(schema, data)
+
+        assert sorted(s_log[('root', 'root')]) == expected
+        assert sorted(d_log[('root', 'root')]) == expected
+
+    def test_deep_chain(self):
+        """Deeply nested data is validated without recursion."""
+
+        depth = 5000
+        schema, data = ('leaf', int), 1
+        for i in range(depth):
+            key = 'n{}'.format(i)
+            schema, data = {(key, str, key): schema}, {key: data}
+        schema, data = {('root', str): schema}, {'root': data}
+
+        s_log = lws.validate_schema(schema, data)
+        d_log = lws.validate_data(schema, data)
+
+        assert len(s_log) == len(d_log) == depth
+        assert s_log[('n1', 'n1')] == [('n0', 1)]
+        assert d_log[('n1', 'n1')] == [('n0', ('leaf', int))]
+
+    def test_reconcile_repeat(self):
+        """Keys of invalid repetition are key errors in the schema log only;
+        the data log still validates their values.
+        """
+
+        schema = {
+            ('root', str): {
+                ('one ticker', str, '[A-Z]+', '?'): {
+                    ('price', str, 'price'): ('price', float)
+                }
+            }
+        }
+        data = {'root': {'A': {'price': 1.0}, 'B': {'price': 'x'}}}
+
+        ERRORS = lws.return_errors()
+        expected_schema = {
+            ('root', 'root'): [('one ticker', ERRORS['key'])]
+        }
+        expected_data = {
+            ('root', 'root'): [('B', 'one ticker'), ('A', 'one ticker')],
+            ('A', 'one ticker'): [('price', ('price', float))],
+            ('B', 'one ticker'): [('price', ERRORS['val'])]
+        }
+
+        schema_log, data_log = lws.reconcile(schema, data)
+        assert dict(schema_log) == expected_schema
+        assert dict(data_log) == expected_data
+
+    def test_log_order(self):
+        """Logs list the keys of each level in reverse order, and the
+        matches of a schema key in data order.
+        """
+
+        schema = {
+            ('root', str): {
+                ('a', str, 'a'): ('a', int),
+                ('b', str, 'b'): ('b', int),
+                ('n', str, 'n[0-9]'): ('n', int)
+            }
+        }
+        data = {'root': {'n1': 1, 'a': 1, 'n2': 2, 'b': 2}}
+
+        s_log = lws.validate_schema(schema, data)
+        d_log = lws.validate_data(schema, data)
+
+        assert s_log[('root', 'root')] == [('n', 1), ('n', 2), ('b', 2),
+                                           ('a', 1)]
+        assert d_log[('root', 'root')] == [('b', ('b', int)),
+                                           ('n2', ('n', int)),
+                                           ('a', ('a', int)),
+                                           ('n1', ('n', int))]
+
+    def test_find_errors(self):
+        """Errors are found with schema paths, as counted in the logs."""
+
+        schema = {
+            ('root', str): {
+                ('stocks', str, 'stocks'): {
+                    ('ticker', str, '[A-Z]+', '+'): ('price', float)
+                },
+                ('path', str, 'path'): ('path', str)
+            }
+        }
+        data = {'root': {'stocks': {'A': 'x', 'B': 1.0, 'c': 1.0}}}
+
+        errors = lws.find_errors(schema, data)
+        assert sorted(errors) == [(lws.INVALID, ('root', 'stocks'), 'ticker'),
+                                  (lws.MISSING, ('root',), 'path'),
+                                  (lws.UNKNOWN, ('root', 'stocks'), 'c')]
+        assert lws.validate(lws.compile_schema(schema), data)[:4] == (1, 0,
+                                                                      1, 1)
+        assert lws.find_errors(schema, {'root': [1]}) == [
+            (lws.INVALID, (), 'root')]
+
@@ -81,6 +81,23 @@ class TestLoggerHelpers:
                        [('b', 1)]]
         assert f(nested_d, 'root', [('root', 0)]) == nested_list
 
+    def test_dict_to_tree_deep(self):
+        """Test dict_to_tree and flatten_list beyond the recursion limit."""
+        depth = 10000
+        graph = dict((i, [i + 1]) for i in range(depth))
+        tree = lws_logger.dict_to_tree(graph, 0, [(0, 0)])
+        flat = list(lws_logger.flatten_list(tree))
+        assert flat == [(i, i) for i in range(depth + 1)]
+
+    def test_dict_to_tree_unhashable(self):
+        """Test dict_to_tree with unhashable leaf values, e.g. lists."""
+        f = lws_logger.dict_to_tree
+        errors = {'key': 99, 'key_str': 'key error',
+                  'val': -99, 'val_str': 'val error'}
+        d = {'root': [('a', [1, 2]), ('b', 99)]}
+        assert f(d, 'root', [('root', 0)], errors) == \
+            [('root', 0), [(('a', [1, 2]), 1)], [(('b', 'key error'), 1)]]
+
     def test_parse_errors_one(self):
         """Test scenario with one type of error."""
         f = lws_logger.parse_errors
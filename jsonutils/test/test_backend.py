@@ -0,0 +1,88 @@
+"""Test cases for backend module, assumes Pytest."""
+
+import json
+import pytest
+
+from jsonutils import backend
+
+OBJ = {'b': [1, 2.5, None, True], 'a': {'c': 'dé'}}
+
+
+class TestBackends:
+    """Every installed backend round-trips like the standard library."""
+
+    @pytest.mark.parametrize('name', backend.available())
+    def test_loads(self, name):
+        """Decode str and bytes."""
+        b = backend.get(name)
+        raw = json.dumps(OBJ)
+        assert b.loads(raw) == OBJ
+        assert b.loads(raw.encode('utf-8')) == OBJ
+        with pytest.raises(ValueError):
+            b.loads('{"a": ')
+
+    @pytest.mark.parametrize('name', backend.available())
+    def test_loads_as_json(self, name):
+        """Wide ints, NaN and Infinity decode as with the standard library.
+        """
+        b = backend.get(name)
+        for raw in ['{"a": 123456789012345678901234567890}',
+                    '[-9223372036854775809, 1.0000000000000000000001]',
+                    '{"a": "12345678901234567890", "b": 1}']:
+            assert b.loads(raw) == json.loads(raw)
+            assert b.loads(raw.encode('utf-8')) == json.loads(raw)
+        assert b.loads('{"a": 123456789012345678901234567890}')['a'] == (
+            123456789012345678901234567890)
+        vals = b.loads(b'[NaN, Infinity, -Infinity]')
+        assert vals[0] != vals[0] and vals[1:] == [float('inf'),
+                                                   float('-inf')]
+
+    @pytest.mark.parametrize('name', backend.available())
+    def test_dumps(self, name):
+        """Encode with indent, sorted keys and default hook."""
+        b = backend.get(name)
+        assert json.loads(b.dumps(OBJ)) == OBJ
+        pretty = b.dumps(OBJ, indent=2, sort_keys=True)
+        assert json.loads(pretty) == OBJ
+        assert pretty.index('"a"') < pretty.index('"b"')
+        assert '\n  "a"' in pretty
+        assert json.loads(b.dumps({'x': {1}}, default=sorted)) == {'x': [1]}
+        assert json.loads(b.dumps({'x': 2 ** 70})) == {'x': 2 ** 70}
+
+    @pytest.mark.parametrize('name', backend.available())
+    def test_dumps_as_json(self, name):
+        """Output is that of the standard library, including NaN, floats
+        and non-ASCII text.
+        """
+        b = backend.get(name)
+        for obj in [OBJ, {'a': {'x': float('nan')}},
+                    [float('inf'), float('-inf'), None],
+                    [1e16, 1e-05, 3.0522060338518236e-05, 0.5, -0.0],
+                    {'h\u00e9': 'h\u00e9 \U0001f600 \x7f \x1f /'},
+                    {'b': [1, {'c': 'x'}], 'a': []}]:
+            for indent in [None, 2]:
+                for sort_keys in [False, True]:
+                    assert (b.dumps(obj, indent, sort_keys) ==
+                            json.dumps(obj, indent=indent,
+                                       sort_keys=sort_keys))
+
+
+class TestSelection:
+    """Test backend selection."""
+
+    def test_get(self):
+        """Named, automatic and unknown backends."""
+        assert backend.get('json').name == 'json'
+        assert backend.get().name == backend.available()[0]
+        assert backend.available()[-1] == 'json'
+        with pytest.raises(ValueError):
+            backend.get('nope')
+
+    def test_use(self):
+        """Module-level functions follow current backend."""
+        current = backend.BACKEND
+        try:
+            assert backend.use('json') is backend.BACKEND
+            assert backend.loads(b'[1]') == [1]
+        finally:
+            backend.BACKEND = current
@@ -0,0 +1,90 @@
+"""Test cases for codec module, assumes Pytest."""
+
+import bz2
+import gzip
+import lzma
+import pytest
+
+from jsonutils import codec
+from jsonutils.jbro import jbro, jsonl
+
+RAW = b'{"a": [1, 2, {"b": "x"}], "c": null}\n'
+COMPRESS = {'gzip': gzip.compress, 'bz2': bz2.compress, 'xz': lzma.compress}
+
+
+def write(tmpdir, name, raw):
+    path = tmpdir.join(name)
+    path.write_binary(raw)
+    return str(path)
+
+
+class TestDetect:
+    """Test codec detection by magic bytes."""
+
+    @pytest.mark.parametrize('name', sorted(COMPRESS))
+    def test_sniff(self, name):
+        """Detect compressed bytes."""
+        assert codec.sniff(COMPRESS[name](RAW)) == name
+
+    def test_sniff_plain(self):
+        """Plain JSON and empty input are not compressed."""
+        assert codec.sniff(RAW) is None
+        assert codec.sniff(b'') is None
+
+    def test_detect(self, tmpdir):
+        """Detection ignores the file extension."""
+        gz = write(tmpdir, 'a.json', gzip.compress(RAW))
+        assert codec.detect(gz) == 'gzip'
+        assert codec.detect(write(tmpdir, 'b.json.gz', RAW)) is None
+
+    def test_strip_extension(self):
+        """Strip compression extension only."""
+        assert codec.strip_extension('a.jsonl.bz2') == 'a.jsonl'
+        assert codec.strip_extension('a.json.GZ') == 'a.json'
+        assert codec.strip_extension('a.json') == 'a.json'
+
+
+class TestOpen:
+    """Test reading compressed files."""
+
+    @pytest.mark.parametrize('name', sorted(COMPRESS))
+    def test_open(self, name, tmpdir):
+        """Decompress while reading."""
+        path = write(tmpdir, 'a.json', COMPRESS[name](RAW))
+        with codec.open(path) as f:
+            assert f.read(4) + f.read() == RAW
+
+    def test_open_plain(self, tmpdir):
+        """Read uncompressed files as is."""
+        with codec.open(write(tmpdir, 'a.json', RAW)) as f:
+            assert f.read() == RAW
+
+    def test_open_zstd(self, tmpdir):
+        """Decompress zstd if zstandard is installed."""
+        zstandard = pytest.importorskip('zstandard')
+        raw = zstandard.ZstdCompressor().compress(RAW)
+        with codec.open(write(tmpdir, 'a.json.zst', raw)) as f:
+            assert f.read() == RAW
+
+    def test_corrupt(self, tmpdir):
+        """Truncated input raises one of codec.ERRORS."""
+        path = write(tmpdir, 'a.json.gz', gzip.compress(RAW)[:-12])
+        with pytest.raises(codec.ERRORS):
+            with codec.open(path) as f:
+                f.read()
+
+
+class TestCompressedInput:
+    """Test jbro loading of compressed files."""
+
+    def test_test_json(self, tmpdir):
+        """Load compressed document, also when lazy load is requested."""
+        path = write(tmpdir, 'a.json.xz', lzma.compress(RAW))
+        assert jbro.test_json(path, True) == {'a': [1, 2, {'b': 'x'}],
+                                              'c': None}
+        assert jbro.file_chars(path) is None
+
+    def test_is_jsonl(self):
+        """JSON Lines files are recognized under compression extensions."""
+        assert jsonl.is_jsonl('a.jsonl.bz2')
+        assert not jsonl.is_jsonl('a.json.bz2')
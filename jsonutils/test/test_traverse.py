@@ -0,0 +1,81 @@
+"""Test cases for traverse module, assumes Pytest."""
+
+from jsonutils import traverse
+
+DEEP = 10000
+
+
+def chain(depth):
+    """Return dict nested to given depth, {'k': {'k': ... 0}}."""
+    d = 0
+    for _ in range(depth):
+        d = {'k': d}
+    return d
+
+
+class TestTraverse:
+    """Test the iterative traversal helpers."""
+
+    def test_walk(self):
+        """Walk path of keys."""
+        f = traverse.walk
+        d = {'a': {'b': 'c'}}
+        assert f(d, []) == d
+        assert f(d, ['a', 'b']) == 'c'
+        assert f(chain(DEEP), ['k'] * DEEP) == 0
+
+    def test_find(self):
+        """Walk path of keys, None if not found."""
+        f = traverse.find
+        is_dict = lambda x: isinstance(x, dict)
+        d = {'a': {'b': 'c'}}
+        assert f(d, ['a', 'b'], is_dict) == 'c'
+        assert f(d, ['a', 'x'], is_dict) is None
+        assert f(d, ['a', 'b', 'c'], is_dict) is None
+
+    def test_dfs(self):
+        """Depth-first pre-order with depths."""
+        tree = {'a': ['b', 'c'], 'b': ['d']}
+        nodes = list(traverse.dfs('a', lambda n: tree.get(n, [])))
+        assert nodes == [(0, 'a'), (1, 'b'), (2, 'd'), (1, 'c')]
+
+    def test_bfs(self):
+        """Breadth-first order with depths."""
+        tree = {'a': ['b', 'c'], 'b': ['d']}
+        nodes = list(traverse.bfs('a', lambda n: tree.get(n, [])))
+        assert nodes == [(0, 'a'), (1, 'b'), (1, 'c'), (2, 'd')]
+
+    def test_iter_key_rec(self):
+        """Occurrences in document or breadth-first order, not searching
+        within found values, and within lists only if is_seq.
+        """
+        f = traverse.iter_key_rec
+        is_map = lambda x: isinstance(x, dict)
+        is_seq = lambda x: isinstance(x, list)
+        data = {'z': {'k': {'k': 1}, 'l': [{'k': 2}]}, 'k': 3}
+        assert list(f(data, 'k', is_map, is_seq)) == [
+            (('z', 'k'), {'k': 1}), (('z', 'l', 0, 'k'), 2), (('k',), 3)]
+        assert [path for path, _ in f(data, 'k', is_map, is_seq, 'bfs')] == [
+            ('k',), ('z', 'k'), ('z', 'l', 0, 'k')]
+        assert list(f(data, 'k', is_map, lambda x: False)) == [
+            (('z', 'k'), {'k': 1}), (('k',), 3)]
+
+    def test_flatten(self):
+        """Flatten nested lists, including very deep nesting."""
+        f = traverse.flatten
+        is_list = lambda x: isinstance(x, list)
+        assert list(f([1, [2, [], [3, [4]]], 5], is_list)) == [1, 2, 3, 4, 5]
+        deep = [0]
+        for i in range(1, DEEP):
+            deep = [deep, i]
+        assert list(f(deep, is_list)) == list(range(DEEP))
+
+    def test_nest(self):
+        """Nested list form of tree."""
+        tree = {'a': ['b', 'c'], 'b': ['d']}
+        nested = traverse.nest('a', lambda n: tree.get(n, []))
+        assert nested == [('a', 0), [('b', 1), [('d', 2)]], [('c', 1)]]
+        deep = traverse.nest(0, lambda n: [n + 1] if n < DEEP else [])
+        for _ in range(DEEP):
+            deep = deep[1]
+        assert deep == [(DEEP, DEEP)]
@@ -0,0 +1,113 @@
+"""Iterative traversal helpers shared by jbro and lws.
+
+All traversals use an explicit stack rather than recursion, so the depth of
+nested documents is limited only by memory rather than the interpreter
+recursion limit.
+"""
+
+from collections import deque
+
+def walk(d, path):
+    """Walk dict d using path as sequential list of keys, return last value.
+    Raises KeyError if a key is missing.
+    """
+    for key in path:
+        d = d[key]
+    return d
+
+def find(d, path, is_branch):
+    """Walk d along path of keys, return last value or None if not found.
+    Only nodes for which is_branch(node) is True are descended.
+    """
+    for key in path:
+        if not is_branch(d) or key not in d:
+            return None
+        d = d[key]
+    return d
+
+def dfs(root, children):
+    """Yield (depth, node) pairs of tree in depth-first pre-order.
+    Args
+        root: root node, depth 0
+        children: function returning list of child nodes of a node
+    """
+    stack = [(0, root)]
+    pop, extend = stack.pop, stack.extend
+    while stack:
+        depth, node = pop()
+        yield depth, node
+        nodes = children(node)
+        if nodes:
+            depth += 1
+            extend([(depth, child) for child in reversed(nodes)])
+
+def bfs(root, children):
+    """Yield (depth, node) pairs of tree in breadth-first order.
+    Args
+        root: root node, depth 0
+        children: function returning list of child nodes of a node
+    """
+    queue = deque([(0, root)])
+    popleft, extend = queue.popleft, queue.extend
+    while queue:
+        depth, node = popleft()
+        yield depth, node
+        nodes = children(node)
+        if nodes:
+            depth += 1
+            extend([(depth, child) for child in nodes])
+
+def iter_key_rec(root, search_key, is_map, is_seq, order='dfs'):
+    """Yield (path, value) of all occurrences of search_key in root, as they
+    are found, where path is a tuple of keys and list indexes. Found values
+    are not searched further.
+    Args
+        root: value to search
+        search_key: str of key to find
+        is_map: function returning True for objects
+        is_seq: function returning True for arrays to search within
+        order: 'dfs' for document order, or 'bfs' for shallowest first
+    """
+    def children(node):
+        path, val = node
+        return ([] if path and path[-1] == search_key else
+                [(path + (k,), v) for k, v in val.items()] if is_map(val)
+                else [(path + (i,), v) for i, v in enumerate(val)]
+                if is_seq(val) else
+                [])
+
+    walk = bfs if order == 'bfs' else dfs
+    return (node for _, node in walk(((), root), children)
+            if node[0] and node[0][-1] == search_key)
+
+def flatten(nested, is_branch):
+    """Yield leaves of arbitrarily nested iterables, in order.
+    Items for which is_branch(item) is True are expanded.
+    """
+    stack = [iter(nested)]
+    while stack:
+        for item in stack[-1]:
+            if is_branch(item):
+                stack.append(iter(item))
+                break
+            yield item
+        else:
+            stack.pop()
+
+def nest(root, children, depth=0):
+    """Return tree as nested list [(root, depth), subtree_1, ...], where each
+    subtree has the same form one level deeper.
+    Args
+        root: root node
+        children: function returning list of child nodes of a node
+        depth: int of root depth
+    """
+    tree = [(root, depth)]
+    stack = [(tree, root, depth)]
+    while stack:
+        parent, node, level = stack.pop()
+        for child in children(node):
+            sub = [(child, level + 1)]
+            parent.append(sub)
+            stack.append((sub, child, level + 1))
+    return tree
@@ -3,7 +3,7 @@ setup(
     name="jsonutils",
     version="0.3.1",
     packages=['jsonutils', 'jsonutils.lws', 'jsonutils.jbro'],
-    scripts=['jsonutils/bin/jbro'],
+    scripts=['jsonutils/bin/jbro', 'jsonutils/bin/lws'],
 
     tests_require=['pytest'],
     install_requires=[],